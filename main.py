@@ -339,6 +339,21 @@ class XiaohongshuUI(QMainWindow):
         # 启动下载器线程
         self.start_downloader_thread()
 
+        # 后台预热当前模板包的背景图（首次生成图片时无需再解码/缩放）
+        try:
+            from src.core.services.system_image_template_service import system_image_template_service
+            system_image_template_service.start_background_warmup()
+        except Exception as e:
+            print(f"⚠️ 模板背景预热启动失败: {e}")
+
+        # 后台回收图片存储中已无引用的文件
+        try:
+            from src.core.services.image_store import ImageStore, image_store
+            if ImageStore.enabled():
+                image_store.start_gc_in_background()
+        except Exception as e:
+            print(f"⚠️ 图片存储回收启动失败: {e}")
+
         # 启动后同步一次当前用户到UI
         self.sync_current_user_to_ui()
 
@@ -388,7 +403,7 @@ class XiaohongshuUI(QMainWindow):
         """接收调度器的到期任务，并加入浏览器线程队列执行。"""
         try:
             data = task if isinstance(task, dict) else {}
-            self.browser_thread.action_queue.append(
+            self.browser_thread.enqueue_action(
                 {
                     "type": "scheduled_publish",
                     "task_id": data.get("task_id"),
@@ -406,6 +421,7 @@ class XiaohongshuUI(QMainWindow):
                     "page_count": data.get("page_count"),
                     "platform": data.get("platform"),
                     "engine": data.get("engine"),
+                    "retry_count": data.get("retry_count"),
                 }
             )
         except Exception as e:
@@ -474,6 +490,20 @@ class XiaohongshuUI(QMainWindow):
                 self.image_processor.terminate()
                 self.image_processor.wait()
 
+            # 释放大模型接口的长连接池
+            try:
+                from src.core.services.llm_service import llm_service
+                llm_service.close()
+            except Exception:
+                pass
+
+            # 关闭图片渲染进程池
+            try:
+                from src.core.services.system_image_template_service import shutdown_render_pool
+                shutdown_render_pool()
+            except Exception:
+                pass
+
             # 清理资源
             self.images = []
             self.image_list = []
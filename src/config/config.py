@@ -42,6 +42,23 @@ class Config:
             print(f"加载配置失败: {str(e)}")
             self.config = self.default_config
             self.save_config()
+        self._loaded_signature = self._file_signature()
+
+    def _file_signature(self):
+        """settings.json 的 (mtime_ns, size)，文件不存在时返回 None"""
+        try:
+            st = os.stat(self.config_file)
+            return (st.st_mtime_ns, st.st_size)
+        except OSError:
+            return None
+
+    def reload_if_changed(self):
+        """仅当 settings.json 的 mtime/size 变化时才重新加载，返回是否重新加载"""
+        signature = self._file_signature()
+        if signature is not None and signature == getattr(self, '_loaded_signature', None):
+            return False
+        self.load_config()
+        return True
 
     def _ensure_default_config(self):
         """确保所有默认配置项都存在"""
@@ -66,6 +83,8 @@ class Config:
         try:
             with open(self.config_file, 'w', encoding='utf-8') as f:
                 json.dump(self.config, f, indent=4, ensure_ascii=False)
+            # 内存中的配置与刚写入的文件一致，无需再次加载
+            self._loaded_signature = self._file_signature()
         except Exception as e:
             print(f"保存配置失败: {str(e)}")
 
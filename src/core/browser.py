@@ -1,15 +1,22 @@
 from PyQt5.QtCore import QThread, pyqtSignal
 import asyncio
+import itertools
 import os
 import random
 import re
 import sys
+import threading
 import time
 from functools import partial
 
+from src.core.scheduler.publish_executor import PublishExecutor
 from src.core.write_xiaohongshu import XiaohongshuPoster
 
 
+# 动作优先级（数值小的先执行）：交互操作插到排队中的定时发布之前
+ACTION_PRIORITIES = {"login": 0, "preview": 0, "scheduled_publish": 10}
+
+
 class BrowserThread(QThread):
     # 添加信号
     login_status_changed = pyqtSignal(str, bool)  # 用于更新登录按钮状态
@@ -23,9 +30,15 @@ class BrowserThread(QThread):
     def __init__(self):
         super().__init__()
         self.poster = None
-        self.action_queue = []
         self.is_running = True
         self.loop = None
+        # 动作队列（优先级, 序号, 动作）：在事件循环中创建；循环启动前提交的动作先暂存
+        self._actions = None
+        self._pending_actions = []
+        self._actions_lock = threading.Lock()
+        self._action_seq = itertools.count()
+        # 定时发布：按账号并发执行（全局上限 XHS_PUBLISH_CONCURRENCY，同账号串行）
+        self.publish_executor = PublishExecutor(self._run_scheduled_publish, on_error=self._on_scheduled_publish_error)
 
     def run(self):
         # 创建新的事件循环
@@ -40,147 +53,204 @@ class BrowserThread(QThread):
         
     async def async_run(self):
         """异步主循环"""
+        with self._actions_lock:
+            self._actions = asyncio.PriorityQueue()
+            for item in self._pending_actions:
+                self._actions.put_nowait(item)
+            self._pending_actions = []
+
         while self.is_running:
-            if self.action_queue:
-                action = self.action_queue.pop(0)
-                try:
-                    if action['type'] == 'login':
-                        phone = (action.get('phone') or "").strip()
-                        country_code = str(action.get('country_code') or "+86").strip() or "+86"
-                        if not phone:
-                            raise ValueError("手机号不能为空")
-
-                        # 根据手机号匹配/创建用户，并作为当前用户
-                        try:
-                            from src.core.services.user_service import user_service
-                        except Exception:
-                            user_service = None
-
-                        current_user = None
-                        if user_service:
-                            current_user = user_service.get_user_by_phone(phone)
-                            if current_user:
-                                user_service.switch_user(current_user.id)
-                            else:
-                                normalized_phone = "".join([c for c in phone if c.isdigit()]) or phone
-                                username_base = f"user_{normalized_phone}"
-                                username = username_base
-                                suffix = 1
-                                while user_service.get_user_by_username(username):
-                                    username = f"{username_base}_{suffix}"
-                                    suffix += 1
-                                current_user = user_service.create_user(
-                                    username=username,
-                                    phone=phone,
-                                    display_name=phone,
-                                    set_current=True,
-                                )
-
-                        # 如果已存在浏览器会话，先关闭避免残留进程导致“偶发启动失败”
-                        if self.poster:
+            # 空闲时阻塞在队列上，不再每 100ms 轮询一次
+            _priority, _seq, action = await self._actions.get()
+            if action is None:
+                break
+            try:
+                if action['type'] == 'login':
+                    phone = (action.get('phone') or "").strip()
+                    country_code = str(action.get('country_code') or "+86").strip() or "+86"
+                    if not phone:
+                        raise ValueError("手机号不能为空")
+
+                    # 根据手机号匹配/创建用户，并作为当前用户
+                    try:
+                        from src.core.services.user_service import user_service
+                    except Exception:
+                        user_service = None
+
+                    current_user = None
+                    if user_service:
+                        current_user = user_service.get_user_by_phone(phone)
+                        if current_user:
+                            user_service.switch_user(current_user.id)
+                        else:
+                            normalized_phone = "".join([c for c in phone if c.isdigit()]) or phone
+                            username_base = f"user_{normalized_phone}"
+                            username = username_base
+                            suffix = 1
+                            while user_service.get_user_by_username(username):
+                                username = f"{username_base}_{suffix}"
+                                suffix += 1
+                            current_user = user_service.create_user(
+                                username=username,
+                                phone=phone,
+                                display_name=phone,
+                                set_current=True,
+                            )
+
+                    # 如果已存在浏览器会话，先关闭避免残留进程导致“偶发启动失败”
+                    if self.poster:
+                        # 等该账号正在复用此会话的定时发布结束后再关闭
+                        async with self._account_lock(getattr(self.poster, "user_id", None)):
                             try:
                                 await self.poster.close(force=True)
                             except Exception:
                                 pass
                             self.poster = None
 
-                        # 读取当前用户的默认环境（代理/指纹）
-                        browser_env = None
-                        try:
-                            from src.core.services.browser_environment_service import browser_environment_service
+                    # 读取当前用户的默认环境（代理/指纹）
+                    browser_env = None
+                    try:
+                        from src.core.services.browser_environment_service import browser_environment_service
 
-                            if current_user:
+                        if current_user:
+                            browser_env = browser_environment_service.get_default_environment(current_user.id)
+                            if not browser_env:
+                                browser_environment_service.create_preset_environments(current_user.id)
                                 browser_env = browser_environment_service.get_default_environment(current_user.id)
-                                if not browser_env:
+
+                            # 若默认环境与当前系统不匹配，优先选择同用户下更贴近当前系统的环境（仅本次会话，不修改默认设置）
+                            if browser_env and sys.platform == "darwin":
+                                ua = (browser_env.user_agent or "")
+                                platform = (browser_env.platform or "")
+                                if "Windows NT" in ua or platform == "Win32":
                                     browser_environment_service.create_preset_environments(current_user.id)
-                                    browser_env = browser_environment_service.get_default_environment(current_user.id)
-
-                                # 若默认环境与当前系统不匹配，优先选择同用户下更贴近当前系统的环境（仅本次会话，不修改默认设置）
-                                if browser_env and sys.platform == "darwin":
-                                    ua = (browser_env.user_agent or "")
-                                    platform = (browser_env.platform or "")
-                                    if "Windows NT" in ua or platform == "Win32":
-                                        browser_environment_service.create_preset_environments(current_user.id)
-                                        envs = browser_environment_service.get_user_environments(current_user.id, active_only=True) or []
-                                        for env in envs:
-                                            if (env.platform or "") == "MacIntel" or "Macintosh" in (env.user_agent or ""):
-                                                print(f"检测到 macOS 系统，默认环境为 Windows 指纹；本次登录临时切换到环境: {env.name}")
-                                                browser_env = env
-                                                break
-                                elif browser_env and sys.platform == "win32":
-                                    ua = (browser_env.user_agent or "")
-                                    platform = (browser_env.platform or "")
-                                    if "Macintosh" in ua or platform == "MacIntel":
-                                        browser_environment_service.create_preset_environments(current_user.id)
-                                        envs = browser_environment_service.get_user_environments(current_user.id, active_only=True) or []
-                                        for env in envs:
-                                            if (env.platform or "") == "Win32" or "Windows NT" in (env.user_agent or ""):
-                                                print(f"检测到 Windows 系统，默认环境为 Mac 指纹；本次登录临时切换到环境: {env.name}")
-                                                browser_env = env
-                                                break
-                        except Exception:
-                            browser_env = None
-
-                        self.poster = XiaohongshuPoster(
-                            user_id=(current_user.id if current_user else None),
-                            browser_environment=browser_env,
-                        )
+                                    envs = browser_environment_service.get_user_environments(current_user.id, active_only=True) or []
+                                    for env in envs:
+                                        if (env.platform or "") == "MacIntel" or "Macintosh" in (env.user_agent or ""):
+                                            print(f"检测到 macOS 系统，默认环境为 Windows 指纹；本次登录临时切换到环境: {env.name}")
+                                            browser_env = env
+                                            break
+                            elif browser_env and sys.platform == "win32":
+                                ua = (browser_env.user_agent or "")
+                                platform = (browser_env.platform or "")
+                                if "Macintosh" in ua or platform == "MacIntel":
+                                    browser_environment_service.create_preset_environments(current_user.id)
+                                    envs = browser_environment_service.get_user_environments(current_user.id, active_only=True) or []
+                                    for env in envs:
+                                        if (env.platform or "") == "Win32" or "Windows NT" in (env.user_agent or ""):
+                                            print(f"检测到 Windows 系统，默认环境为 Mac 指纹；本次登录临时切换到环境: {env.name}")
+                                            browser_env = env
+                                            break
+                    except Exception:
+                        browser_env = None
+
+                    poster = XiaohongshuPoster(
+                        user_id=(current_user.id if current_user else None),
+                        browser_environment=browser_env,
+                    )
+                    # 该账号的定时发布与登录互斥（同一 profile 目录不能被两个浏览器同时打开）
+                    async with self._account_lock(poster.user_id):
+                        self.poster = poster
                         await self.poster.initialize()
                         await self.poster.login(phone, country_code=country_code)
 
-                        if user_service and current_user:
-                            user_service.update_login_status(current_user.id, True)
+                    if user_service and current_user:
+                        user_service.update_login_status(current_user.id, True)
 
-                        self.login_success.emit(self.poster)
-                    elif action['type'] == 'preview' and self.poster:
+                    self.login_success.emit(self.poster)
+                elif action['type'] == 'preview' and self.poster:
+                    async with self._account_lock(getattr(self.poster, "user_id", None)):
                         await self.poster.post_article(
                             action['title'],
                             action['content'],
                             action['images'],
                             auto_publish=False,
                         )
-                        self.preview_success.emit()
-                    elif action['type'] == 'scheduled_publish':
-                        await self._run_scheduled_publish(action)
-                except Exception as e:
-                    if action['type'] == 'login':
-                        # 登录阶段失败时，尽量释放浏览器资源，避免后续启动不稳定
-                        try:
-                            if self.poster:
-                                await self.poster.close(force=True)
-                        except Exception:
-                            pass
-                        finally:
-                            self.poster = None
+                    self.preview_success.emit()
+                elif action['type'] == 'scheduled_publish':
+                    # 不在主循环中等待：不同账号的发布并发执行，登录/预览也不必排在其后
+                    if not action.get('user_id'):
+                        action['user_id'] = self._default_user_id()
+                    self.publish_executor.submit(action)
+            except Exception as e:
+                if action['type'] == 'login':
+                    # 登录阶段失败时，尽量释放浏览器资源，避免后续启动不稳定
+                    try:
+                        if self.poster:
+                            await self.poster.close(force=True)
+                    except Exception:
+                        pass
+                    finally:
+                        self.poster = None
+
+                    # 登录失败：更新数据库状态（不影响错误上报）
+                    try:
+                        from src.core.services.user_service import user_service
+
+                        phone = (action.get('phone') or "").strip()
+                        if phone:
+                            u = user_service.get_user_by_phone(phone)
+                            if u:
+                                user_service.update_login_status(u.id, False)
+                    except Exception:
+                        pass
+
+                    msg = str(e)
+                    if "Executable doesn't exist" in msg:
+                        msg += "\n\n可能原因：Playwright 浏览器未安装/被杀毒清理。"
+                        msg += "\n解决："
+                        msg += "\n  - macOS/Linux："
+                        msg += "\n    PLAYWRIGHT_BROWSERS_PATH=\"$HOME/.xhs_system/ms-playwright\" python -m playwright install chromium"
+                        msg += "\n  - Windows（PowerShell）："
+                        msg += "\n    $env:PLAYWRIGHT_BROWSERS_PATH=\"$HOME\\.xhs_system\\ms-playwright\"; python -m playwright install chromium"
+                    self.login_error.emit(msg)
+                elif action['type'] == 'preview':
+                    self.preview_error.emit(str(e))
+                elif action['type'] == 'scheduled_publish':
+                    task_id = str(action.get('task_id') or "")
+                    self.scheduled_task_result.emit(task_id, False, str(e))
+
+        # 退出前结束未完成的定时发布（各任务会关闭自己打开的浏览器），再释放当前会话的浏览器
+        await self.publish_executor.shutdown()
+        if self.poster:
+            try:
+                await self.poster.close(force=True)
+            except Exception:
+                pass
 
-                        # 登录失败：更新数据库状态（不影响错误上报）
-                        try:
-                            from src.core.services.user_service import user_service
-
-                            phone = (action.get('phone') or "").strip()
-                            if phone:
-                                u = user_service.get_user_by_phone(phone)
-                                if u:
-                                    user_service.update_login_status(u.id, False)
-                        except Exception:
-                            pass
-
-                        msg = str(e)
-                        if "Executable doesn't exist" in msg:
-                            msg += "\n\n可能原因：Playwright 浏览器未安装/被杀毒清理。"
-                            msg += "\n解决："
-                            msg += "\n  - macOS/Linux："
-                            msg += "\n    PLAYWRIGHT_BROWSERS_PATH=\"$HOME/.xhs_system/ms-playwright\" python -m playwright install chromium"
-                            msg += "\n  - Windows（PowerShell）："
-                            msg += "\n    $env:PLAYWRIGHT_BROWSERS_PATH=\"$HOME\\.xhs_system\\ms-playwright\"; python -m playwright install chromium"
-                        self.login_error.emit(msg)
-                    elif action['type'] == 'preview':
-                        self.preview_error.emit(str(e))
-                    elif action['type'] == 'scheduled_publish':
-                        task_id = str(action.get('task_id') or "")
-                        self.scheduled_task_result.emit(task_id, False, str(e))
-            # 使用异步sleep而不是QThread.msleep
-            await asyncio.sleep(0.1)  # 避免CPU占用过高
+    def enqueue_action(self, action: dict):
+        """提交一个动作（可在任意线程调用）；登录/预览优先于定时发布，同优先级按提交顺序。"""
+        priority = ACTION_PRIORITIES.get(str(action.get("type") or ""), 5)
+        self._put_action((priority, next(self._action_seq), action))
+
+    def _put_action(self, item):
+        with self._actions_lock:
+            if self._actions is None:
+                self._pending_actions.append(item)
+                return
+            loop = self.loop
+        try:
+            loop.call_soon_threadsafe(self._actions.put_nowait, item)
+        except RuntimeError:
+            # 事件循环已关闭（线程已退出）
+            pass
+
+    def _account_lock(self, user_id):
+        return self.publish_executor.account_lock(PublishExecutor.account_key({"user_id": user_id}))
+
+    def _on_scheduled_publish_error(self, action: dict, error: BaseException):
+        self.scheduled_task_result.emit(str(action.get("task_id") or ""), False, str(error))
+
+    @staticmethod
+    def _default_user_id():
+        """未指定账号的定时任务使用当前用户。"""
+        try:
+            from src.core.services.user_service import user_service
+
+            current_user = user_service.get_current_user()
+            return current_user.id if current_user else None
+        except Exception:
+            return None
 
     async def _run_scheduled_publish(self, action: dict):
         """执行定时发布（无人值守，自动点击发布）。"""
@@ -198,7 +268,9 @@ class BrowserThread(QThread):
 
         if task_type == "hotspot":
             loop = asyncio.get_running_loop()
-            payload = await loop.run_in_executor(None, partial(self._build_hotspot_payload_sync, action))
+            payload = await loop.run_in_executor(None, partial(self._load_pregenerated_payload, action))
+            if not payload:
+                payload = await loop.run_in_executor(None, partial(self._build_hotspot_payload_sync, action))
             title = str(payload.get("title") or "").strip()
             content = str(payload.get("content") or "").strip()
             images = payload.get("images") or []
@@ -215,7 +287,11 @@ class BrowserThread(QThread):
             if not title and not content:
                 raise RuntimeError("发布失败：标题/正文为空")
 
-            # 固定内容任务：若未提供图片，则到点自动生成模板图/占位图
+            # 固定内容任务：若未提供图片，优先使用预生成的图片，否则到点自动生成模板图/占位图
+            if not images:
+                loop = asyncio.get_running_loop()
+                payload = await loop.run_in_executor(None, partial(self._load_pregenerated_payload, action))
+                images = list((payload or {}).get("images") or [])
             if not images:
                 cover_template_id = str(action.get("cover_template_id") or "").strip()
                 try:
@@ -223,7 +299,11 @@ class BrowserThread(QThread):
                 except Exception:
                     page_count = 3
                 page_count = max(1, page_count)
-                images = self._generate_images_for_text(title=title, content=content, cover_template_id=cover_template_id, page_count=page_count)
+                # 出图放到线程池，避免阻塞其它账号并发中的发布
+                images = await loop.run_in_executor(
+                    None,
+                    partial(self._generate_images_for_text, title=title, content=content, cover_template_id=cover_template_id, page_count=page_count),
+                )
                 if isinstance(images, (list, tuple)):
                     images = [p for p in images if isinstance(p, str) and p and os.path.isfile(p)]
                 else:
@@ -231,13 +311,7 @@ class BrowserThread(QThread):
 
         # 默认使用当前用户
         if not user_id:
-            try:
-                from src.core.services.user_service import user_service
-
-                current_user = user_service.get_current_user()
-                user_id = current_user.id if current_user else None
-            except Exception:
-                user_id = None
+            user_id = self._default_user_id()
 
         # 读取该用户默认浏览器环境（代理/指纹）
         browser_env = None
@@ -282,7 +356,8 @@ class BrowserThread(QThread):
         try:
             target_uid = int(user_id) if user_id else None
 
-            # 优先复用当前线程已登录的 poster，避免 persistent profile 目录被同时打开导致启动失败。
+            # 优先复用当前线程已登录的 poster，避免 persistent profile 目录被同时打开导致启动失败；
+            # 其它账号各自新建 poster（独立 profile/cookies），由执行器保证同账号不会并发。
             if self.poster and getattr(self.poster, "user_id", None) == target_uid:
                 poster = self.poster
             else:
@@ -301,6 +376,16 @@ class BrowserThread(QThread):
             except Exception:
                 pass
 
+    @staticmethod
+    def _load_pregenerated_payload(action: dict):
+        """读取提前生成的标题/正文/图片（热点榜单变化或无缓存时返回 None）。"""
+        try:
+            from src.core.scheduler.pregenerate import task_pregenerator
+
+            return task_pregenerator.load_fresh(action)
+        except Exception:
+            return None
+
     @classmethod
     def _generate_images_for_text(cls, *, title: str, content: str, cover_template_id: str = "", page_count: int = 3):
         """为固定内容任务生成图片（优先系统模板，失败则回退占位图）。"""
@@ -446,6 +531,11 @@ class BrowserThread(QThread):
         rank = max(1, rank)
 
         use_ctx = bool(action.get("use_hotspot_context", True))
+        # 失败重试时复用上一次生成的文案（响应缓存）；首次执行总是重新生成
+        try:
+            reuse_llm = int(action.get("retry_count") or 0) > 0
+        except Exception:
+            reuse_llm = False
         cover_template_id = str(action.get("cover_template_id") or "").strip()
         try:
             page_count = int(action.get("page_count") or 3)
@@ -495,6 +585,7 @@ class BrowserThread(QThread):
                 topic=llm_topic,
                 header_title=header_title,
                 author=author,
+                use_cache=reuse_llm,
             )
             generated_title = str(getattr(resp, "title", "") or "").strip()
             generated_content = str(getattr(resp, "content", "") or "").strip()
@@ -513,7 +604,7 @@ class BrowserThread(QThread):
                 from src.core.services.llm_service import llm_service
                 from src.core.services.marketing_poster_service import marketing_poster_service
 
-                poster_content = llm_service.generate_marketing_poster_content(topic=topic)
+                poster_content = llm_service.generate_marketing_poster_content(topic=topic, use_cache=reuse_llm)
                 try:
                     asset_path = str(Config().get_templates_config().get("marketing_poster_asset_path") or "").strip()
                 except Exception:
@@ -575,6 +666,5 @@ class BrowserThread(QThread):
 
     def stop(self):
         self.is_running = False
-        # 确保浏览器资源被释放
-        if self.poster and self.loop and self.loop.is_running():
-            asyncio.run_coroutine_threadsafe(self.poster.close(force=True), self.loop)
+        # 唤醒阻塞在队列上的主循环；主循环退出前会关闭浏览器，确保资源被释放
+        self._put_action((-1, next(self._action_seq), None))
@@ -10,6 +10,7 @@ import mimetypes
 
 from .logger import logger
 from .config import config
+from .services.image_store import ImageStore, image_store
 
 
 @dataclass
@@ -252,8 +253,13 @@ class ContentManager:
         image_path = self.images_dir / filename
         
         try:
-            with open(image_path, 'wb') as f:
-                f.write(image_data)
+            # 总是写到本内容自己的路径（delete_content 会删除该路径）；
+            # 相同内容通过图片存储硬链接到同一份数据，磁盘上不重复占用
+            if ImageStore.enabled():
+                image_store.put_bytes(image_data, image_path)
+            else:
+                with open(image_path, 'wb') as f:
+                    f.write(image_data)
             
             logger.info(f"保存图片: {image_path}")
             return str(image_path)
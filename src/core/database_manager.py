@@ -199,7 +199,8 @@ class DatabaseManager:
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS scheduled_tasks (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER NOT NULL,
+                task_key VARCHAR(64) UNIQUE,
+                user_id INTEGER,
                 template_id INTEGER,
                 name TEXT NOT NULL,
                 platform TEXT NOT NULL,
@@ -209,12 +210,23 @@ class DatabaseManager:
                 last_run_time TIMESTAMP,
                 next_run_time TIMESTAMP,
                 run_count INTEGER DEFAULT 0,
+                status TEXT DEFAULT 'pending',
+                task_type TEXT DEFAULT 'fixed',
+                title TEXT,
+                content TEXT,
+                payload TEXT,
+                retry_count INTEGER DEFAULT 0,
+                max_retries INTEGER DEFAULT 3,
+                error_message TEXT,
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE,
                 FOREIGN KEY (template_id) REFERENCES content_templates (id) ON DELETE SET NULL
             )
         ''')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS ix_scheduled_tasks_status_time ON scheduled_tasks (status, schedule_time)
+        ''')
     
     def _create_default_data(self, cursor):
         """创建默认数据"""
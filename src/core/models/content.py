@@ -4,7 +4,7 @@
 """
 
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, ForeignKey, JSON
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, ForeignKey, JSON, Index
 from sqlalchemy.orm import relationship
 
 # 从user模块导入Base
@@ -89,11 +89,16 @@ class PublishHistory(Base):
 
 
 class ScheduledTask(Base):
-    """定时任务模型"""
+    """定时任务模型（定时发布调度器的持久化表，见 src/core/scheduler/task_store.py）"""
     __tablename__ = 'scheduled_tasks'
+    __table_args__ = (
+        # 调度器按 (状态, 时间) 查询到期任务
+        Index('ix_scheduled_tasks_status_time', 'status', 'schedule_time'),
+    )
     
     id = Column(Integer, primary_key=True, autoincrement=True)
-    user_id = Column(Integer, ForeignKey('users.id'), nullable=False, comment='用户ID')
+    task_key = Column(String(64), unique=True, index=True, comment='调度器任务ID')
+    user_id = Column(Integer, ForeignKey('users.id'), nullable=True, comment='用户ID（为空时使用当前账号）')
     template_id = Column(Integer, ForeignKey('content_templates.id'), comment='模板ID')
     name = Column(String(100), nullable=False, comment='任务名称')
     platform = Column(String(50), nullable=False, comment='发布平台')
@@ -103,6 +108,14 @@ class ScheduledTask(Base):
     last_run_time = Column(DateTime, comment='最后运行时间')
     next_run_time = Column(DateTime, comment='下次运行时间')
     run_count = Column(Integer, default=0, comment='运行次数')
+    status = Column(String(20), default='pending', comment='状态: pending, running, completed, failed')
+    task_type = Column(String(20), default='fixed', comment='任务类型: fixed, hotspot')
+    title = Column(String(200), comment='标题')
+    content = Column(Text, comment='正文')
+    payload = Column(Text, comment='其余任务参数（JSON：图片、热点配置、页数等）')
+    retry_count = Column(Integer, default=0, comment='已重试次数')
+    max_retries = Column(Integer, default=3, comment='最大重试次数')
+    error_message = Column(Text, comment='最近一次错误')
     created_at = Column(DateTime, default=datetime.utcnow, comment='创建时间')
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, comment='更新时间')
     
@@ -127,6 +140,11 @@ class ScheduledTask(Base):
             'last_run_time': self.last_run_time.isoformat() if self.last_run_time else None,
             'next_run_time': self.next_run_time.isoformat() if self.next_run_time else None,
             'run_count': self.run_count,
+            'task_key': self.task_key,
+            'status': self.status,
+            'task_type': self.task_type,
+            'title': self.title,
+            'retry_count': self.retry_count,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
         } 
\ No newline at end of file
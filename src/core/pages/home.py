@@ -2,7 +2,7 @@ import shutil
 import time
 
 from PyQt5.QtCore import Qt, QUrl
-from PyQt5.QtGui import QColor, QPixmap, QDesktopServices
+from PyQt5.QtGui import QColor, QPixmap, QDesktopServices, QTextCursor
 from PyQt5.QtWidgets import (QFrame, QHBoxLayout, QLabel, QLineEdit,
                              QPushButton, QTextEdit, QVBoxLayout, QWidget, QMessageBox, QComboBox, QFileDialog, QInputDialog)
 
@@ -1031,7 +1031,7 @@ class HomePage(QWidget):
             self.parent.update_login_button("⏳ 登录中...", False)
 
             # 添加登录任务到浏览器线程
-            self.parent.browser_thread.action_queue.append({
+            self.parent.browser_thread.enqueue_action({
                 'type': 'login',
                 'phone': phone,
                 'country_code': self.get_country_code(),
@@ -1070,6 +1070,11 @@ class HomePage(QWidget):
                 self.handle_generation_result)
             self.parent.generator_thread.error.connect(
                 self.handle_generation_error)
+            self._streaming_started = False
+            # 流式输出会覆盖正文编辑器：先保存原文，生成失败时恢复
+            self._text_before_stream = self.subtitle_input.toPlainText()
+            self.parent.generator_thread.partial.connect(
+                self.handle_generation_partial)
             self.parent.generator_thread.start()
 
         except Exception as e:
@@ -1077,6 +1082,27 @@ class HomePage(QWidget):
             self.generate_btn.setEnabled(True)  # 恢复按钮可点击状态
             TipWindow(self.parent, f"❌ 生成内容失败: {str(e)}").show()
 
+    def handle_generation_partial(self, delta):
+        """流式生成：把模型增量文本实时追加到正文编辑器（完成后会被解析结果覆盖）
+
+        空字符串表示切换到备用端点重新输出，清空已追加的内容。
+        """
+        try:
+            if not delta:
+                if getattr(self, "_streaming_started", False):
+                    self.subtitle_input.clear()
+                return
+            if not getattr(self, "_streaming_started", False):
+                self._streaming_started = True
+                self.subtitle_input.clear()
+            cursor = self.subtitle_input.textCursor()
+            cursor.movePosition(QTextCursor.End)
+            cursor.insertText(delta)
+            self.subtitle_input.setTextCursor(cursor)
+            self.subtitle_input.ensureCursorVisible()
+        except Exception:
+            pass
+
     def handle_generation_result(self, result):
         try:
             info_reason = (result or {}).get("info_reason") if isinstance(result, dict) else ""
@@ -1098,6 +1124,14 @@ class HomePage(QWidget):
         """处理生成错误，提供用户友好的错误信息和解决建议"""
         print(f"错误信息: {error_message}")
 
+        # 流式输出已覆盖正文编辑器：恢复生成前的原文
+        if getattr(self, "_streaming_started", False):
+            self._streaming_started = False
+            try:
+                self.subtitle_input.setPlainText(getattr(self, "_text_before_stream", ""))
+            except Exception:
+                pass
+
         # 根据错误类型提供具体的用户友好提示
         if "模型配置不可用" in error_message or "LLMServiceError" in error_message:
             user_message = (
@@ -1320,7 +1354,7 @@ class HomePage(QWidget):
             self.parent.update_preview_button("⏳ 发布中...", False)
 
             # 添加预览任务到浏览器线程
-            self.parent.browser_thread.action_queue.append({
+            self.parent.browser_thread.enqueue_action({
                 'type': 'preview',
                 'title': title,
                 'content': content,
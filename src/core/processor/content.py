@@ -15,6 +15,7 @@ from src.core.services.system_image_template_service import system_image_templat
 class ContentGeneratorThread(QThread):
     finished = pyqtSignal(dict)
     error = pyqtSignal(str)
+    partial = pyqtSignal(str)  # 流式生成时的增量文本
 
     def __init__(self, input_text, header_title, author, generate_btn):
         super().__init__()
@@ -253,10 +254,20 @@ class ContentGeneratorThread(QThread):
             self.generate_btn.setText("🤖 AI生成中...")
             self.generate_btn.setEnabled(False)
 
+            # 默认流式请求，让编辑器尽快显示首批内容；如需关闭可设置：XHS_LLM_STREAM=0/false/off
+            stream_enabled = os.environ.get("XHS_LLM_STREAM", "").strip().lower() not in {
+                "0",
+                "false",
+                "no",
+                "n",
+                "off",
+            }
+
             llm_resp = llm_service.generate_xiaohongshu_content(
                 topic=self.input_text,
                 header_title=self.header_title,
                 author=self.author,
+                stream_callback=self.partial.emit if stream_enabled else None,
             )
 
             cover_path = ""
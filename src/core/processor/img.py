@@ -10,6 +10,8 @@ from PyQt5.QtGui import QPixmap, QImage
 
 from PIL import Image
 
+from src.core.services.image_store import ImageStore, image_store
+
 
 class ImageProcessorThread(QThread):
     finished = pyqtSignal(list, list)  # 发送图片路径列表和图片信息列表
@@ -107,9 +109,12 @@ class ImageProcessorThread(QThread):
                 img_path = os.path.join(self.img_dir, f'{title}{ext}')
                 os.makedirs(os.path.dirname(img_path), exist_ok=True)
 
-                # 保存原始图片（保持现有行为：覆盖同名文件）
-                with open(img_path, 'wb') as f:
-                    f.write(content)
+                # 保存原始图片（保持现有行为：覆盖同名文件）；相同内容在图片存储中只保留一份
+                if ImageStore.enabled():
+                    image_store.put_bytes(content, img_path)
+                else:
+                    with open(img_path, 'wb') as f:
+                        f.write(content)
 
                 # 处理图片预览
                 image = Image.open(io.BytesIO(content))
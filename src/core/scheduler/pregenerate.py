@@ -0,0 +1,263 @@
+"""
+定时任务内容预生成（提前 T 分钟准备标题/正文/图片）
+
+热点任务原先在到点时才抓热点、查百度摘要、调用大模型并出图，真正开始发布往往比计划时间晚几分钟；
+未带图片的固定内容任务到点时也要先出图。这里在 schedule_time 前 T 分钟预先生成，结果缓存到
+~/.xhs_system/scheduled_assets/<task_id>/pregen/：
+- manifest.json 记录生成时的“指纹”（热点来源/名次/该名次的热点标题、模板、页数；固定任务为标题/正文摘要）
+- 到点发布时只需核对指纹：热点榜单该名次的话题没变就直接上传缓存内容，变了才重新生成
+- 预生成时指纹未变则不重复生成；发布成功后清除缓存（循环热点任务下一轮重新生成）
+
+- 提前量：XHS_SCHEDULE_PREGEN_MINUTES（分钟，默认 15；0 关闭）
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+DEFAULT_LOOKAHEAD_MINUTES = 15.0
+
+
+def lookahead_minutes() -> float:
+    try:
+        value = float((os.environ.get("XHS_SCHEDULE_PREGEN_MINUTES") or "").strip() or DEFAULT_LOOKAHEAD_MINUTES)
+    except Exception:
+        value = DEFAULT_LOOKAHEAD_MINUTES
+    return max(0.0, value)
+
+
+def needs_pregeneration(task: Dict) -> bool:
+    """热点任务，或到点才需要出图的固定内容任务。"""
+    task_type = str(task.get("task_type") or "fixed").strip() or "fixed"
+    if task_type == "hotspot":
+        return True
+    images = task.get("images") or []
+    return not any(isinstance(p, str) and p and os.path.isfile(p) for p in images)
+
+
+def _int(value, default: int) -> int:
+    try:
+        return int(value or default)
+    except Exception:
+        return default
+
+
+def _default_fetch_topic(task: Dict) -> str:
+    """当前热点榜单中该任务名次对应的话题（与 _build_hotspot_payload_sync 的取法一致）。"""
+    from src.core.services.hotspot_service import hotspot_service
+
+    source = str(task.get("hotspot_source") or "weibo").strip().lower() or "weibo"
+    rank = max(1, _int(task.get("hotspot_rank"), 1))
+    items = hotspot_service.fetch(source, limit=max(50, rank))
+    if not items:
+        return ""
+    item = items[rank - 1] if len(items) >= rank else items[0]
+    return str(getattr(item, "title", "") or "").strip()
+
+
+def _default_build(task: Dict) -> Dict:
+    from src.core.browser import BrowserThread
+
+    task_type = str(task.get("task_type") or "fixed").strip() or "fixed"
+    if task_type == "hotspot":
+        return BrowserThread._build_hotspot_payload_sync(task)
+
+    title = str(task.get("title") or "")
+    content = str(task.get("content") or "")
+    images = BrowserThread._generate_images_for_text(
+        title=title,
+        content=content,
+        cover_template_id=str(task.get("cover_template_id") or "").strip(),
+        page_count=max(1, _int(task.get("page_count"), 3)),
+    )
+    return {"title": title, "content": content, "images": images}
+
+
+class TaskPregenerator:
+    """
+    预生成并缓存定时任务的发布内容（线程安全）。
+
+    submit() 在后台线程中生成；load_fresh() 在发布时调用（会阻塞等待同一任务正在进行的预生成）。
+    """
+
+    def __init__(
+        self,
+        assets_root: Optional[str] = None,
+        *,
+        build: Callable[[Dict], Dict] = _default_build,
+        fetch_topic: Callable[[Dict], str] = _default_fetch_topic,
+    ):
+        self.assets_root = Path(assets_root) if assets_root else Path(os.path.expanduser("~")) / ".xhs_system" / "scheduled_assets"
+        self._build = build
+        self._fetch_topic = fetch_topic
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, Future] = {}
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def _dir(self, task_id: str) -> Path:
+        return self.assets_root / str(task_id) / "pregen"
+
+    @staticmethod
+    def _fingerprint(task: Dict, topic: str = "") -> Dict:
+        task_type = str(task.get("task_type") or "fixed").strip() or "fixed"
+        fp = {
+            "task_type": task_type,
+            "cover_template_id": str(task.get("cover_template_id") or "").strip(),
+            "page_count": max(1, _int(task.get("page_count"), 3)),
+        }
+        if task_type == "hotspot":
+            fp.update(
+                {
+                    "hotspot_source": str(task.get("hotspot_source") or "weibo").strip().lower() or "weibo",
+                    "hotspot_rank": max(1, _int(task.get("hotspot_rank"), 1)),
+                    "use_hotspot_context": bool(task.get("use_hotspot_context", True)),
+                    "topic": topic,
+                }
+            )
+        else:
+            text = f"{task.get('title') or ''}\n{task.get('content') or ''}"
+            fp["text_sha1"] = hashlib.sha1(text.encode("utf-8")).hexdigest()
+        return fp
+
+    def _current_fingerprint(self, task: Dict) -> Optional[Dict]:
+        topic = ""
+        if (str(task.get("task_type") or "").strip() or "fixed") == "hotspot":
+            try:
+                topic = self._fetch_topic(task)
+            except Exception as e:
+                logging.warning(f"预生成：获取热点榜单失败: {e}")
+                return None
+            if not topic:
+                return None
+        return self._fingerprint(task, topic)
+
+    def load(self, task_id: str) -> Optional[Dict]:
+        """读取缓存（图片缺失时视为无缓存）。"""
+        path = self._dir(task_id) / "manifest.json"
+        try:
+            manifest = json.loads(path.read_text(encoding="utf-8"))
+        except Exception:
+            return None
+        images = [p for p in manifest.get("images") or [] if isinstance(p, str) and os.path.isfile(p)]
+        if not images or len(images) != len(manifest.get("images") or []):
+            return None
+        return manifest
+
+    def load_fresh(self, task: Dict) -> Optional[Dict]:
+        """
+        发布时取缓存：等待进行中的预生成，并核对指纹（热点任务会重新拉取一次榜单）。
+
+        返回 {"title", "content", "images", ...}；无缓存或热点已变化时返回 None（由调用方现场生成）。
+        """
+        task_id = str(task.get("task_id") or "")
+        if not task_id:
+            return None
+        with self._lock:
+            future = self._inflight.get(task_id)
+        if future is not None:
+            try:
+                future.result()
+            except Exception:
+                pass
+
+        manifest = self.load(task_id)
+        if manifest is None:
+            return None
+        if manifest.get("fingerprint") != self._current_fingerprint(task):
+            logging.info(f"预生成内容已过期（热点榜单或任务内容变化）: {task_id}")
+            return None
+        return manifest
+
+    def prepare(self, task: Dict) -> str:
+        """同步预生成；返回 "reused"（指纹未变）/"generated"/"skipped"（无法判断热点时）。"""
+        task_id = str(task.get("task_id") or "")
+        fingerprint = self._current_fingerprint(task)
+        if not task_id or fingerprint is None:
+            return "skipped"
+
+        manifest = self.load(task_id)
+        if manifest is not None and manifest.get("fingerprint") == fingerprint:
+            return "reused"
+
+        payload = self._build(task) or {}
+        if fingerprint["task_type"] == "hotspot":
+            # 生成过程中榜单可能刷新：以实际采用的热点为准
+            topic = str(payload.get("hotspot_title") or "").strip() or fingerprint["topic"]
+            fingerprint = self._fingerprint(task, topic)
+
+        root = self._dir(task_id)
+        version_dir = root / str(int(time.time() * 1000))
+        version_dir.mkdir(parents=True, exist_ok=True)
+        images: List[str] = []
+        for idx, src in enumerate(p for p in payload.get("images") or [] if isinstance(p, str) and os.path.isfile(p)):
+            ext = os.path.splitext(src)[1].lower() or ".jpg"
+            dst = version_dir / (f"cover{ext}" if idx == 0 else f"content_{idx}{ext}")
+            shutil.copy2(src, dst)
+            images.append(str(dst))
+        if not images:
+            shutil.rmtree(version_dir, ignore_errors=True)
+            raise RuntimeError("预生成失败：图片为空")
+
+        manifest = {
+            "fingerprint": fingerprint,
+            "title": str(payload.get("title") or ""),
+            "content": str(payload.get("content") or ""),
+            "images": images,
+            "hotspot_title": str(payload.get("hotspot_title") or ""),
+            "prepared_at": time.time(),
+        }
+        tmp = root / "manifest.json.tmp"
+        tmp.write_text(json.dumps(manifest, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, root / "manifest.json")
+
+        # 清理旧版本图片（新 manifest 已生效）
+        for child in root.iterdir():
+            if child.is_dir() and child != version_dir:
+                shutil.rmtree(child, ignore_errors=True)
+        logging.info(f"已预生成定时任务内容: {task_id} ({len(images)} 张图片)")
+        return "generated"
+
+    def submit(self, task: Dict) -> Optional[Future]:
+        """在后台线程中预生成（同一任务进行中时不重复提交）。"""
+        task_id = str(task.get("task_id") or "")
+        if not task_id:
+            return None
+        with self._lock:
+            future = self._inflight.get(task_id)
+            if future is not None and not future.done():
+                return future
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="schedule-pregen")
+            future = self._executor.submit(self._prepare_logged, dict(task))
+            self._inflight[task_id] = future
+        future.add_done_callback(lambda f, key=task_id: self._forget(key, f))
+        return future
+
+    def _prepare_logged(self, task: Dict) -> str:
+        try:
+            return self.prepare(task)
+        except Exception as e:
+            logging.warning(f"预生成定时任务内容失败: {task.get('task_id')}: {e}")
+            return "failed"
+
+    def _forget(self, task_id: str, future: Future) -> None:
+        with self._lock:
+            if self._inflight.get(task_id) is future:
+                self._inflight.pop(task_id, None)
+
+    def discard(self, task_id: str) -> None:
+        """清除缓存（发布成功后调用）。"""
+        shutil.rmtree(self._dir(task_id), ignore_errors=True)
+
+
+# 全局预生成器
+task_pregenerator = TaskPregenerator()
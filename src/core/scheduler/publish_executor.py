@@ -0,0 +1,115 @@
+"""
+定时发布执行器（多账号并发）
+
+原先 BrowserThread 逐个 await 定时发布：每次发布中有数十次 sleep/wait_for_timeout 等待，
+多个账号的任务只能排队串行执行。这里在浏览器线程的事件循环中并发调度：
+- 全局并发上限：XHS_PUBLISH_CONCURRENCY（默认 2，同时最多打开这么多个发布浏览器）
+- 单账号串行：同一 user_id 的任务按提交顺序逐个执行（同一个 persistent profile 目录不能被同时打开）
+- 先拿账号锁再占全局名额：排队等同账号的任务不会占住其它账号可用的名额
+
+各账号使用各自的 XiaohongshuPoster（~/.xhs_system/users/<id> 下独立的 profile/cookies），
+由 run_task 负责创建与关闭；执行器只负责排队与并发控制。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Set
+
+DEFAULT_CONCURRENCY = 2
+
+
+def concurrency_from_env() -> int:
+    try:
+        value = int((os.environ.get("XHS_PUBLISH_CONCURRENCY") or "").strip() or DEFAULT_CONCURRENCY)
+    except Exception:
+        value = DEFAULT_CONCURRENCY
+    return max(1, value)
+
+
+class PublishExecutor:
+    """
+    在当前事件循环中并发执行发布任务（需在事件循环线程内调用 submit）。
+
+    run_task(action) 抛出的异常交给 on_error(action, exc)；未提供 on_error 时忽略。
+    """
+
+    def __init__(
+        self,
+        run_task: Callable[[Dict[str, Any]], Awaitable[Any]],
+        *,
+        max_concurrency: Optional[int] = None,
+        on_error: Optional[Callable[[Dict[str, Any], BaseException], None]] = None,
+    ):
+        self._run_task = run_task
+        self._on_error = on_error
+        self.max_concurrency = max(1, int(max_concurrency or concurrency_from_env()))
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._account_locks: Dict[Hashable, asyncio.Lock] = {}
+        self._tasks: Set[asyncio.Task] = set()
+        self._active = 0
+
+    @staticmethod
+    def account_key(action: Dict[str, Any]) -> Hashable:
+        user_id = action.get("user_id")
+        try:
+            return int(user_id) if user_id not in (None, "") else "default"
+        except Exception:
+            return str(user_id)
+
+    @property
+    def active_count(self) -> int:
+        """正在执行（已占用全局名额）的任务数。"""
+        return self._active
+
+    @property
+    def pending_count(self) -> int:
+        """已提交但尚未结束的任务数（含排队中）。"""
+        return len(self._tasks)
+
+    def account_lock(self, key: Hashable) -> asyncio.Lock:
+        """某个账号的串行锁；交互操作（预览）与该账号的定时发布共用，避免同时操作同一浏览器 profile。"""
+        lock = self._account_locks.get(key)
+        if lock is None:
+            lock = self._account_locks[key] = asyncio.Lock()
+        return lock
+
+    def submit(self, action: Dict[str, Any]) -> asyncio.Task:
+        """提交一个任务，立即返回；任务在后台按账号串行、全局限流执行。"""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        task = asyncio.get_running_loop().create_task(self._run(action))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def _run(self, action: Dict[str, Any]) -> None:
+        async with self.account_lock(self.account_key(action)):
+            async with self._semaphore:
+                self._active += 1
+                try:
+                    await self._run_task(action)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    if self._on_error:
+                        try:
+                            self._on_error(action, e)
+                        except Exception:
+                            pass
+                finally:
+                    self._active -= 1
+
+    async def join(self) -> None:
+        """等待所有已提交的任务结束。"""
+        while self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+
+    async def shutdown(self) -> None:
+        """取消所有未结束的任务并等待其退出（各任务的 finally 中会关闭各自的浏览器）。"""
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
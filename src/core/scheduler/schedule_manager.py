@@ -12,7 +12,14 @@ from datetime import datetime, timedelta
 from typing import List, Dict, Optional
 import logging
 
-from PyQt5.QtCore import QObject, pyqtSignal, pyqtSlot, QTimer
+from PyQt5.QtCore import QObject, pyqtSignal, pyqtSlot
+
+from src.core.scheduler.pregenerate import lookahead_minutes, needs_pregeneration, task_pregenerator
+from src.core.scheduler.task_store import ScheduleTaskStore
+from src.core.scheduler.timer_queue import TimerQueue
+
+# 到期队列中“预生成”项的键前缀（与任务本身的到期项共用一个队列）
+PREGEN_KEY_PREFIX = "pregen:"
 
 
 class ScheduleTask:
@@ -107,23 +114,28 @@ class ScheduleManager(QObject):
     task_completed = pyqtSignal(str)  # 任务完成信号
     task_failed = pyqtSignal(str, str)  # 任务失败信号
     task_execute_requested = pyqtSignal(object)  # 请求外部执行任务（dict）
+    tasks_due = pyqtSignal(list)  # 到期任务 ID（由计时线程发出，排队到主线程执行）
     
     def __init__(self):
         super().__init__()
         self.tasks: List[ScheduleTask] = []
         self.running = False
-        self.check_interval = 60  # 每60秒检查一次
-        self.timer = QTimer()
-        self.timer.timeout.connect(self.check_tasks)
+        # 按 schedule_time 排序的到期队列：只等待最近到期的任务，到期后经 tasks_due 信号回到主线程
+        self.timer_queue = TimerQueue(self.tasks_due.emit)
+        self.tasks_due.connect(self._run_due_tasks)
+        # 提前 XHS_SCHEDULE_PREGEN_MINUTES 分钟预生成热点/待出图任务的内容
+        self.pregenerator = task_pregenerator
         
         # 配置文件路径
         self.config_dir = os.path.expanduser('~/.xhs_system')
+        # 旧版任务文件：首次启动时导入数据库（scheduled_tasks 表）
         self.tasks_file = os.path.join(self.config_dir, 'schedule_tasks.json')
         
         # 确保目录存在
         if not os.path.exists(self.config_dir):
             os.makedirs(self.config_dir)
         
+        self.store = ScheduleTaskStore()
         self.load_tasks()
         self.start_scheduler()
     
@@ -131,22 +143,55 @@ class ScheduleManager(QObject):
         """加载定时任务"""
         try:
             if os.path.exists(self.tasks_file):
-                with open(self.tasks_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    self.tasks = [ScheduleTask.from_dict(task_data) for task_data in data]
-                logging.info(f"已加载 {len(self.tasks)} 个定时任务")
+                self.store.migrate_json(self.tasks_file)
+        except Exception as e:
+            logging.error(f"迁移定时任务文件失败: {str(e)}")
+        try:
+            self.tasks = [ScheduleTask.from_dict(task_data) for task_data in self.store.load_all()]
+            logging.info(f"已加载 {len(self.tasks)} 个定时任务")
         except Exception as e:
             logging.error(f"加载定时任务失败: {str(e)}")
+        self._arm_all_tasks()
+
+    def _find_task(self, task_id: str) -> Optional[ScheduleTask]:
+        for task in self.tasks:
+            if task.task_id == task_id:
+                return task
+        return None
+
+    def _arm_task(self, task: ScheduleTask):
+        """按任务状态更新到期队列：pending 入队（或改期），其余状态移出；需要预生成的任务另挂一个提前量的项。"""
+        pregen_key = PREGEN_KEY_PREFIX + task.task_id
+        if task.status == "pending":
+            self.timer_queue.schedule(task.task_id, task.schedule_time.timestamp())
+            minutes = lookahead_minutes()
+            if minutes > 0 and needs_pregeneration(task.to_dict()):
+                self.timer_queue.schedule(pregen_key, task.schedule_time.timestamp() - minutes * 60)
+            else:
+                self.timer_queue.cancel(pregen_key)
+        else:
+            self.timer_queue.cancel(task.task_id)
+            self.timer_queue.cancel(pregen_key)
+
+    def _arm_all_tasks(self):
+        self.timer_queue.clear()
+        for task in self.tasks:
+            self._arm_task(task)
     
     def save_tasks(self):
-        """保存定时任务"""
+        """保存全部定时任务（通常只需 save_task 保存发生变化的那一条）"""
         try:
-            with open(self.tasks_file, 'w', encoding='utf-8') as f:
-                json.dump([task.to_dict() for task in self.tasks], 
-                         f, indent=2, ensure_ascii=False)
+            self.store.upsert_many(task.to_dict() for task in self.tasks)
         except Exception as e:
             logging.error(f"保存定时任务失败: {str(e)}")
 
+    def save_task(self, task: ScheduleTask):
+        """保存单条定时任务（按行写入数据库）"""
+        try:
+            self.store.upsert(task.to_dict())
+        except Exception as e:
+            logging.error(f"保存定时任务失败: {task.task_id}: {str(e)}")
+
     def _copy_task_images(self, task_id: str, images: List[str]) -> List[str]:
         """将任务图片复制到稳定目录，避免后续生成覆盖导致定时任务引用错误图片。"""
         if not images:
@@ -219,7 +264,8 @@ class ScheduleManager(QObject):
         )
         
         self.tasks.append(task)
-        self.save_tasks()
+        self.save_task(task)
+        self._arm_task(task)
         
         logging.info(f"添加定时任务: {task_id} - {schedule_time}")
         return task_id
@@ -229,7 +275,12 @@ class ScheduleManager(QObject):
         for i, task in enumerate(self.tasks):
             if task.task_id == task_id:
                 del self.tasks[i]
-                self.save_tasks()
+                try:
+                    self.store.delete([task_id])
+                except Exception as e:
+                    logging.error(f"删除定时任务失败: {task_id}: {str(e)}")
+                self.timer_queue.cancel(task_id)
+                self.timer_queue.cancel(PREGEN_KEY_PREFIX + task_id)
                 logging.info(f"移除定时任务: {task_id}")
                 # 同步清理资源目录
                 try:
@@ -246,10 +297,15 @@ class ScheduleManager(QObject):
         return self.tasks.copy()
     
     def get_pending_tasks(self) -> List[ScheduleTask]:
-        """获取待执行的任务"""
+        """获取待执行的任务（数据库按 (status, schedule_time) 索引查询）"""
         now = datetime.now()
-        return [task for task in self.tasks 
-                if task.status == "pending" and task.schedule_time <= now]
+        try:
+            due_ids = set(self.store.due_task_ids(now))
+        except Exception as e:
+            logging.error(f"查询到期任务失败: {str(e)}")
+            return [task for task in self.tasks
+                    if task.status == "pending" and task.schedule_time <= now]
+        return [task for task in self.tasks if task.task_id in due_ids]
     
     def get_upcoming_tasks(self) -> List[ScheduleTask]:
         """获取即将执行的任务"""
@@ -263,17 +319,51 @@ class ScheduleManager(QObject):
         """启动调度器"""
         if not self.running:
             self.running = True
-            self.timer.start(self.check_interval * 1000)  # 转换为毫秒
+            # 停止期间到期的任务不会被执行，重新入队后立即到期
+            self._arm_all_tasks()
+            self.timer_queue.start()
             logging.info("定时发布调度器已启动")
     
     def stop_scheduler(self):
         """停止调度器"""
         self.running = False
-        self.timer.stop()
+        self.timer_queue.stop()
         logging.info("定时发布调度器已停止")
+
+    @pyqtSlot(list)
+    def _run_due_tasks(self, task_ids: List[str]):
+        """执行到期队列弹出的任务（主线程）。"""
+        if not self.running:
+            return
+
+        now = datetime.now()
+        for task_id in task_ids:
+            if task_id.startswith(PREGEN_KEY_PREFIX):
+                self._pregenerate(task_id[len(PREGEN_KEY_PREFIX):], now)
+                continue
+            task = self._find_task(task_id)
+            if task is None or task.status != "pending":
+                continue
+            if task.schedule_time > now:
+                # 弹出后又被改期：按新时间重新入队
+                self._arm_task(task)
+                continue
+            try:
+                self.execute_task(task)
+            except Exception as e:
+                logging.error(f"执行任务 {task.task_id} 失败: {str(e)}")
+                self.handle_task_failure(task, str(e))
     
+    def _pregenerate(self, task_id: str, now: datetime):
+        """后台预生成任务内容；已到点的任务由发布流程现场生成，不再重复。"""
+        task = self._find_task(task_id)
+        if task is None or task.status != "pending" or task.schedule_time <= now:
+            return
+        self.pregenerator.submit(task.to_dict())
+        logging.info(f"开始预生成定时任务内容: {task_id}")
+
     def check_tasks(self):
-        """检查并执行到期任务"""
+        """检查并执行所有已到期任务（全量扫描；正常情况下由到期队列触发，无需调用）"""
         if not self.running:
             return
         
@@ -292,9 +382,10 @@ class ScheduleManager(QObject):
         logging.info(f"开始执行任务: {task.task_id}")
         task.status = "running"
         task.updated_at = datetime.now()
+        self.timer_queue.cancel(task.task_id)
         
         self.task_started.emit(task.task_id)
-        self.save_tasks()
+        self.save_task(task)
 
         # 交给外部执行器（例如：BrowserThread + Playwright）
         try:
@@ -305,11 +396,7 @@ class ScheduleManager(QObject):
     @pyqtSlot(str, bool, str)
     def handle_task_result(self, task_id: str, success: bool, error_msg: str = ""):
         """由外部执行器回调任务结果（通过 Qt 信号连接此方法，跨线程安全）。"""
-        task = None
-        for t in self.tasks:
-            if t.task_id == task_id:
-                task = t
-                break
+        task = self._find_task(task_id)
 
         if not task:
             logging.warning(f"收到未知任务结果回调: {task_id}")
@@ -320,6 +407,11 @@ class ScheduleManager(QObject):
 
         if success:
             task.retry_count = 0
+            # 预生成内容已发布：循环热点任务的下一轮重新生成
+            try:
+                self.pregenerator.discard(task.task_id)
+            except Exception:
+                pass
             # “跟随热点”任务：发布成功后按 interval_hours 自动滚动到下一次
             if str(getattr(task, "task_type", "") or "").strip() == "hotspot" and int(getattr(task, "interval_hours", 0) or 0) > 0:
                 task.schedule_time = datetime.now() + timedelta(hours=int(getattr(task, "interval_hours", 0) or 0))
@@ -328,7 +420,8 @@ class ScheduleManager(QObject):
                 task.status = "completed"
             self.task_completed.emit(task.task_id)
             logging.info(f"任务执行成功: {task.task_id}")
-            self.save_tasks()
+            self.save_task(task)
+            self._arm_task(task)
             return
 
         task.status = "failed"
@@ -343,7 +436,8 @@ class ScheduleManager(QObject):
             self.task_failed.emit(task.task_id, task.error_message or "达到最大重试次数")
             logging.error(f"任务执行失败: {task.task_id}")
 
-        self.save_tasks()
+        self.save_task(task)
+        self._arm_task(task)
     
     def handle_task_failure(self, task: ScheduleTask, error_msg: str):
         """处理任务失败"""
@@ -358,7 +452,10 @@ class ScheduleManager(QObject):
         """清理已完成的任务"""
         completed_ids = [t.task_id for t in self.tasks if t.status == "completed"]
         self.tasks = [task for task in self.tasks if task.status != "completed"]
-        self.save_tasks()
+        try:
+            self.store.delete(completed_ids)
+        except Exception as e:
+            logging.error(f"清理已完成任务失败: {str(e)}")
         for task_id in completed_ids:
             try:
                 assets_dir = os.path.join(self.config_dir, "scheduled_assets", task_id)
@@ -396,7 +493,9 @@ class ScheduleManager(QObject):
                 data = json.load(f)
                 new_tasks = [ScheduleTask.from_dict(task_data) for task_data in data]
                 self.tasks.extend(new_tasks)
-                self.save_tasks()
+                self.store.upsert_many(task.to_dict() for task in new_tasks)
+                for task in new_tasks:
+                    self._arm_task(task)
             logging.info(f"已从 {file_path} 导入 {len(new_tasks)} 个任务")
         except Exception as e:
             logging.error(f"导入任务失败: {str(e)}")
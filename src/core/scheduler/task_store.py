@@ -0,0 +1,217 @@
+"""
+定时任务持久化（SQLite：~/.xhs_system/xhs_data.db 的 scheduled_tasks 表）
+
+原先每次新增任务、状态变化、结果回调、重试都会用 indent=2 整体重写 schedule_tasks.json，
+且写入不是原子的：写到一半崩溃会丢掉全部任务。这里改为：
+- 按行 upsert/delete（单行事务，崩溃时最多丢失正在写入的那一行变更）
+- WAL 模式，读不阻塞写
+- (status, schedule_time) 索引：到期查询不必全表扫描
+- 旧的 schedule_tasks.json 首次启动时导入一次，导入后改名为 schedule_tasks.json.migrated
+
+表结构见 src/core/models/content.py 的 ScheduledTask；旧库中的空表会按新结构重建，
+已有数据的旧表则补齐缺失的列与索引。
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import inspect, text
+from sqlalchemy.orm import sessionmaker
+
+from src.core.models.content import ScheduledTask
+
+# 有独立列的字段；其余任务参数放在 payload（JSON）中
+_COLUMN_FIELDS = (
+    "task_key",
+    "user_id",
+    "status",
+    "task_type",
+    "title",
+    "content",
+    "schedule_time",
+    "retry_count",
+    "max_retries",
+    "error_message",
+    "created_at",
+    "updated_at",
+)
+
+
+def _parse_dt(value) -> Optional[datetime]:
+    if value is None or isinstance(value, datetime):
+        return value
+    try:
+        return datetime.fromisoformat(str(value))
+    except Exception:
+        return None
+
+
+class ScheduleTaskStore:
+    """定时任务的按行存取；任务以 ScheduleTask.to_dict() 格式的字典传入/返回。"""
+
+    def __init__(self, engine=None):
+        if engine is None:
+            from src.config.database import db_manager
+
+            engine = db_manager.engine
+        self.engine = engine
+        self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        self._ensure_schema()
+
+    def _ensure_schema(self):
+        try:
+            with self.engine.begin() as conn:
+                conn.execute(text("PRAGMA journal_mode=WAL"))
+                table = ScheduledTask.__table__
+                if not inspect(conn).has_table(table.name):
+                    table.create(conn)
+                    return
+
+                columns = {c["name"] for c in inspect(conn).get_columns(table.name)}
+                if "task_key" not in columns:
+                    count = conn.execute(text(f"SELECT COUNT(*) FROM {table.name}")).scalar() or 0
+                    if count == 0:
+                        # 旧结构的空表（user_id NOT NULL、缺少状态/内容列）：直接按新结构重建
+                        table.drop(conn)
+                        table.create(conn)
+                        return
+                for column in table.columns:
+                    if column.name not in columns:
+                        col_type = column.type.compile(dialect=conn.dialect)
+                        conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {col_type}"))
+                for index in table.indexes:
+                    index.create(conn, checkfirst=True)
+        except Exception as e:
+            logging.error(f"初始化定时任务表失败: {str(e)}")
+
+    @staticmethod
+    def _apply(row: ScheduledTask, data: Dict) -> None:
+        row.task_key = str(data["task_id"])
+        row.user_id = data.get("user_id")
+        row.status = data.get("status") or "pending"
+        row.task_type = data.get("task_type") or "fixed"
+        row.title = data.get("title") or ""
+        row.content = data.get("content") or ""
+        row.schedule_time = _parse_dt(data.get("schedule_time"))
+        row.retry_count = int(data.get("retry_count") or 0)
+        row.max_retries = int(data.get("max_retries") if data.get("max_retries") is not None else 3)
+        row.error_message = data.get("error_message") or ""
+        row.created_at = _parse_dt(data.get("created_at")) or datetime.now()
+        row.updated_at = _parse_dt(data.get("updated_at")) or datetime.now()
+        # 兼容模型原有的必填列
+        row.name = (data.get("title") or "")[:100] or str(data["task_id"])
+        row.platform = "xiaohongshu"
+        row.schedule_type = "interval" if int(data.get("interval_hours") or 0) > 0 else "once"
+        extra = {k: v for k, v in data.items() if k not in _COLUMN_FIELDS and k != "task_id"}
+        row.payload = json.dumps(extra, ensure_ascii=False)
+
+    @staticmethod
+    def _to_dict(row: ScheduledTask) -> Dict:
+        try:
+            data = json.loads(row.payload or "{}")
+        except Exception:
+            data = {}
+        data.update(
+            {
+                "task_id": row.task_key,
+                "user_id": row.user_id,
+                "status": row.status or "pending",
+                "task_type": row.task_type or "fixed",
+                "title": row.title or "",
+                "content": row.content or "",
+                "schedule_time": row.schedule_time.isoformat(),
+                "retry_count": row.retry_count or 0,
+                "max_retries": row.max_retries if row.max_retries is not None else 3,
+                "error_message": row.error_message or "",
+                "created_at": (row.created_at or row.schedule_time).isoformat(),
+                "updated_at": (row.updated_at or row.schedule_time).isoformat(),
+            }
+        )
+        return data
+
+    def load_all(self) -> List[Dict]:
+        session = self.SessionLocal()
+        try:
+            rows = (
+                session.query(ScheduledTask)
+                .filter(ScheduledTask.task_key.isnot(None))
+                .order_by(ScheduledTask.schedule_time, ScheduledTask.id)
+                .all()
+            )
+            return [self._to_dict(row) for row in rows]
+        finally:
+            session.close()
+
+    def upsert(self, data: Dict) -> None:
+        """写入（或更新）一条任务。"""
+        self.upsert_many([data])
+
+    def upsert_many(self, items: Iterable[Dict]) -> None:
+        """在同一事务中写入多条任务。"""
+        session = self.SessionLocal()
+        try:
+            for data in items:
+                row = session.query(ScheduledTask).filter(ScheduledTask.task_key == str(data["task_id"])).first()
+                if row is None:
+                    row = ScheduledTask()
+                    session.add(row)
+                self._apply(row, data)
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+    def delete(self, task_ids: Iterable[str]) -> int:
+        keys = [str(k) for k in task_ids]
+        if not keys:
+            return 0
+        session = self.SessionLocal()
+        try:
+            count = (
+                session.query(ScheduledTask)
+                .filter(ScheduledTask.task_key.in_(keys))
+                .delete(synchronize_session=False)
+            )
+            session.commit()
+            return int(count or 0)
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+    def due_task_ids(self, now: Optional[datetime] = None) -> List[str]:
+        """到期的 pending 任务（走 (status, schedule_time) 索引）。"""
+        now = now or datetime.now()
+        session = self.SessionLocal()
+        try:
+            rows = (
+                session.query(ScheduledTask.task_key)
+                .filter(ScheduledTask.status == "pending", ScheduledTask.schedule_time <= now)
+                .order_by(ScheduledTask.schedule_time)
+                .all()
+            )
+            return [r[0] for r in rows if r[0]]
+        finally:
+            session.close()
+
+    def migrate_json(self, json_path: str) -> int:
+        """一次性导入旧的 schedule_tasks.json（已存在的任务 ID 跳过），成功后改名为 .migrated。"""
+        if not os.path.exists(json_path):
+            return 0
+        with open(json_path, "r", encoding="utf-8") as f:
+            data = json.load(f) or []
+
+        existing = {d["task_id"] for d in self.load_all()}
+        items = [d for d in data if isinstance(d, dict) and d.get("task_id") and d["task_id"] not in existing]
+        self.upsert_many(items)
+        os.replace(json_path, json_path + ".migrated")
+        logging.info(f"已将 {len(items)} 个定时任务从 {json_path} 迁移到数据库")
+        return len(items)
@@ -0,0 +1,176 @@
+"""
+定时任务到期队列（不依赖 Qt）
+
+原先 ScheduleManager 每 60 秒由 QTimer 唤醒一次、扫描全部任务：任务最多晚一分钟执行，
+每次扫描 O(n)。这里按到期时间维护一个最小堆，只为“最近到期”的一项挂一个等待：
+- 新增/删除/改期时 O(log n) 更新堆并唤醒等待线程重新计算下一次到期
+- 空闲时线程只阻塞在 Condition 上，开销与任务数量无关；到期误差通常在几毫秒内
+- 到期回调 on_due(keys) 在后台线程中调用；Qt 侧通过信号转回主线程，FastAPI 侧可用
+  loop.call_soon_threadsafe 转入事件循环
+"""
+
+from __future__ import annotations
+
+import heapq
+import itertools
+import logging
+import threading
+import time
+from typing import Callable, Dict, Hashable, List, Optional, Tuple
+
+# 单次最长等待（秒）：系统休眠/校时后墙钟跳变时，最多这么久之后按新时间重新计算
+MAX_WAIT_SECONDS = 30.0
+
+
+class DeadlineHeap:
+    """
+    按到期时间排序的键集合（最小堆 + 懒删除，非线程安全）。
+
+    同一个键只保留最后一次 push 的时间；remove/改期留下的旧堆项在弹出时跳过，
+    旧项过多时整体重建，堆大小始终与有效键数同阶。
+    """
+
+    def __init__(self):
+        self._heap: List[Tuple[float, int, Hashable]] = []
+        self._entries: Dict[Hashable, Tuple[float, int]] = {}
+        self._seq = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    def push(self, key: Hashable, when: float) -> None:
+        entry = (float(when), next(self._seq))
+        self._entries[key] = entry
+        heapq.heappush(self._heap, (entry[0], entry[1], key))
+        self._maybe_compact()
+
+    def remove(self, key: Hashable) -> bool:
+        if self._entries.pop(key, None) is None:
+            return False
+        self._maybe_compact()
+        return True
+
+    def when(self, key: Hashable) -> Optional[float]:
+        entry = self._entries.get(key)
+        return entry[0] if entry else None
+
+    def _is_live(self, item: Tuple[float, int, Hashable]) -> bool:
+        entry = self._entries.get(item[2])
+        return entry is not None and entry[1] == item[1]
+
+    def peek(self) -> Optional[Tuple[float, Hashable]]:
+        """最早到期的 (时间, 键)；为空时返回 None。"""
+        while self._heap and not self._is_live(self._heap[0]):
+            heapq.heappop(self._heap)
+        if not self._heap:
+            return None
+        when, _seq, key = self._heap[0]
+        return when, key
+
+    def pop_due(self, now: float) -> List[Hashable]:
+        """弹出所有到期时间 <= now 的键（按到期先后）。"""
+        due: List[Hashable] = []
+        while True:
+            head = self.peek()
+            if head is None or head[0] > now:
+                return due
+            heapq.heappop(self._heap)
+            self._entries.pop(head[1], None)
+            due.append(head[1])
+
+    def clear(self) -> None:
+        self._heap.clear()
+        self._entries.clear()
+
+    def _maybe_compact(self) -> None:
+        if len(self._heap) > 64 and len(self._heap) > 2 * len(self._entries):
+            self._heap = [(when, seq, key) for key, (when, seq) in self._entries.items()]
+            heapq.heapify(self._heap)
+
+
+class TimerQueue:
+    """
+    到期回调调度器：一个后台线程只等待堆顶任务。
+
+    schedule/cancel 可在任意线程调用；on_due(keys) 在后台线程中调用（同一时刻到期的键一起回调），
+    回调抛出的异常会记录日志，不影响后续调度。时间使用 time.time()（与 datetime.timestamp() 一致）。
+    """
+
+    def __init__(self, on_due: Callable[[List[Hashable]], None], *, clock: Callable[[], float] = time.time):
+        self._on_due = on_due
+        self._clock = clock
+        self._heap = DeadlineHeap()
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
+
+    def schedule(self, key: Hashable, when: float) -> None:
+        """新增或改期（同一个键只保留最后一次的时间）；比当前堆顶更早时立即唤醒等待线程。"""
+        with self._cond:
+            head = self._heap.peek()
+            self._heap.push(key, when)
+            if head is None or float(when) < head[0]:
+                self._cond.notify()
+
+    def cancel(self, key: Hashable) -> bool:
+        with self._cond:
+            # 删除堆顶时不必唤醒：线程醒来发现没有到期项会重新等待
+            return self._heap.remove(key)
+
+    def clear(self) -> None:
+        with self._cond:
+            self._heap.clear()
+
+    def next_deadline(self) -> Optional[float]:
+        with self._cond:
+            head = self._heap.peek()
+            return head[0] if head else None
+
+    def __len__(self) -> int:
+        with self._cond:
+            return len(self._heap)
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._cond:
+            return key in self._heap
+
+    @property
+    def running(self) -> bool:
+        return self._running
+
+    def start(self) -> None:
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+            self._thread = threading.Thread(target=self._run, name="schedule-timer", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: Optional[float] = 2.0) -> None:
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+            thread, self._thread = self._thread, None
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                if not self._running:
+                    return
+                now = self._clock()
+                due = self._heap.pop_due(now)
+                if not due:
+                    head = self._heap.peek()
+                    wait = None if head is None else min(MAX_WAIT_SECONDS, max(0.0, head[0] - now))
+                    if wait is None or wait > 0:
+                        self._cond.wait(wait)
+                    continue
+            try:
+                self._on_due(due)
+            except Exception:
+                logging.exception(f"定时任务到期回调失败: {due}")
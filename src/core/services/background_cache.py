@@ -0,0 +1,108 @@
+"""
+背景图缓存
+
+系统模板包（ContentPack.pages）与展示模板背景在每次生成图片时都会重新
+`Image.open(...).convert("RGB")` 再做一次 LANCZOS 等比留白缩放；模板包固定时这些结果完全相同。
+
+这里按 (文件路径, mtime, 文件大小, 目标尺寸) 缓存处理后的背景：
+- 按像素内存总量做 LRU（XHS_IMG_BG_CACHE_MB，默认 192MB，约 40 张 1080x1440）
+- 文件被替换/修改后 mtime 变化，自动视为新条目
+- 返回副本，调用方可以直接在上面绘制
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable, Hashable, Optional, Tuple
+
+from PIL import Image
+
+
+def _image_bytes(img: Image.Image) -> int:
+    return int(img.width) * int(img.height) * max(1, len(img.getbands()))
+
+
+class BackgroundCache:
+    """处理后背景图的进程级缓存（线程安全，按内存占用 LRU）。"""
+
+    def __init__(self, max_bytes: Optional[int] = None):
+        if max_bytes is None:
+            try:
+                max_bytes = int(float(os.environ.get("XHS_IMG_BG_CACHE_MB") or 192) * 1024 * 1024)
+            except Exception:
+                max_bytes = 192 * 1024 * 1024
+        self.max_bytes = max(0, int(max_bytes))
+        self._images: "OrderedDict[Hashable, Image.Image]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(path: str, target_size: Tuple[int, int]) -> Optional[Hashable]:
+        """缓存键；文件不存在时返回 None。"""
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return (os.path.abspath(str(path)), st.st_mtime_ns, st.st_size, int(target_size[0]), int(target_size[1]))
+
+    def get(
+        self,
+        path: str,
+        target_size: Tuple[int, int],
+        build: Callable[[str, Tuple[int, int]], Image.Image],
+    ) -> Image.Image:
+        """返回 build(path, target_size) 结果的副本；命中缓存时不再解码/缩放。"""
+        key = self.make_key(path, target_size)
+        return self.get_or_build(key, lambda: build(path, target_size))
+
+    def get_or_build(self, key: Optional[Hashable], build: Callable[[], Image.Image]) -> Image.Image:
+        """按任意键缓存 build() 的结果（如程序生成的内置背景），返回副本；key 为 None 时不缓存。"""
+        if key is not None:
+            with self._lock:
+                img = self._images.get(key)
+                if img is not None:
+                    self._images.move_to_end(key)
+                    self.hits += 1
+                    return img.copy()
+                self.misses += 1
+
+        img = build()
+        if key is not None:
+            self._put(key, img)
+        return img.copy()
+
+    def _put(self, key: Hashable, img: Image.Image) -> None:
+        size = _image_bytes(img)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._images.pop(key, None)
+            if old is not None:
+                self._bytes -= _image_bytes(old)
+            self._images[key] = img
+            self._bytes += size
+            while self._bytes > self.max_bytes and self._images:
+                _k, evicted = self._images.popitem(last=False)
+                self._bytes -= _image_bytes(evicted)
+
+    @property
+    def size_bytes(self) -> int:
+        return self._bytes
+
+    def __len__(self) -> int:
+        return len(self._images)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._images.clear()
+            self._bytes = 0
+            self.hits = 0
+            self.misses = 0
+
+
+# 全局背景缓存（系统模板服务的串行渲染与各渲染进程内各自一份）
+background_cache = BackgroundCache()
@@ -5,6 +5,7 @@ from typing import List, Dict, Optional
 from PIL import Image, ImageDraw, ImageFont, ImageFilter
 from src.core.models.cover_template import CoverTemplate, Base
 from src.config.database import db_manager
+from src.core.services.text_measure import wrap_chars
 
 class CoverTemplateService:
     """封面模板服务类"""
@@ -757,27 +758,16 @@ class CoverTemplateService:
         """文本自动换行"""
         if not text:
             return []
-        
+
+        def _bbox_width(s):
+            bbox = font.getbbox(s)
+            return bbox[2] - bbox[0]
+
         lines = []
-        paragraphs = text.split('\n')
-        
-        for paragraph in paragraphs:
-            words = list(paragraph)  # 中文按字符分割
-            current_line = ""
-            
-            for char in words:
-                test_line = current_line + char
-                bbox = font.getbbox(test_line)
-                if bbox[2] - bbox[0] <= max_width:
-                    current_line = test_line
-                else:
-                    if current_line:
-                        lines.append(current_line)
-                    current_line = char
-            
-            if current_line:
-                lines.append(current_line)
-        
+        for paragraph in text.split('\n'):
+            # 中文按字符分割
+            lines.extend(wrap_chars(paragraph, font, max_width, exact=_bbox_width))
+
         return lines
 
     def _generate_gradient_cover(self, image, title, subtitle, config):
@@ -11,6 +11,7 @@ import textwrap
 from datetime import datetime
 import uuid
 from ..generation.cover_text_generator import CoverTextGenerator
+from .image_effects import composite_region
 
 
 class EnhancedCoverService:
@@ -227,7 +228,7 @@ class EnhancedCoverService:
         # 4. Emoji
         emojis = cover_text.get('emojis', [])
         if emojis:
-            self.draw_emojis(draw, emojis, template_config, width, height)
+            self.draw_emojis(draw, emojis, template_config, width, height, base_image=base_image)
         
         # 5. 装饰元素
         if template_config.get('decorations'):
@@ -354,7 +355,8 @@ class EnhancedCoverService:
             x += tag_width + tag_margin
     
     def draw_emojis(self, draw: ImageDraw.Draw, emojis: List[str], 
-                    template_config: Dict, width: int, height: int):
+                    template_config: Dict, width: int, height: int,
+                    base_image: Optional[Image.Image] = None):
         """绘制emoji"""
         
         emoji_config = template_config.get('emoji_config', {})
@@ -369,12 +371,20 @@ class EnhancedCoverService:
         x, y = position
         emoji_text = ''.join(emojis[:2])  # 最多显示2个emoji
         
-        # 绘制emoji背景
-        draw.rounded_rectangle(
-            [x-10, y-10, x + font_size * len(emoji_text) + 10, y + font_size + 10],
-            radius=15,
-            fill='#FFFFFFCC'
-        )
+        # 绘制emoji背景（半透明：有底图时只在背景块区域内做 alpha 合成）
+        bg_box = [x-10, y-10, x + font_size * len(emoji_text) + 10, y + font_size + 10]
+        if base_image is not None:
+            composite_region(
+                base_image,
+                (bg_box[0], bg_box[1], bg_box[2] + 1, bg_box[3] + 1),
+                lambda d, o: d.rounded_rectangle(
+                    [bg_box[0] - o[0], bg_box[1] - o[1], bg_box[2] - o[0], bg_box[3] - o[1]],
+                    radius=15,
+                    fill='#FFFFFFCC'
+                ),
+            )
+        else:
+            draw.rounded_rectangle(bg_box, radius=15, fill='#FFFFFFCC')
         
         # 绘制emoji
         draw.text((x, y), emoji_text, font=emoji_font, fill='black')
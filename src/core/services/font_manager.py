@@ -4,8 +4,86 @@
 """
 
 import os
+import threading
+from collections import OrderedDict
 from PIL import ImageFont
 
+from src.core.services.render_trace import render_tracer
+
+
+class FontCache:
+    """
+    进程级字体对象缓存（线程安全）
+
+    - 已加载的 FreeTypeFont 按 (路径, index, 字号) 做 LRU 缓存，避免排版搜索循环里反复
+      解析数 MB 的思源黑体/苹方字体文件
+    - 字体面（路径 + index）是否可加载只判定一次：缺失/损坏的候选字体不会被反复尝试
+
+    容量：XHS_FONT_CACHE_SIZE（默认 256 个字体对象）
+    """
+
+    def __init__(self, max_fonts=None):
+        if max_fonts is None:
+            try:
+                max_fonts = int(os.environ.get("XHS_FONT_CACHE_SIZE") or 256)
+            except Exception:
+                max_fonts = 256
+        self.max_fonts = max(1, int(max_fonts))
+        self._fonts = OrderedDict()
+        self._faces = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def is_loadable(self, path, index=0):
+        """字体面是否可加载（结果缓存；未尝试过时返回 None）"""
+        return self._faces.get((str(path), int(index)))
+
+    def get(self, path, size, index=0):
+        """获取字体对象，加载失败时抛出 OSError。"""
+        path = str(path)
+        face = (path, int(index))
+        key = (path, int(index), int(size))
+        with self._lock:
+            font = self._fonts.get(key)
+            if font is not None:
+                self._fonts.move_to_end(key)
+                self.hits += 1
+                return font
+            if self._faces.get(face) is False:
+                raise OSError(f"字体不可用: {path}#{index}")
+            self.misses += 1
+
+        try:
+            with render_tracer.span("font_load", path=os.path.basename(path), size=int(size)):
+                font = ImageFont.truetype(path, int(size), index=int(index))
+        except Exception as e:
+            with self._lock:
+                # 文件存在但某个字号加载失败的情况极少见，只有面本身打不开才记为不可用
+                if not self._faces.get(face):
+                    self._faces[face] = False
+            raise OSError(f"加载字体失败: {path}#{index}: {e}") from e
+
+        with self._lock:
+            self._faces[face] = True
+            font = self._fonts.setdefault(key, font)
+            self._fonts.move_to_end(key)
+            while len(self._fonts) > self.max_fonts:
+                self._fonts.popitem(last=False)
+        return font
+
+    def clear(self):
+        with self._lock:
+            self._fonts.clear()
+            self._faces.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+# 全局字体缓存（FontManager 与海报字体解析共用）
+font_cache = FontCache()
+
+
 class FontManager:
     """字体管理器"""
     
@@ -69,7 +147,7 @@ class FontManager:
         try:
             font_path = self.font_map.get(font_type, self.font_map['system']).get(style)
             if font_path and os.path.exists(font_path):
-                return ImageFont.truetype(font_path, size)
+                return font_cache.get(font_path, size)
         except Exception as e:
             print(f"加载字体失败: {e}")
         
@@ -77,7 +155,7 @@ class FontManager:
         try:
             system_font = self.get_system_font()
             if system_font:
-                return ImageFont.truetype(system_font, size)
+                return font_cache.get(system_font, size)
         except:
             pass
         
@@ -0,0 +1,210 @@
+"""
+图片背景/特效的整图运算
+
+渐变、点阵等背景元素原先逐行/逐点调用 ImageDraw（一张 1080x1440 的海报要 1440 次 draw.line
+再加数百次 ellipse），这里改为整图运算：
+- 渐变：先算出 1 像素宽的颜色列，再一次性拉伸到整幅画布
+- 点阵：只画一个点的图块，平铺成一行后再整行复制
+
+结果与逐行绘制一致（同样的取整方式），但全部在 Pillow 的 C 实现里完成。
+
+卡片/半透明色块的合成只在元素（含阴影模糊余量）的包围盒内进行，不再为每个元素分配整幅
+RGBA 画布、做整幅高斯模糊；模糊后的阴影蒙版按 (宽, 高, 圆角, 模糊半径, 透明度) 缓存。
+"""
+
+from __future__ import annotations
+
+import functools
+import math
+from typing import Callable, Optional, Tuple
+
+from PIL import Image, ImageDraw, ImageFilter
+
+RGB = Tuple[int, int, int]
+RGBA = Tuple[int, int, int, int]
+
+
+def vertical_gradient(size: Tuple[int, int], top: RGB, bottom: RGB, *, weighted: bool = False) -> Image.Image:
+    """
+    从上到下的线性渐变（RGB）。
+
+    默认按 int(a + (b - a) * t) 取整；weighted=True 时按 int(a * (1 - t) + b * t)，
+    两种写法的浮点误差偶尔差 1，分别对应营销海报与内置背景原先逐行绘制的公式。
+    """
+    w, h = int(size[0]), int(size[1])
+    denom = max(1, h - 1)
+    column = bytearray(h * 3)
+    for y in range(h):
+        t = y / denom
+        for c in range(3):
+            if weighted:
+                column[y * 3 + c] = int(top[c] * (1 - t) + bottom[c] * t)
+            else:
+                column[y * 3 + c] = int(top[c] + (bottom[c] - top[c]) * t)
+    strip = Image.frombuffer("RGB", (1, h), bytes(column), "raw", "RGB", 0, 1)
+    return strip.resize((w, h), Image.Resampling.NEAREST)
+
+
+def dot_grid(
+    size: Tuple[int, int],
+    *,
+    origin: Tuple[int, int],
+    step: int,
+    radius: int,
+    fill: RGBA,
+) -> Image.Image:
+    """
+    透明底的点阵图层：圆点中心位于 (origin_x + i*step, origin_y + j*step)，
+    等价于对每个点调用一次 `ellipse([x-r, y-r, x+r, y+r])`。
+    """
+    w, h = int(size[0]), int(size[1])
+    layer = Image.new("RGBA", (w, h), (0, 0, 0, 0))
+    step = max(1, int(step))
+    ox, oy = int(origin[0]), int(origin[1])
+    if ox >= w or oy >= h:
+        return layer
+
+    r = max(0, int(radius))
+    if step < 2 * r + 1:
+        # 点与点会重叠：无法平铺，直接逐个绘制
+        draw = ImageDraw.Draw(layer)
+        for y in range(oy, h, step):
+            for x in range(ox, w, step):
+                draw.ellipse([x - r, y - r, x + r, y + r], fill=fill)
+        return layer
+
+    # 单个图块：点位于图块内 (r, r)，相邻图块互不重叠
+    pad = r
+    tile = Image.new("RGBA", (step, step), (0, 0, 0, 0))
+    ImageDraw.Draw(tile).ellipse([0, 0, 2 * r, 2 * r], fill=fill)
+
+    row = Image.new("RGBA", (w, step), (0, 0, 0, 0))
+    for x in range(ox, w, step):
+        row.paste(tile, (x - pad, 0))
+    for y in range(oy, h, step):
+        layer.paste(row, (0, y - pad))
+    return layer
+
+
+def _clip_box(box: Tuple[int, int, int, int], size: Tuple[int, int]) -> Optional[Tuple[int, int, int, int]]:
+    x0, y0, x1, y1 = box
+    x0, y0 = max(0, int(x0)), max(0, int(y0))
+    x1, y1 = min(int(size[0]), int(x1)), min(int(size[1]), int(y1))
+    if x1 <= x0 or y1 <= y0:
+        return None
+    return x0, y0, x1, y1
+
+
+def composite_region(
+    base: Image.Image,
+    box: Tuple[int, int, int, int],
+    paint: Callable[[ImageDraw.ImageDraw, Tuple[int, int]], None],
+    *,
+    blur: float = 0,
+) -> None:
+    """
+    只在 box 区域内做一次 alpha 合成（原地修改 base）。
+
+    paint(draw, origin) 在区域大小的透明图层上绘制；origin 是区域左上角在 base 中的坐标，
+    绘制时用 `x - origin[0]`、`y - origin[1]` 换算。blur > 0 时图层先做高斯模糊，
+    区域会自动向外扩出模糊余量。
+    """
+    if blur > 0:
+        grow = int(math.ceil(blur * 3))
+        box = (box[0] - grow, box[1] - grow, box[2] + grow, box[3] + grow)
+    clipped = _clip_box(box, base.size)
+    if clipped is None:
+        return
+    region = base.crop(clipped).convert("RGBA")
+    overlay = Image.new("RGBA", region.size, (0, 0, 0, 0))
+    paint(ImageDraw.Draw(overlay), (clipped[0], clipped[1]))
+    if blur > 0:
+        overlay = overlay.filter(ImageFilter.GaussianBlur(blur))
+    region = Image.alpha_composite(region, overlay)
+    base.paste(region if base.mode == "RGBA" else region.convert(base.mode), (clipped[0], clipped[1]))
+
+
+@functools.lru_cache(maxsize=64)
+def shadow_layer(width: int, height: int, radius: int, blur: int, alpha: int) -> Image.Image:
+    """
+    (width, height) 圆角矩形的模糊阴影（黑色 RGBA），四周各留 `blur * 3` 像素的模糊余量。
+    缓存共享，调用方不要修改返回的图片。
+    """
+    pad = max(0, int(blur)) * 3
+    mask = Image.new("L", (int(width) + 2 * pad + 1, int(height) + 2 * pad + 1), 0)
+    ImageDraw.Draw(mask).rounded_rectangle([pad, pad, pad + width, pad + height], radius=radius, fill=int(alpha))
+    if blur > 0:
+        mask = mask.filter(ImageFilter.GaussianBlur(blur))
+    layer = Image.new("RGBA", mask.size, (0, 0, 0, 0))
+    layer.putalpha(mask)
+    return layer
+
+
+def rounded_card(
+    base: Image.Image,
+    xy: Tuple[int, int, int, int],
+    *,
+    radius: int,
+    fill: RGBA,
+    outline: Optional[RGBA] = None,
+    outline_width: int = 0,
+    shadow_offset: Tuple[int, int] = (6, 10),
+    shadow_blur: int = 14,
+    shadow_alpha: int = 40,
+) -> None:
+    """带柔和投影的圆角卡片（原地修改 base），只合成卡片与阴影的包围盒区域。"""
+    x0, y0, x1, y1 = [int(v) for v in xy]
+    dx, dy = int(shadow_offset[0]), int(shadow_offset[1])
+
+    shadow = shadow_layer(x1 - x0, y1 - y0, int(radius), int(shadow_blur), int(shadow_alpha)) if shadow_alpha > 0 else None
+    pad = max(0, int(shadow_blur)) * 3
+    sx, sy = x0 + dx - pad, y0 + dy - pad
+
+    box = (x0, y0, x1 + 1, y1 + 1)
+    if shadow is not None:
+        box = (min(box[0], sx), min(box[1], sy), max(box[2], sx + shadow.width), max(box[3], sy + shadow.height))
+    clipped = _clip_box(box, base.size)
+    if clipped is None:
+        return
+    bx, by = clipped[0], clipped[1]
+
+    region = base.crop(clipped).convert("RGBA")
+    if shadow is not None:
+        # alpha_composite 的 dest 不能为负：被画布裁掉的部分改用 source 偏移
+        src_x, src_y = max(0, bx - sx), max(0, by - sy)
+        region.alpha_composite(shadow, dest=(max(0, sx - bx), max(0, sy - by)), source=(src_x, src_y))
+
+    overlay = Image.new("RGBA", region.size, (0, 0, 0, 0))
+    ImageDraw.Draw(overlay).rounded_rectangle(
+        [x0 - bx, y0 - by, x1 - bx, y1 - by],
+        radius=radius,
+        fill=fill,
+        outline=outline,
+        width=int(outline_width or 0),
+    )
+    region = Image.alpha_composite(region, overlay)
+    base.paste(region if base.mode == "RGBA" else region.convert(base.mode), (bx, by))
+
+
+def drop_shadow(
+    base: Image.Image,
+    mask: Image.Image,
+    xy: Tuple[int, int],
+    *,
+    blur: float,
+    color: RGBA = (0, 0, 0, 120),
+) -> None:
+    """按任意形状的 alpha 蒙版（L）在 xy 处画模糊投影（原地修改 base），只处理蒙版周围区域。"""
+    x, y = int(xy[0]), int(xy[1])
+    grow = int(math.ceil(blur * 3)) if blur > 0 else 0
+    clipped = _clip_box((x - grow, y - grow, x + mask.width + grow, y + mask.height + grow), base.size)
+    if clipped is None:
+        return
+    bx, by = clipped[0], clipped[1]
+    region = base.crop(clipped).convert("RGBA")
+    layer = Image.new("RGBA", region.size, (0, 0, 0, 0))
+    layer.paste(Image.new("RGBA", mask.size, color), (x - bx, y - by), mask)
+    if blur > 0:
+        layer = layer.filter(ImageFilter.GaussianBlur(blur))
+    region = Image.alpha_composite(region, layer)
+    base.paste(region if base.mode == "RGBA" else region.convert(base.mode), (bx, by))
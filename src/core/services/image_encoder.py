@@ -0,0 +1,176 @@
+"""
+图片输出编码
+
+生成的图片最终要上传到创作者平台，上传耗时与文件大小直接相关；PNG optimize 又非常耗 CPU
+（1080x1440 海报单张约 3 秒）。这里统一封装输出编码：
+- 格式：JPEG（可选渐进式）/ PNG / WebP
+- 目标大小：设置 target_kb 后在 [min_quality, quality] 间二分查找能放进目标大小的最高质量（JPEG/WebP）
+- 快速路径：optimize=False 时 PNG 不做 optimize（并使用较低压缩级别），JPEG 不做霍夫曼表优化
+
+环境变量（前缀由调用方决定，如系统模板图用 XHS_IMG，营销海报用 XHS_POSTER）：
+  {prefix}_FORMAT        jpeg / png / webp
+  {prefix}_QUALITY       1-100
+  {prefix}_PROGRESSIVE   JPEG 渐进式
+  {prefix}_OPTIMIZE      JPEG/PNG optimize
+  {prefix}_TARGET_KB     目标文件大小（KB，0 表示不限制）
+"""
+
+from __future__ import annotations
+
+import io
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional, Tuple
+
+from PIL import Image
+
+from src.core.services.render_trace import render_tracer
+
+# 格式名 -> (Pillow 格式, 扩展名)
+FORMATS = {
+    "jpeg": ("JPEG", ".jpg"),
+    "png": ("PNG", ".png"),
+    "webp": ("WEBP", ".webp"),
+}
+
+_ALIASES = {"jpg": "jpeg", "jpeg": "jpeg", "png": "png", "webp": "webp"}
+
+
+def normalize_format(value: str, default: str = "jpeg") -> str:
+    return _ALIASES.get(str(value or "").strip().lower().lstrip("."), default)
+
+
+@dataclass(frozen=True)
+class EncodeOptions:
+    """输出编码参数（只含基础类型，可随渲染任务一起 pickle）。"""
+
+    format: str = "jpeg"
+    quality: int = 92
+    progressive: bool = False
+    optimize: bool = False
+    target_kb: int = 0
+    min_quality: int = 60
+
+    @property
+    def pil_format(self) -> str:
+        return FORMATS[normalize_format(self.format)][0]
+
+    @property
+    def extension(self) -> str:
+        return FORMATS[normalize_format(self.format)][1]
+
+    def with_extension(self, path: str) -> str:
+        """把路径的扩展名换成当前格式的扩展名。"""
+        return str(Path(path).with_suffix(self.extension))
+
+    @classmethod
+    def from_env(
+        cls,
+        prefix: str = "XHS_IMG",
+        *,
+        default_format: str = "jpeg",
+        default_quality: int = 92,
+        default_optimize: bool = False,
+    ) -> "EncodeOptions":
+        def _get(name: str) -> str:
+            return (os.environ.get(f"{prefix}_{name}") or "").strip()
+
+        def _int(name: str, default: int) -> int:
+            try:
+                return int(_get(name) or default)
+            except Exception:
+                return default
+
+        def _bool(name: str, default: bool) -> bool:
+            val = _get(name).lower()
+            if not val:
+                return default
+            return val in {"1", "true", "yes", "y", "on"}
+
+        return cls(
+            format=normalize_format(_get("FORMAT"), default_format),
+            quality=max(1, min(100, _int("QUALITY", default_quality))),
+            progressive=_bool("PROGRESSIVE", False),
+            optimize=_bool("OPTIMIZE", default_optimize),
+            target_kb=max(0, _int("TARGET_KB", 0)),
+        )
+
+
+def _prepare(img: Image.Image, fmt: str) -> Image.Image:
+    if fmt == "JPEG" and img.mode not in ("RGB", "L"):
+        return img.convert("RGB")
+    if fmt == "WEBP" and img.mode not in ("RGB", "RGBA"):
+        return img.convert("RGBA" if "A" in img.getbands() else "RGB")
+    return img
+
+
+def _save_kwargs(options: EncodeOptions, quality: int) -> dict:
+    fmt = options.pil_format
+    if fmt == "JPEG":
+        kwargs = {"quality": int(quality)}
+        if options.progressive:
+            kwargs["progressive"] = True
+        if options.optimize:
+            kwargs["optimize"] = True
+        return kwargs
+    if fmt == "PNG":
+        # 快速路径：不做 optimize，压缩级别降到 3（体积略大，速度快一个数量级）
+        return {"optimize": True} if options.optimize else {"compress_level": 3}
+    return {"quality": int(quality), "method": 4}
+
+
+def _encode_once(img: Image.Image, options: EncodeOptions, quality: int) -> bytes:
+    buf = io.BytesIO()
+    img.save(buf, format=options.pil_format, **_save_kwargs(options, quality))
+    return buf.getvalue()
+
+
+def encode_image(img: Image.Image, options: Optional[EncodeOptions] = None) -> Tuple[bytes, int]:
+    """
+    按 options 编码图片，返回 (字节, 实际使用的质量)。
+
+    target_kb > 0 且为有损格式时：先用 quality 编码，超出目标大小再在 [min_quality, quality)
+    间二分查找能满足目标的最高质量；min_quality 仍超出时使用 min_quality 的结果。
+    """
+    options = options or EncodeOptions()
+    img = _prepare(img, options.pil_format)
+    quality = int(options.quality)
+    data = _encode_once(img, options, quality)
+
+    target = int(options.target_kb) * 1024
+    if target <= 0 or options.pil_format == "PNG" or len(data) <= target:
+        return data, quality
+
+    lo, hi = max(1, min(int(options.min_quality), quality)), quality - 1
+    best: Optional[Tuple[bytes, int]] = None
+    while lo <= hi:
+        mid = (lo + hi) // 2
+        candidate = _encode_once(img, options, mid)
+        if len(candidate) <= target:
+            best = (candidate, mid)
+            lo = mid + 1
+        else:
+            hi = mid - 1
+    if best is None:
+        q = max(1, min(int(options.min_quality), quality))
+        best = (_encode_once(img, options, q), q)
+    return best
+
+
+def save_image(img: Image.Image, path: str, options: Optional[EncodeOptions] = None) -> str:
+    """编码并写入文件（扩展名按格式修正），返回实际写入的路径。"""
+    options = options or EncodeOptions()
+    out_path = options.with_extension(path)
+    with render_tracer.span("encode", format=options.pil_format, optimize=options.optimize) as trace_args:
+        if options.target_kb <= 0:
+            # 不需要比较大小时直接写文件，避免在内存中多拷贝一次
+            img = _prepare(img, options.pil_format)
+            img.save(out_path, format=options.pil_format, **_save_kwargs(options, options.quality))
+            return out_path
+
+        data, quality = encode_image(img, options)
+        trace_args.update(quality=quality, bytes=len(data))
+        with open(out_path, "wb") as f:
+            f.write(data)
+        return out_path
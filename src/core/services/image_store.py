@@ -0,0 +1,354 @@
+"""
+内容寻址图片存储
+
+下载的素材（~/.xhs_system/imgs）、内容管理器保存的图片（contents/images）以及各生成器的输出
+（generated_imgs）每次都写新文件，长期运行后目录无限增长，且大量文件字节完全相同。
+
+这里把图片按内容寻址保存：
+- blob：~/.xhs_system/image_store/blobs/<sha256 前两位>/<sha256><扩展名>，相同字节只存一份
+- 引用：业务目录里的文件是 blob 的硬链接（不支持硬链接时退化为复制），路径登记在索引里
+- 索引：~/.xhs_system/image_store/index.sqlite3，记录 SHA-256（完全重复）与 64 位 pHash（近似重复）
+- 回收：gc() 删除已不存在/已被替换的引用，并删除没有任何引用的 blob
+
+注意：登记后的文件与 blob 共享同一份数据，不要原地改写（覆盖请写新文件后替换，put_bytes 即如此）。
+关闭：XHS_IMAGE_STORE=false
+"""
+
+from __future__ import annotations
+
+import hashlib
+import io
+import math
+import os
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+from PIL import Image
+
+PathLike = Union[str, Path]
+
+_PHASH_N = 32
+_PHASH_K = 8
+_PHASH_COS = [[math.cos((2 * x + 1) * u * math.pi / (2 * _PHASH_N)) for x in range(_PHASH_N)] for u in range(_PHASH_K)]
+
+
+def phash(img: Image.Image) -> int:
+    """64 位感知哈希（32x32 灰度图的低频 8x8 DCT 系数与中位数比较）。"""
+    gray = img.convert("L").resize((_PHASH_N, _PHASH_N), Image.Resampling.LANCZOS)
+    px = list(gray.getdata())
+    rows = [px[i * _PHASH_N : (i + 1) * _PHASH_N] for i in range(_PHASH_N)]
+    # 可分离 DCT：先对每行求前 8 个系数，再对列求前 8 个系数
+    row_coeffs = [[sum(c * v for c, v in zip(_PHASH_COS[u], row)) for u in range(_PHASH_K)] for row in rows]
+    coeffs = [
+        sum(_PHASH_COS[v][y] * row_coeffs[y][u] for y in range(_PHASH_N))
+        for v in range(_PHASH_K)
+        for u in range(_PHASH_K)
+    ]
+    ac = sorted(coeffs[1:])  # 中位数不计直流分量
+    median = ac[len(ac) // 2]
+    bits = 0
+    for c in coeffs:
+        bits = (bits << 1) | (1 if c > median else 0)
+    return bits
+
+
+def phash_bytes(data: bytes) -> Optional[int]:
+    try:
+        with Image.open(io.BytesIO(data)) as im:
+            # JPEG 可以在解码时直接缩小，pHash 只需要很小的图
+            im.draft("L", (_PHASH_N * 4, _PHASH_N * 4))
+            return phash(im)
+    except Exception:
+        return None
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(int(a) ^ int(b)).count("1")
+
+
+class ImageStore:
+    """SHA-256 + pHash 索引的内容寻址图片存储（线程安全；多进程共享同一 SQLite 索引）。"""
+
+    def __init__(self, root: Optional[PathLike] = None):
+        self.root = Path(root) if root else Path(os.path.expanduser("~")) / ".xhs_system" / "image_store"
+        self.blobs_dir = self.root / "blobs"
+        self.db_path = self.root / "index.sqlite3"
+        self._lock = threading.Lock()
+        self._initialized = False
+
+    @staticmethod
+    def enabled() -> bool:
+        val = (os.environ.get("XHS_IMAGE_STORE") or "").strip().lower()
+        return val not in {"0", "false", "no", "n", "off"}
+
+    # ------------------------------------------------------------------
+    # 索引
+    # ------------------------------------------------------------------
+
+    def _connect(self) -> sqlite3.Connection:
+        if not self._initialized:
+            self.blobs_dir.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(self.db_path), timeout=10)
+        if not self._initialized:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS blobs (
+                    sha256 TEXT PRIMARY KEY,
+                    ext TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    phash TEXT,
+                    created_at REAL NOT NULL
+                )
+                """
+            )
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS refs (
+                    path TEXT PRIMARY KEY,
+                    sha256 TEXT NOT NULL,
+                    linked INTEGER NOT NULL,
+                    created_at REAL NOT NULL
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_refs_sha256 ON refs (sha256)")
+            conn.commit()
+            self._initialized = True
+        return conn
+
+    def blob_path(self, sha256: str, ext: str) -> Path:
+        return self.blobs_dir / sha256[:2] / f"{sha256}{ext}"
+
+    @staticmethod
+    def _ext_of(path: PathLike) -> str:
+        ext = os.path.splitext(str(path))[1].lower()
+        return ext if ext in {".jpg", ".jpeg", ".png", ".webp", ".bmp", ".gif"} else ".bin"
+
+    # ------------------------------------------------------------------
+    # 文件操作
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _link_into_place(blob: Path, dest: Path) -> bool:
+        """把 blob 以硬链接（失败时复制）的方式原子地放到 dest，返回是否为硬链接。"""
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        tmp = dest.with_name(f".{dest.name}.{uuid.uuid4().hex[:8]}.tmp")
+        try:
+            os.link(blob, tmp)
+            linked = True
+        except OSError:
+            shutil.copyfile(blob, tmp)
+            linked = False
+        os.replace(tmp, dest)
+        return linked
+
+    @staticmethod
+    def _same_file(a: Path, b: Path) -> bool:
+        try:
+            return os.path.samefile(a, b)
+        except OSError:
+            return False
+
+    def _store_blob(self, sha256: str, ext: str, *, data: Optional[bytes] = None, src: Optional[Path] = None) -> Path:
+        blob = self.blob_path(sha256, ext)
+        if blob.exists():
+            return blob
+        blob.parent.mkdir(parents=True, exist_ok=True)
+        tmp = blob.with_name(f".{blob.name}.{uuid.uuid4().hex[:8]}.tmp")
+        if src is not None:
+            try:
+                os.link(src, tmp)
+            except OSError:
+                shutil.copyfile(src, tmp)
+        else:
+            with open(tmp, "wb") as f:
+                f.write(data or b"")
+        os.replace(tmp, blob)
+        return blob
+
+    def _register(self, conn: sqlite3.Connection, sha256: str, ext: str, size: int, data: bytes, dest: Path, linked: bool) -> None:
+        now = time.time()
+        known = conn.execute("SELECT ext FROM blobs WHERE sha256 = ?", (sha256,)).fetchone()
+        if not known:
+            ph = phash_bytes(data)
+            conn.execute(
+                "INSERT OR IGNORE INTO blobs (sha256, ext, size, phash, created_at) VALUES (?, ?, ?, ?, ?)",
+                (sha256, ext, int(size), f"{ph:016x}" if ph is not None else None, now),
+            )
+        conn.execute(
+            "INSERT OR REPLACE INTO refs (path, sha256, linked, created_at) VALUES (?, ?, ?, ?)",
+            (str(dest), sha256, 1 if linked else 0, now),
+        )
+
+    def _existing_blob(self, conn: sqlite3.Connection, sha256: str) -> Optional[Path]:
+        row = conn.execute("SELECT ext FROM blobs WHERE sha256 = ?", (sha256,)).fetchone()
+        if not row:
+            return None
+        blob = self.blob_path(sha256, str(row[0]))
+        return blob if blob.exists() else None
+
+    # ------------------------------------------------------------------
+    # 公开接口
+    # ------------------------------------------------------------------
+
+    def put_bytes(self, data: bytes, dest: PathLike) -> str:
+        """把图片字节保存到 dest（覆盖同名文件）；相同内容只在 blob 中保存一份。"""
+        dest = Path(dest).absolute()
+        sha256 = hashlib.sha256(data).hexdigest()
+        with self._lock:
+            conn = self._connect()
+            try:
+                blob = self._existing_blob(conn, sha256)
+                ext = self._ext_of(blob or dest)
+                if blob is None:
+                    blob = self._store_blob(sha256, ext, data=data)
+                linked = self._same_file(blob, dest) or self._link_into_place(blob, dest)
+                self._register(conn, sha256, ext, len(data), data, dest, linked)
+                conn.commit()
+            finally:
+                conn.close()
+        return str(dest)
+
+    def adopt(self, path: PathLike) -> str:
+        """
+        登记一个已经写好的文件：内容已存在时把该文件替换为已有 blob 的硬链接（释放重复空间），
+        否则把它作为新 blob。返回原路径。
+        """
+        path = Path(path).absolute()
+        data = path.read_bytes()
+        sha256 = hashlib.sha256(data).hexdigest()
+        with self._lock:
+            conn = self._connect()
+            try:
+                blob = self._existing_blob(conn, sha256)
+                ext = self._ext_of(blob or path)
+                if blob is None:
+                    blob = self._store_blob(sha256, ext, src=path)
+                linked = self._same_file(blob, path) or self._link_into_place(blob, path)
+                self._register(conn, sha256, ext, len(data), data, path, linked)
+                conn.commit()
+            finally:
+                conn.close()
+        return str(path)
+
+    def find_duplicate(self, data: bytes, *, under: Optional[PathLike] = None) -> Optional[str]:
+        """返回内容完全相同、仍然有效的已登记文件（可限定在 under 目录下）。"""
+        sha256 = hashlib.sha256(data).hexdigest()
+        prefix = str(Path(under).absolute()) + os.sep if under else ""
+        with self._lock:
+            conn = self._connect()
+            try:
+                rows = conn.execute("SELECT path FROM refs WHERE sha256 = ?", (sha256,)).fetchall()
+            finally:
+                conn.close()
+        for (p,) in rows:
+            if prefix and not str(p).startswith(prefix):
+                continue
+            try:
+                if Path(p).is_file() and Path(p).stat().st_size == len(data):
+                    return str(p)
+            except OSError:
+                continue
+        return None
+
+    def find_similar(self, image: Union[PathLike, Image.Image], max_distance: int = 6) -> List[Tuple[str, int]]:
+        """按 pHash 汉明距离查找近似重复图片，返回 [(已登记路径, 距离)]，按距离升序。"""
+        if isinstance(image, Image.Image):
+            target = phash(image)
+        else:
+            target = phash_bytes(Path(image).read_bytes())
+        if target is None:
+            return []
+        with self._lock:
+            conn = self._connect()
+            try:
+                rows = conn.execute(
+                    "SELECT r.path, b.phash FROM refs r JOIN blobs b ON b.sha256 = r.sha256 WHERE b.phash IS NOT NULL"
+                ).fetchall()
+            finally:
+                conn.close()
+        results = []
+        for p, ph in rows:
+            d = hamming(target, int(ph, 16))
+            if d <= max_distance and Path(p).exists():
+                results.append((str(p), d))
+        results.sort(key=lambda x: x[1])
+        return results
+
+    def gc(self, *, grace_seconds: float = 3600) -> Dict[str, int]:
+        """
+        垃圾回收：
+        - 引用文件已删除、或已被别的内容替换（不再是该 blob 的硬链接）的引用记录删除
+        - 没有任何引用且创建超过 grace_seconds 的 blob 删除
+        """
+        stats = {"refs_removed": 0, "blobs_removed": 0, "bytes_freed": 0}
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            try:
+                blobs = {sha: (ext, size, created) for sha, ext, size, created in conn.execute(
+                    "SELECT sha256, ext, size, created_at FROM blobs"
+                ).fetchall()}
+                stale = []
+                for path, sha, linked in conn.execute("SELECT path, sha256, linked FROM refs").fetchall():
+                    p = Path(path)
+                    info = blobs.get(sha)
+                    if info is None or not p.exists():
+                        stale.append((path,))
+                    elif linked and not self._same_file(self.blob_path(sha, info[0]), p):
+                        stale.append((path,))
+                    elif not linked and p.stat().st_size != int(info[1]):
+                        stale.append((path,))
+                conn.executemany("DELETE FROM refs WHERE path = ?", stale)
+                stats["refs_removed"] = len(stale)
+
+                referenced = {sha for (sha,) in conn.execute("SELECT DISTINCT sha256 FROM refs").fetchall()}
+                doomed = []
+                for sha, (ext, size, created) in blobs.items():
+                    if sha in referenced or now - float(created) < grace_seconds:
+                        continue
+                    try:
+                        self.blob_path(sha, ext).unlink()
+                    except FileNotFoundError:
+                        pass
+                    except OSError:
+                        continue
+                    doomed.append((sha,))
+                    stats["bytes_freed"] += int(size or 0)
+                conn.executemany("DELETE FROM blobs WHERE sha256 = ?", doomed)
+                stats["blobs_removed"] = len(doomed)
+                conn.commit()
+            finally:
+                conn.close()
+        return stats
+
+    def start_gc_in_background(self, *, grace_seconds: float = 3600) -> threading.Thread:
+        def _run() -> None:
+            try:
+                self.gc(grace_seconds=grace_seconds)
+            except Exception as e:
+                print(f"⚠️ 图片存储回收失败: {e}")
+
+        t = threading.Thread(target=_run, name="xhs-image-store-gc", daemon=True)
+        t.start()
+        return t
+
+
+image_store = ImageStore()
+
+
+def store_generated(path: PathLike) -> str:
+    """把生成器输出的文件登记到图片存储（存储关闭或登记失败时不影响原文件），返回原路径。"""
+    if not path or not ImageStore.enabled():
+        return str(path or "")
+    try:
+        return image_store.adopt(path)
+    except Exception as e:
+        print(f"⚠️ 图片登记失败: {e}")
+        return str(path)
@@ -0,0 +1,175 @@
+"""
+排版求解器（fit-to-box 字号搜索）
+
+内容页的三种排版（默认段落 / 卡片列表 / 时间线）都要在“字号序列”里找一个能放进版心的方案。
+原先是逐级缩小（或放大）字号、每一级都重新换行测量整页；长文本要走完 20+ 级。
+
+字号序列本身不变（仍由各排版自己的缩放规则逐级生成），这里只改变搜索方式：
+- 页面总高度随序列下标单调变化 → 倍增 + 二分查找第一个/最后一个满足条件的下标
+- 同一组字号只测量一次（memo），换行结果另由 text_measure.wrap_cache 按 (文本, 字体, 宽度) 复用
+- 选中的下标按页面内容记录在 layout_hints 中：同一页换一个分辨率重新渲染时，先验证上次的下标
+  及其相邻下标，通常两次测量即可确定结果，且与完整搜索一致
+"""
+
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Hashable, List, Optional, Sequence, Tuple
+
+Sizes = Tuple[int, ...]
+
+
+def size_schedule(start: Sizes, step: Callable[[Sizes], Sizes], max_steps: int) -> List[Sizes]:
+    """从 start 开始逐级调用 step 生成字号序列（最多 max_steps 级；字号不再变化时提前结束）。"""
+    seq = [tuple(start)]
+    for _ in range(max(0, int(max_steps))):
+        nxt = tuple(step(seq[-1]))
+        if nxt == seq[-1]:
+            break
+        seq.append(nxt)
+    return seq
+
+
+@dataclass(frozen=True)
+class LayoutSolution:
+    """求解结果：candidates 中的下标、对应字号与测量结果。"""
+
+    index: int
+    sizes: Sizes
+    layout: Any
+    fits: bool
+
+
+class LayoutSolver:
+    """
+    在一条字号序列上搜索排版方案。
+
+    measure(sizes) 返回排版测量结果，height(layout) 取其总高度；同一组字号只测量一次。
+    """
+
+    def __init__(self, measure: Callable[[Sizes], Any], height: Callable[[Any], float]):
+        self._measure = measure
+        self._height = height
+        self._memo: Dict[Sizes, Any] = {}
+
+    @property
+    def measured(self) -> int:
+        return len(self._memo)
+
+    def layout(self, sizes: Sizes) -> Any:
+        sizes = tuple(sizes)
+        if sizes not in self._memo:
+            self._memo[sizes] = self._measure(sizes)
+        return self._memo[sizes]
+
+    def height(self, sizes: Sizes) -> float:
+        return float(self._height(self.layout(sizes)))
+
+    def _first_true(self, n: int, pred: Callable[[int], bool], lo: int = 0, hint: Optional[int] = None) -> int:
+        """
+        pred 在 [lo, n) 上单调（False...True）时，返回第一个为 True 的下标；全为 False 时返回 n。
+
+        没有 hint 时从 lo 开始倍增探测（lo, lo+1, lo+3, lo+7...）再二分：常见情况是初始字号
+        就满足，只需一次测量。
+        """
+        hi = n
+        if hint is not None and lo <= hint < n:
+            if pred(hint):
+                if hint == lo or not pred(hint - 1):
+                    return hint
+                hi = hint - 1
+            elif hint + 1 >= n:
+                return n
+            elif pred(hint + 1):
+                return hint + 1
+            else:
+                lo = hint + 2
+        else:
+            probe, step = lo, 1
+            while probe < n:
+                if pred(probe):
+                    hi = probe
+                    break
+                lo = probe + 1
+                probe += step
+                step *= 2
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if pred(mid):
+                hi = mid
+            else:
+                lo = mid + 1
+        return lo
+
+    def first_fit(self, candidates: Sequence[Sizes], limit: float, *, hint: Optional[int] = None) -> LayoutSolution:
+        """
+        第一个总高度不超过 limit 的方案（等价于“逐级缩小直到放得下”）；
+        都放不下时返回最后一个方案（fits=False）。
+        """
+        n = len(candidates)
+        if n <= 0:
+            raise ValueError("candidates 不能为空")
+        i = self._first_true(n, lambda k: self.height(candidates[k]) <= limit, hint=hint)
+        fits = i < n
+        i = min(i, n - 1)
+        return LayoutSolution(i, tuple(candidates[i]), self.layout(candidates[i]), fits)
+
+    def grow(
+        self,
+        candidates: Sequence[Sizes],
+        limit: float,
+        *,
+        enough: float,
+        hint: Optional[int] = None,
+    ) -> LayoutSolution:
+        """
+        从 candidates[0] 开始逐级放大：当前方案高度已达到 enough、或下一级会超过 limit 时停止。
+
+        高度单调时结果等价于：min(第一个高度 >= enough 的下标, 最后一个高度 <= limit 的下标)，
+        这里用两次二分求得。
+        """
+        n = len(candidates)
+        if n <= 0:
+            raise ValueError("candidates 不能为空")
+        a = self._first_true(n, lambda k: self.height(candidates[k]) >= enough, hint=hint)
+        # 下一级超过 limit 的第一个位置（只看第 1 级以后）
+        b = self._first_true(n, lambda k: self.height(candidates[k]) > limit, lo=1, hint=None if hint is None else hint + 1) - 1
+        i = max(0, min(a, b, n - 1))
+        return LayoutSolution(i, tuple(candidates[i]), self.layout(candidates[i]), self.height(candidates[i]) <= limit)
+
+
+class LayoutHintCache:
+    """
+    按页面内容记录上次选中的序列下标（线程安全，LRU）。
+
+    键由调用方给出（排版类型 + 文本等），与分辨率无关：换分辨率重新渲染同一页时作为搜索起点。
+    """
+
+    def __init__(self, max_entries: int = 2048):
+        self.max_entries = max(1, int(max_entries))
+        self._hints: "OrderedDict[Hashable, Tuple[int, ...]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Tuple[int, ...]]:
+        with self._lock:
+            val = self._hints.get(key)
+            if val is not None:
+                self._hints.move_to_end(key)
+            return val
+
+    def put(self, key: Hashable, value: Tuple[int, ...]) -> None:
+        with self._lock:
+            self._hints[key] = tuple(value)
+            self._hints.move_to_end(key)
+            while len(self._hints) > self.max_entries:
+                self._hints.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._hints.clear()
+
+
+# 全局排版提示（进程内共享）
+layout_hints = LayoutHintCache()
@@ -0,0 +1,177 @@
+"""
+大模型响应缓存
+
+以“规范化后的 messages + 模型参数 + 模板 id”的哈希为键，把模型原始返回文本缓存在
+~/.xhs_system/llm_cache.sqlite3，用于定时任务失败重试等场景直接复用上一次的结果。
+调用方显式传 use_cache=True 才会读取缓存；用户主动生成/重新生成总是请求模型（并刷新缓存条目）。
+
+- TTL：超过有效期的条目在读取时删除（XHS_LLM_CACHE_TTL，秒，默认 7 天）
+- 容量：总大小超过上限时按最近访问时间淘汰（XHS_LLM_CACHE_MAX_MB，默认 50MB）
+- 关闭：XHS_LLM_CACHE=false
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+
+class LLMResponseCache:
+    """SQLite 持久化的 LRU + TTL 缓存（线程安全）。"""
+
+    def __init__(
+        self,
+        db_path: Optional[Path] = None,
+        *,
+        ttl_seconds: Optional[float] = None,
+        max_bytes: Optional[int] = None,
+    ):
+        self.db_path = Path(db_path) if db_path else Path(os.path.expanduser("~")) / ".xhs_system" / "llm_cache.sqlite3"
+        self.ttl_seconds = float(ttl_seconds) if ttl_seconds is not None else self._env_float("XHS_LLM_CACHE_TTL", 7 * 24 * 3600)
+        if max_bytes is None:
+            max_bytes = int(self._env_float("XHS_LLM_CACHE_MAX_MB", 50) * 1024 * 1024)
+        self.max_bytes = max(0, int(max_bytes))
+        self._lock = threading.Lock()
+        self._initialized = False
+
+    @staticmethod
+    def _env_float(name: str, default: float) -> float:
+        val = (os.environ.get(name) or "").strip()
+        if not val:
+            return float(default)
+        try:
+            return float(val)
+        except Exception:
+            return float(default)
+
+    @staticmethod
+    def enabled() -> bool:
+        val = (os.environ.get("XHS_LLM_CACHE") or "").strip().lower()
+        return val not in {"0", "false", "no", "n", "off"}
+
+    @staticmethod
+    def make_key(messages: List[Dict[str, str]], model_params: Dict[str, Any], template_id: str = "") -> str:
+        """对 messages 做换行/首尾空白规范化后，与模型参数、模板 id 一起取 SHA-256。"""
+        normalized = []
+        for msg in messages or []:
+            content = str((msg or {}).get("content") or "").replace("\r\n", "\n").strip()
+            normalized.append({"role": str((msg or {}).get("role") or ""), "content": content})
+        material = {
+            "messages": normalized,
+            "model": model_params or {},
+            "template_id": str(template_id or ""),
+        }
+        blob = json.dumps(material, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+    def _connect(self) -> sqlite3.Connection:
+        if not self._initialized:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(self.db_path), timeout=10)
+        if not self._initialized:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS llm_cache (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_accessed ON llm_cache (accessed_at)")
+            conn.commit()
+            self._initialized = True
+        return conn
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        try:
+            with self._lock:
+                conn = self._connect()
+                try:
+                    row = conn.execute("SELECT value, created_at FROM llm_cache WHERE key = ?", (key,)).fetchone()
+                    if not row:
+                        return None
+                    value, created_at = row
+                    if self.ttl_seconds > 0 and now - float(created_at) > self.ttl_seconds:
+                        conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                        conn.commit()
+                        return None
+                    conn.execute("UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (now, key))
+                    conn.commit()
+                    return str(value)
+                finally:
+                    conn.close()
+        except Exception:
+            return None
+
+    def set(self, key: str, value: str) -> None:
+        if not value:
+            return
+        now = time.time()
+        size = len(value.encode("utf-8"))
+        try:
+            with self._lock:
+                conn = self._connect()
+                try:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO llm_cache (key, value, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                        (key, value, size, now, now),
+                    )
+                    self._evict(conn)
+                    conn.commit()
+                finally:
+                    conn.close()
+        except Exception:
+            pass
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        if self.max_bytes <= 0:
+            return
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM llm_cache").fetchone()[0] or 0
+        if total <= self.max_bytes:
+            return
+        rows = conn.execute("SELECT key, size FROM llm_cache ORDER BY accessed_at ASC").fetchall()
+        doomed = []
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            doomed.append((key,))
+            total -= int(size or 0)
+        conn.executemany("DELETE FROM llm_cache WHERE key = ?", doomed)
+
+    def delete(self, key: str) -> None:
+        try:
+            with self._lock:
+                conn = self._connect()
+                try:
+                    conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                    conn.commit()
+                finally:
+                    conn.close()
+        except Exception:
+            pass
+
+    def clear(self) -> None:
+        try:
+            with self._lock:
+                conn = self._connect()
+                try:
+                    conn.execute("DELETE FROM llm_cache")
+                    conn.commit()
+                finally:
+                    conn.close()
+        except Exception:
+            pass
+
+
+llm_response_cache = LLMResponseCache()
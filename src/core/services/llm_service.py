@@ -6,25 +6,38 @@ LLM 文本生成服务
 - OpenAI 兼容接口：/v1/chat/completions
 - Anthropic Claude：/v1/messages
 - Ollama：/api/chat
+
+可选：model.fallbacks 配置备用端点列表（按顺序故障转移，端点连续失败会熔断一段时间）；
+model.hedge.enabled 开启对冲请求（首选端点超过近期 p95 耗时未返回时，并发请求下一个端点）。
 """
 
 from __future__ import annotations
 
-from dataclasses import dataclass
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
 import ast
+import asyncio
 import json
 import os
 import re
 import sys
+import threading
+import time
 import unicodedata
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
 from urllib.parse import urlparse
 
+import httpx
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 from src.config.config import Config
 from src.core.ai_integration.api_key_manager import api_key_manager
+from src.core.services.llm_response_cache import LLMResponseCache, llm_response_cache
+from src.core.services.llm_telemetry import LLMTelemetry, llm_telemetry
 
 
 class LLMServiceError(RuntimeError):
@@ -48,11 +61,64 @@ class PromptTemplate:
     system_prompt: str = ""
 
 
+@dataclass
+class _EndpointHealth:
+    failures: int = 0
+    open_until: float = 0.0
+    latencies: Deque[float] = field(default_factory=lambda: deque(maxlen=50))
+
+    def p95(self, min_samples: int = 5) -> Optional[float]:
+        if len(self.latencies) < min_samples:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+
+class _AsyncRateLimiter:
+    """按固定最小间隔放行请求（每秒最多 rate 次；rate<=0 表示不限速）。"""
+
+    def __init__(self, rate: float):
+        self._interval = 1.0 / rate if rate and rate > 0 else 0.0
+        self._lock = asyncio.Lock()
+        self._next_at = 0.0
+
+    async def acquire(self) -> None:
+        if self._interval <= 0:
+            return
+        async with self._lock:
+            loop = asyncio.get_running_loop()
+            now = loop.time()
+            wait = self._next_at - now
+            if wait > 0:
+                await asyncio.sleep(wait)
+                now = loop.time()
+            self._next_at = max(now, self._next_at) + self._interval
+
+
 class LLMService:
     """可配置的大模型调用封装。"""
 
-    def __init__(self, config: Optional[Config] = None):
+    def __init__(
+        self,
+        config: Optional[Config] = None,
+        cache: Optional[LLMResponseCache] = None,
+        telemetry: Optional[LLMTelemetry] = None,
+    ):
         self.config = config or Config()
+        self.cache = cache or llm_response_cache
+        self.telemetry = telemetry or llm_telemetry
+        # 按端点（scheme://host:port）复用 HTTP 连接池，避免每次生成都重新握手 TCP/TLS
+        self._sessions: Dict[str, Tuple[Tuple[int, int, bool], requests.Session]] = {}
+        self._sessions_lock = threading.Lock()
+        # prompt 模板索引：文件路径 -> ((mtime_ns, size), 解析结果)；仅在文件变化时重新解析
+        self._template_files: Dict[str, Tuple[Tuple[int, int], Optional[PromptTemplate]]] = {}
+        self._templates_by_id: Dict[str, PromptTemplate] = {}
+        self._templates_dir: Optional[Path] = None
+        self._templates_lock = threading.Lock()
+        # 端点健康状态（熔断/延迟统计）与对冲请求线程池
+        self._health: Dict[str, _EndpointHealth] = {}
+        self._health_lock = threading.Lock()
+        self._hedge_executor: Optional[ThreadPoolExecutor] = None
 
     @staticmethod
     def _env_flag(name: str, *, default: bool = False) -> bool:
@@ -255,23 +321,21 @@ class LLMService:
 
         return True, ""
 
-    def generate_xiaohongshu_content(
-        self,
-        topic: str,
-        header_title: str = "",
-        author: str = "",
-    ) -> LLMResponse:
-        # 配置可能在 UI 中被用户修改；每次调用前重新加载一次
+    def _load_model_config(self) -> Dict[str, Any]:
+        # 配置可能在 UI 中被用户修改；settings.json 变化（mtime/size）时才重新加载
         try:
-            self.config.load_config()
+            self.config.reload_if_changed()
         except Exception:
             pass
+        return self._apply_env_model_config_overrides(self.config.get_model_config())
 
-        model_config = self._apply_env_model_config_overrides(self.config.get_model_config())
-        ok, reason = self.is_model_configured(model_config)
-        if not ok:
-            raise LLMServiceError(f"模型配置不可用: {reason}")
-
+    def _build_xiaohongshu_messages(
+        self,
+        model_config: Dict[str, Any],
+        topic: str,
+        header_title: str,
+        author: str,
+    ) -> List[Dict[str, str]]:
         system_prompt = (model_config.get("system_prompt") or "").strip()
 
         template_id = (model_config.get("prompt_template") or "").strip()
@@ -286,32 +350,73 @@ class LLMService:
         if system_prompt:
             messages.append({"role": "system", "content": system_prompt})
         messages.append({"role": "user", "content": user_prompt})
+        return messages
 
-        raw_text = self._call_model(model_config, messages)
-        parsed = self._try_parse_json(raw_text)
+    def _prepare_xiaohongshu_request(
+        self,
+        topic: str,
+        header_title: str,
+        author: str,
+    ) -> Tuple[Dict[str, Any], List[Dict[str, str]]]:
+        model_config = self._load_model_config()
+        ok, reason = self.is_model_configured(model_config)
+        if not ok:
+            raise LLMServiceError(f"模型配置不可用: {reason}")
+        return model_config, self._build_xiaohongshu_messages(model_config, topic, header_title, author)
 
+    def _build_xiaohongshu_response(
+        self,
+        topic: str,
+        header_title: str,
+        author: str,
+        raw_text: str,
+        model_config: Optional[Dict[str, Any]] = None,
+    ) -> LLMResponse:
+        parsed = self._try_parse_json(raw_text)
+        self._record_parse_telemetry(model_config, parsed, "xiaohongshu")
         title, content = self._extract_title_content(topic, header_title, author, raw_text, parsed)
         return LLMResponse(title=title, content=content, raw_text=raw_text, raw_json=parsed)
 
+    def generate_xiaohongshu_content(
+        self,
+        topic: str,
+        header_title: str = "",
+        author: str = "",
+        *,
+        stream_callback: Optional[Callable[[str], None]] = None,
+        use_cache: bool = False,
+    ) -> LLMResponse:
+        """生成小红书文案。
+
+        - stream_callback：以流式请求模型，并逐段回调增量文本；回调空字符串表示切换到备用端点重新输出，
+          调用方应清空已显示的内容
+        - use_cache=True：相同请求命中响应缓存时直接复用（用于定时任务重试等）；默认总是重新请求模型，
+          用户点“生成”即可得到新的文案，结果仍会写入缓存供之后的重试复用
+        """
+        model_config, messages = self._prepare_xiaohongshu_request(topic, header_title, author)
+        raw_text = self._call_model(
+            model_config,
+            messages,
+            stream_callback=stream_callback,
+            use_cache=use_cache,
+            cache_namespace="xiaohongshu",
+        )
+        return self._build_xiaohongshu_response(topic, header_title, author, raw_text, model_config)
+
     def generate_marketing_poster_content(
         self,
         topic: str,
         *,
         price: str = "",
         keyword: str = "",
+        use_cache: bool = False,
     ) -> Dict[str, Any]:
-        """生成“营销海报”渲染器所需的结构化 JSON。"""
+        """生成“营销海报”渲染器所需的结构化 JSON（use_cache=True 时优先复用响应缓存）。"""
         topic = (topic or "").strip() or "营销海报"
         price_text = (price or "").strip()
         keyword_text = (keyword or "").strip()
 
-        # 配置可能在 UI 中被用户修改；每次调用前重新加载一次
-        try:
-            self.config.load_config()
-        except Exception:
-            pass
-
-        model_config = self._apply_env_model_config_overrides(self.config.get_model_config())
+        model_config = self._load_model_config()
         ok, reason = self.is_model_configured(model_config)
         if not ok:
             fallback = self._generate_default_marketing_poster_content(topic, price=price_text, keyword=keyword_text)
@@ -367,6 +472,8 @@ class LLMService:
                     {"role": "system", "content": system},
                     {"role": "user", "content": user},
                 ],
+                use_cache=use_cache,
+                cache_namespace="marketing_poster",
             )
         except Exception as e:
             fallback = self._generate_default_marketing_poster_content(topic, price=price_text, keyword=keyword_text)
@@ -374,6 +481,7 @@ class LLMService:
             fallback["__error"] = f"模型请求失败: {str(e)}"
             return fallback
         data = self._try_parse_json(raw_text) or {}
+        self._record_parse_telemetry(model_config, data or None, "marketing_poster")
         if not isinstance(data, dict):
             fallback = self._generate_default_marketing_poster_content(topic, price=price_text, keyword=keyword_text)
             fallback["__source"] = "default"
@@ -521,12 +629,50 @@ class LLMService:
             "disclaimer": "仅供参考｜请遵守平台规则",
         }
 
+    def _refresh_prompt_template_index(self) -> Dict[str, PromptTemplate]:
+        """按 (mtime, size) 增量刷新模板索引：只 stat 目录项，变化的文件才重新解析 JSON。"""
+        directory = self._get_prompt_templates_dir()
+        with self._templates_lock:
+            if directory != self._templates_dir:
+                self._template_files = {}
+                self._templates_dir = directory
+
+            seen: Dict[str, Tuple[Tuple[int, int], Optional[PromptTemplate]]] = {}
+            changed = False
+            try:
+                entries = list(os.scandir(directory))
+            except OSError:
+                entries = []
+            for entry in entries:
+                if not entry.name.endswith(".json"):
+                    continue
+                try:
+                    st = entry.stat()
+                    if not entry.is_file():
+                        continue
+                except OSError:
+                    continue
+                signature = (st.st_mtime_ns, st.st_size)
+                cached = self._template_files.get(entry.path)
+                if cached and cached[0] == signature:
+                    seen[entry.path] = cached
+                    continue
+                seen[entry.path] = (signature, self._load_prompt_template_file(Path(entry.path)))
+                changed = True
+
+            if changed or len(seen) != len(self._template_files):
+                self._template_files = seen
+                by_id: Dict[str, PromptTemplate] = {}
+                # id 重复时按文件路径排序取第一个，保证结果稳定
+                for path in sorted(seen):
+                    tpl = seen[path][1]
+                    if tpl and tpl.id not in by_id:
+                        by_id[tpl.id] = tpl
+                self._templates_by_id = by_id
+            return self._templates_by_id
+
     def list_prompt_templates(self) -> List[PromptTemplate]:
-        templates: List[PromptTemplate] = []
-        for path in self._get_prompt_templates_dir().glob("*.json"):
-            tpl = self._load_prompt_template_file(path)
-            if tpl:
-                templates.append(tpl)
+        templates = list(self._refresh_prompt_template_index().values())
         templates.sort(key=lambda t: t.name)
         return templates
 
@@ -540,11 +686,7 @@ class LLMService:
             return None
 
         # 按 id 精确匹配
-        for tpl in self.list_prompt_templates():
-            if tpl.id == template_id:
-                return tpl
-
-        return None
+        return self._refresh_prompt_template_index().get(template_id)
 
     def build_prompt_from_template(self, template_id: str, topic: str, header_title: str, author: str) -> str:
         tpl = self.get_prompt_template(template_id)
@@ -649,8 +791,8 @@ class LLMService:
 }}
 """.strip()
 
-    def _call_model(self, model_config: Dict[str, Any], messages: List[Dict[str, str]]) -> str:
-        model_config = self._apply_env_model_config_overrides(model_config)
+    def _route_model_call(self, model_config: Dict[str, Any]) -> Tuple[str, str, float, int, float]:
+        """解析端点类型与请求参数：返回 (kind, url, temperature, max_tokens, timeout)。"""
         endpoint = (model_config.get("api_endpoint") or "").strip()
         provider = (model_config.get("provider") or "").strip()
 
@@ -689,15 +831,368 @@ class LLMService:
 
         # Claude / Anthropic
         if provider.startswith("Claude") or endpoint.rstrip("/").endswith("/v1/messages") or "api.anthropic.com" in endpoint:
-            return self._call_anthropic(endpoint, model_config, messages, temperature, max_tokens, timeout)
+            return "anthropic", endpoint, temperature, max_tokens, timeout
 
         # Ollama (native)
         if endpoint.rstrip("/").endswith("/api/chat") or "/api/chat" in endpoint:
-            return self._call_ollama(endpoint, model_config, messages, temperature, max_tokens, timeout)
+            return "ollama", endpoint, temperature, max_tokens, timeout
 
         # Default: OpenAI compatible
         url = self._normalize_openai_chat_completions_endpoint(endpoint)
-        return self._call_openai_compatible(url, model_config, messages, temperature, max_tokens, timeout)
+        return "openai", url, temperature, max_tokens, timeout
+
+    def _call_model(
+        self,
+        model_config: Dict[str, Any],
+        messages: List[Dict[str, str]],
+        *,
+        stream_callback: Optional[Callable[[str], None]] = None,
+        use_cache: bool = False,
+        cache_namespace: str = "",
+    ) -> str:
+        model_config = self._apply_env_model_config_overrides(model_config)
+        kind, url, temperature, max_tokens, timeout = self._route_model_call(model_config)
+
+        # use_cache 只控制是否读取缓存；重新生成的结果总会刷新缓存条目
+        cache_key = ""
+        if (use_cache or cache_namespace) and LLMResponseCache.enabled():
+            cache_key = self._response_cache_key(
+                cache_namespace, model_config, messages, kind, url, temperature, max_tokens
+            )
+        if cache_key and use_cache:
+            cached = self.cache.get(cache_key)
+            if cached:
+                if stream_callback is not None:
+                    try:
+                        stream_callback(cached)
+                    except Exception:
+                        pass
+                return cached
+
+        candidates = self._candidate_model_configs(model_config)
+        if len(candidates) == 1:
+            raw_text = self._call_single_model(model_config, messages, stream_callback=stream_callback)
+        else:
+            raw_text = self._call_with_failover(candidates, messages, stream_callback=stream_callback)
+
+        # 只缓存能解析为 JSON 的结果，避免把一次“跑偏”的输出长期固化
+        if cache_key and isinstance(self._try_parse_json(raw_text), dict):
+            self.cache.set(cache_key, raw_text)
+        return raw_text
+
+    def _call_single_model(
+        self,
+        model_config: Dict[str, Any],
+        messages: List[Dict[str, str]],
+        *,
+        stream_callback: Optional[Callable[[str], None]] = None,
+    ) -> str:
+        """请求单个端点，并把耗时/成败记入该端点的健康状态。"""
+        kind, url, temperature, max_tokens, timeout = self._route_model_call(model_config)
+        health_key = self._health_key(model_config, url)
+        started = time.monotonic()
+        try:
+            if kind == "anthropic":
+                raw_text = self._call_anthropic(
+                    url, model_config, messages, temperature, max_tokens, timeout, stream_callback=stream_callback
+                )
+            elif kind == "ollama":
+                raw_text = self._call_ollama(
+                    url, model_config, messages, temperature, max_tokens, timeout, stream_callback=stream_callback
+                )
+            else:
+                raw_text = self._call_openai_compatible(
+                    url, model_config, messages, temperature, max_tokens, timeout, stream_callback=stream_callback
+                )
+        except Exception:
+            self._record_health(health_key, ok=False)
+            raise
+        self._record_health(health_key, ok=True, latency=time.monotonic() - started)
+        return raw_text
+
+    # ---- 多端点故障转移 / 对冲请求 ----
+
+    def _candidate_model_configs(self, model_config: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """主配置 + model.fallbacks 中可用的备用端点（按配置顺序）。
+
+        备用端点未填写 advanced/system_prompt/prompt_template 时沿用主配置；
+        api_key 等鉴权信息不会跨端点继承。
+        """
+        candidates = [model_config]
+        fallbacks = model_config.get("fallbacks") or []
+        if not isinstance(fallbacks, list):
+            return candidates
+        for fb in fallbacks:
+            if not isinstance(fb, dict):
+                continue
+            cfg = dict(fb)
+            cfg.pop("fallbacks", None)
+            for key in ("advanced", "system_prompt", "prompt_template"):
+                if key not in cfg and key in model_config:
+                    cfg[key] = model_config[key]
+            ok, _reason = self.is_model_configured(cfg)
+            if ok:
+                candidates.append(cfg)
+        return candidates
+
+    @staticmethod
+    def _health_key(model_config: Dict[str, Any], url: str) -> str:
+        return f"{url}|{(model_config.get('model_name') or '').strip()}"
+
+    def _breaker_settings(self) -> Tuple[int, float]:
+        threshold = max(1, self._env_int("XHS_LLM_BREAKER_THRESHOLD", 3))
+        try:
+            cooldown = float((os.environ.get("XHS_LLM_BREAKER_COOLDOWN") or "60").strip() or 60)
+        except Exception:
+            cooldown = 60.0
+        return threshold, max(0.0, cooldown)
+
+    def _record_health(self, key: str, *, ok: bool, latency: Optional[float] = None) -> None:
+        threshold, cooldown = self._breaker_settings()
+        with self._health_lock:
+            health = self._health.get(key)
+            if health is None:
+                health = self._health[key] = _EndpointHealth()
+            if ok:
+                health.failures = 0
+                health.open_until = 0.0
+                if latency is not None:
+                    health.latencies.append(float(latency))
+                return
+            health.failures += 1
+            if health.failures >= threshold:
+                # 熔断：冷却期内跳过该端点；冷却结束后放行一次试探（半开）
+                health.open_until = time.monotonic() + cooldown
+
+    def _is_circuit_open(self, key: str) -> bool:
+        with self._health_lock:
+            health = self._health.get(key)
+            return bool(health and health.open_until > time.monotonic())
+
+    def _order_by_health(self, candidates: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """熔断中的端点排到最后（全部熔断时仍按原顺序尝试）。"""
+        available: List[Dict[str, Any]] = []
+        tripped: List[Dict[str, Any]] = []
+        for cfg in candidates:
+            _kind, url, _t, _m, _timeout = self._route_model_call(cfg)
+            (tripped if self._is_circuit_open(self._health_key(cfg, url)) else available).append(cfg)
+        return available + tripped
+
+    def _hedge_delay(self, model_config: Dict[str, Any]) -> Optional[float]:
+        """对冲请求的触发延迟：主端点近期 p95 耗时（样本不足时用 hedge.after_seconds）；未开启返回 None。"""
+        hedge = model_config.get("hedge") or {}
+        if not isinstance(hedge, dict):
+            hedge = {"enabled": bool(hedge)}
+        enabled = self._env_flag("XHS_LLM_HEDGE", default=bool(hedge.get("enabled", False)))
+        if not enabled:
+            return None
+
+        try:
+            after = float(hedge.get("after_seconds", 20))
+        except Exception:
+            after = 20.0
+        after_env = (os.environ.get("XHS_LLM_HEDGE_AFTER") or "").strip()
+        if after_env:
+            try:
+                after = float(after_env)
+            except Exception:
+                pass
+
+        _kind, url, _t, _m, _timeout = self._route_model_call(model_config)
+        with self._health_lock:
+            health = self._health.get(self._health_key(model_config, url))
+            p95 = health.p95() if health else None
+        if p95 is not None:
+            after = p95
+        return max(0.5, after)
+
+    def _get_hedge_executor(self) -> ThreadPoolExecutor:
+        with self._health_lock:
+            if self._hedge_executor is None:
+                self._hedge_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="llm-hedge")
+            return self._hedge_executor
+
+    def _call_with_failover(
+        self,
+        candidates: List[Dict[str, Any]],
+        messages: List[Dict[str, str]],
+        *,
+        stream_callback: Optional[Callable[[str], None]] = None,
+    ) -> str:
+        ordered = self._order_by_health(candidates)
+
+        # 流式输出只能来自一个端点，不做对冲
+        hedge_after = self._hedge_delay(ordered[0]) if stream_callback is None else None
+        if hedge_after is not None:
+            return self._call_hedged(ordered, messages, hedge_after)
+
+        last_error: Optional[Exception] = None
+        for idx, cfg in enumerate(ordered):
+            if idx and stream_callback is not None:
+                # 上一个端点可能已输出部分内容：先回调空字符串，通知调用方清空后再接收新端点的输出
+                try:
+                    stream_callback("")
+                except Exception:
+                    pass
+            try:
+                return self._call_single_model(cfg, messages, stream_callback=stream_callback)
+            except LLMServiceError as e:
+                last_error = e
+        raise last_error or LLMServiceError("模型请求失败: 无可用端点")
+
+    def _call_hedged(self, ordered: List[Dict[str, Any]], messages: List[Dict[str, str]], hedge_after: float) -> str:
+        """先请求首选端点；超过 hedge_after 仍未返回则并发请求下一个端点，取先成功者。"""
+        executor = self._get_hedge_executor()
+        queue = list(ordered)
+        pending = {executor.submit(self._call_single_model, queue.pop(0), messages)}
+        hedged = False
+        last_error: Optional[Exception] = None
+
+        while pending:
+            timeout = hedge_after if (queue and not hedged) else None
+            done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                hedged = True
+                pending.add(executor.submit(self._call_single_model, queue.pop(0), messages))
+                continue
+            for future in done:
+                try:
+                    return future.result()
+                except Exception as e:
+                    last_error = e
+            # 已失败的端点直接转移到下一个（不再等待对冲延迟）
+            if not pending and queue:
+                pending.add(executor.submit(self._call_single_model, queue.pop(0), messages))
+
+        if isinstance(last_error, LLMServiceError):
+            raise last_error
+        raise LLMServiceError(f"模型请求失败: {last_error}")
+
+    @staticmethod
+    def _response_cache_key(
+        namespace: str,
+        model_config: Dict[str, Any],
+        messages: List[Dict[str, str]],
+        kind: str,
+        url: str,
+        temperature: float,
+        max_tokens: int,
+    ) -> str:
+        model_params = {
+            "namespace": namespace,
+            "kind": kind,
+            "url": url,
+            "provider": (model_config.get("provider") or "").strip(),
+            "model_name": (model_config.get("model_name") or "").strip(),
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+        }
+        template_id = (model_config.get("prompt_template") or "").strip()
+        return LLMResponseCache.make_key(messages, model_params, template_id)
+
+    @staticmethod
+    def _env_int(name: str, default: int) -> int:
+        val = (os.environ.get(name) or "").strip()
+        if not val:
+            return default
+        try:
+            return int(float(val))
+        except Exception:
+            return default
+
+    def _http_pool_settings(self, model_config: Dict[str, Any]) -> Tuple[int, int, bool]:
+        """连接池参数：advanced.pool_size / max_retries / keep_alive，可被 XHS_LLM_POOL_SIZE 等环境变量覆盖。"""
+        advanced = (model_config or {}).get("advanced") or {}
+        try:
+            pool_size = int(advanced.get("pool_size", 4))
+        except Exception:
+            pool_size = 4
+        try:
+            max_retries = int(advanced.get("max_retries", 2))
+        except Exception:
+            max_retries = 2
+        keep_alive = advanced.get("keep_alive", True)
+        keep_alive = keep_alive if isinstance(keep_alive, bool) else str(keep_alive).strip().lower() in {"1", "true", "yes", "y", "on"}
+
+        pool_size = max(1, self._env_int("XHS_LLM_POOL_SIZE", pool_size))
+        max_retries = max(0, self._env_int("XHS_LLM_MAX_RETRIES", max_retries))
+        keep_alive = self._env_flag("XHS_LLM_KEEP_ALIVE", default=keep_alive)
+        return pool_size, max_retries, keep_alive
+
+    @staticmethod
+    def _endpoint_origin(url: str) -> str:
+        parsed = urlparse(url or "")
+        scheme = (parsed.scheme or "http").lower()
+        host = (parsed.hostname or "").lower()
+        port = parsed.port or (443 if scheme == "https" else 80)
+        return f"{scheme}://{host}:{port}"
+
+    def _get_http_session(self, url: str, model_config: Dict[str, Any]) -> requests.Session:
+        """获取（或创建）该端点的长连接 Session；参数变化时重建。"""
+        origin = self._endpoint_origin(url)
+        settings = self._http_pool_settings(model_config)
+
+        with self._sessions_lock:
+            cached = self._sessions.get(origin)
+            if cached and cached[0] == settings:
+                return cached[1]
+
+            pool_size, max_retries, keep_alive = settings
+            # 只对连接错误与 429/503（请求未被处理）重试；读超时与 502/504 不重试：
+            # 网关超时时上游可能已完成（并计费）整段生成，交给端点故障转移/熔断处理
+            retry = Retry(
+                total=max_retries,
+                connect=max_retries,
+                read=0,
+                status=max_retries,
+                status_forcelist=(429, 503),
+                allowed_methods=frozenset({"GET", "POST"}),
+                backoff_factor=0.5,
+                raise_on_status=False,
+                respect_retry_after_header=True,
+            )
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+            session = requests.Session()
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            session.headers["Connection"] = "keep-alive" if keep_alive else "close"
+
+            if cached:
+                try:
+                    cached[1].close()
+                except Exception:
+                    pass
+            self._sessions[origin] = (settings, session)
+            return session
+
+    def _post(
+        self,
+        url: str,
+        model_config: Dict[str, Any],
+        *,
+        headers: Optional[Dict[str, str]] = None,
+        payload: Optional[Dict[str, Any]] = None,
+        timeout: float = 30,
+        stream: bool = False,
+    ) -> requests.Response:
+        session = self._get_http_session(url, model_config)
+        return session.post(url, headers=headers, json=payload, timeout=timeout, stream=stream)
+
+    def close(self) -> None:
+        """关闭所有端点的连接池（应用退出时调用）。"""
+        with self._sessions_lock:
+            sessions = list(self._sessions.values())
+            self._sessions.clear()
+        for _settings, session in sessions:
+            try:
+                session.close()
+            except Exception:
+                pass
+
+        with self._health_lock:
+            executor, self._hedge_executor = self._hedge_executor, None
+        if executor is not None:
+            executor.shutdown(wait=False)
 
     def _normalize_openai_chat_completions_endpoint(self, endpoint: str) -> str:
         endpoint = endpoint.strip().rstrip("/")
@@ -723,43 +1218,112 @@ class LLMService:
         # 兜底：如果末尾没有 /v1，假设它是 OpenAI 风格 base_url
         return f"{endpoint}/v1/chat/completions"
 
-    def _call_openai_compatible(
+    @staticmethod
+    def _provider_label(kind: str) -> str:
+        return {"anthropic": "Claude ", "ollama": "Ollama "}.get(kind, "模型")
+
+    def _build_request(
         self,
-        url: str,
+        kind: str,
         model_config: Dict[str, Any],
         messages: List[Dict[str, str]],
         temperature: float,
         max_tokens: int,
-        timeout: float,
-    ) -> str:
-        api_key = self._resolve_api_key(model_config)
+    ) -> Tuple[Dict[str, str], Dict[str, Any]]:
+        """构造 (headers, payload)；同步/异步调用共用。"""
         model_name = (model_config.get("model_name") or "").strip()
 
-        headers: Dict[str, str] = {"Content-Type": "application/json"}
+        if kind == "anthropic":
+            api_key = self._resolve_api_key(model_config)
+            system_prompt = ""
+            normalized_messages: List[Dict[str, Any]] = []
+            for msg in messages:
+                role = msg.get("role")
+                content = msg.get("content") or ""
+                if role == "system":
+                    system_prompt = content
+                elif role in {"user", "assistant"}:
+                    normalized_messages.append({"role": role, "content": content})
+
+            headers = {
+                "Content-Type": "application/json",
+                "x-api-key": api_key,
+                "anthropic-version": "2023-06-01",
+            }
+            payload: Dict[str, Any] = {
+                "model": model_name,
+                "max_tokens": max_tokens,
+                "temperature": temperature,
+                "messages": normalized_messages,
+            }
+            if system_prompt:
+                payload["system"] = system_prompt
+            return headers, payload
+
+        if kind == "ollama":
+            payload = {
+                "model": model_name,
+                "messages": messages,
+                "stream": False,
+                "options": {
+                    "temperature": temperature,
+                    "num_predict": max_tokens,
+                },
+            }
+            return {}, payload
+
+        api_key = self._resolve_api_key(model_config)
+        headers = {"Content-Type": "application/json"}
         if api_key:
             headers["Authorization"] = f"Bearer {api_key}"
 
-        payload: Dict[str, Any] = {
+        payload = {
             "model": model_name,
             "messages": messages,
             "temperature": temperature,
             "max_tokens": max_tokens,
             "stream": False,
         }
+        return headers, payload
 
-        try:
-            resp = requests.post(url, headers=headers, json=payload, timeout=timeout)
-        except requests.exceptions.RequestException as e:
-            raise LLMServiceError(f"模型请求失败: {e}") from e
-
+    @staticmethod
+    def _decode_response(label: str, resp: Any) -> Dict[str, Any]:
+        """校验状态码并解析 JSON（兼容 requests / httpx 响应对象）。"""
         if resp.status_code != 200:
             detail = (resp.text or "")[:500]
-            raise LLMServiceError(f"模型接口返回错误: HTTP {resp.status_code}: {detail}")
+            raise LLMServiceError(f"{label}接口返回错误: HTTP {resp.status_code}: {detail}")
 
         try:
-            data = resp.json()
+            return resp.json()
         except Exception as e:
-            raise LLMServiceError("模型接口返回非 JSON 响应") from e
+            raise LLMServiceError(f"{label}接口返回非 JSON 响应") from e
+
+    def _parse_response(self, kind: str, data: Dict[str, Any]) -> str:
+        if kind == "anthropic":
+            # Anthropic messages API: content is a list of blocks
+            content_blocks = data.get("content") or []
+            if isinstance(content_blocks, list) and content_blocks:
+                first = content_blocks[0] or {}
+                text = first.get("text")
+                if text:
+                    return str(text)
+
+            if isinstance(content_blocks, str) and content_blocks.strip():
+                return content_blocks
+
+            raise LLMServiceError("Claude 响应为空")
+
+        if kind == "ollama":
+            message = data.get("message") or {}
+            content = message.get("content")
+            if content:
+                return str(content)
+
+            # 兼容 /api/generate 等返回
+            if data.get("response"):
+                return str(data["response"])
+
+            raise LLMServiceError("Ollama 响应为空")
 
         # OpenAI chat.completions
         try:
@@ -780,69 +1344,304 @@ class LLMService:
 
         raise LLMServiceError("模型响应为空")
 
-    def _call_anthropic(
+    @staticmethod
+    def _extract_usage(kind: str, data: Dict[str, Any]) -> Dict[str, Optional[int]]:
+        """从响应中读取 token 用量（OpenAI: usage.prompt/completion_tokens；Claude: input/output_tokens；Ollama: *_eval_count）。"""
+
+        def _int(v: Any) -> Optional[int]:
+            try:
+                return int(v) if v is not None else None
+            except Exception:
+                return None
+
+        if not isinstance(data, dict):
+            return {}
+        if kind == "ollama":
+            return {"prompt_tokens": _int(data.get("prompt_eval_count")), "completion_tokens": _int(data.get("eval_count"))}
+        usage = data.get("usage") or {}
+        if not isinstance(usage, dict):
+            return {}
+        if kind == "anthropic":
+            return {"prompt_tokens": _int(usage.get("input_tokens")), "completion_tokens": _int(usage.get("output_tokens"))}
+        return {"prompt_tokens": _int(usage.get("prompt_tokens")), "completion_tokens": _int(usage.get("completion_tokens"))}
+
+    @staticmethod
+    def _response_elapsed(resp: Any) -> Optional[float]:
+        """请求发出到收到响应头的耗时（requests/httpx 的 elapsed），不可用时返回 None。"""
+        try:
+            elapsed = resp.elapsed
+            return elapsed.total_seconds() if elapsed is not None else None
+        except Exception:
+            return None
+
+    @staticmethod
+    def _classify_transport_error(exc: BaseException) -> str:
+        if isinstance(exc, (requests.exceptions.Timeout, httpx.TimeoutException)):
+            return "timeout"
+        return "connection"
+
+    def _record_call_telemetry(
         self,
+        kind: str,
+        url: str,
+        model_config: Dict[str, Any],
+        started: float,
+        *,
+        ok: bool,
+        error: str = "",
+        ttfb: Optional[float] = None,
+        usage: Optional[Dict[str, Optional[int]]] = None,
+        stream: bool = False,
+    ) -> None:
+        usage = usage or {}
+        self.telemetry.record_call(
+            provider=(model_config.get("provider") or "").strip() or kind,
+            model=(model_config.get("model_name") or "").strip(),
+            endpoint=self._endpoint_origin(url),
+            latency=time.monotonic() - started,
+            ok=ok,
+            ttfb=ttfb,
+            prompt_tokens=usage.get("prompt_tokens"),
+            completion_tokens=usage.get("completion_tokens"),
+            error="" if ok else error,
+            stream=stream,
+        )
+
+    def _record_parse_telemetry(self, model_config: Optional[Dict[str, Any]], parsed: Any, kind: str) -> None:
+        if not model_config:
+            return
+        self.telemetry.record_parse(
+            provider=(model_config.get("provider") or "").strip(),
+            model=(model_config.get("model_name") or "").strip(),
+            ok=isinstance(parsed, dict),
+            kind=kind,
+        )
+
+    def _send_request(
+        self,
+        kind: str,
         url: str,
         model_config: Dict[str, Any],
         messages: List[Dict[str, str]],
         temperature: float,
         max_tokens: int,
         timeout: float,
+        stream_callback: Optional[Callable[[str], None]] = None,
     ) -> str:
-        api_key = self._resolve_api_key(model_config)
-        model_name = (model_config.get("model_name") or "").strip()
+        if stream_callback is not None:
+            return self._send_stream_request(
+                kind, url, model_config, messages, temperature, max_tokens, timeout, stream_callback
+            )
 
-        system_prompt = ""
-        normalized_messages: List[Dict[str, Any]] = []
-        for msg in messages:
-            role = msg.get("role")
-            content = msg.get("content") or ""
-            if role == "system":
-                system_prompt = content
-            elif role in {"user", "assistant"}:
-                normalized_messages.append({"role": role, "content": content})
-
-        headers = {
-            "Content-Type": "application/json",
-            "x-api-key": api_key,
-            "anthropic-version": "2023-06-01",
-        }
+        label = self._provider_label(kind)
+        headers, payload = self._build_request(kind, model_config, messages, temperature, max_tokens)
+        started = time.monotonic()
+        ttfb: Optional[float] = None
+        usage: Dict[str, Optional[int]] = {}
+        error = "invalid_response"
+        try:
+            try:
+                resp = self._post(url, model_config, headers=headers, payload=payload, timeout=timeout)
+            except requests.exceptions.RequestException as e:
+                error = self._classify_transport_error(e)
+                raise LLMServiceError(f"{label}请求失败: {e}") from e
+
+            ttfb = self._response_elapsed(resp)
+            if resp.status_code != 200:
+                error = f"http_{resp.status_code}"
+            data = self._decode_response(label, resp)
+            usage = self._extract_usage(kind, data)
+            text = self._parse_response(kind, data)
+        except LLMServiceError:
+            self._record_call_telemetry(kind, url, model_config, started, ok=False, error=error, ttfb=ttfb)
+            raise
+
+        self._record_call_telemetry(kind, url, model_config, started, ok=True, ttfb=ttfb, usage=usage)
+        return text
+
+    def _send_stream_request(
+        self,
+        kind: str,
+        url: str,
+        model_config: Dict[str, Any],
+        messages: List[Dict[str, str]],
+        temperature: float,
+        max_tokens: int,
+        timeout: float,
+        on_delta: Callable[[str], None],
+    ) -> str:
+        """流式请求：OpenAI/Claude 走 SSE，Ollama 走 NDJSON；逐段回调并返回拼接后的全文。"""
+        label = self._provider_label(kind)
+        headers, payload = self._build_request(kind, model_config, messages, temperature, max_tokens)
+        payload["stream"] = True
+        if kind != "ollama":
+            headers = dict(headers)
+            headers["Accept"] = "text/event-stream"
+
+        def _emit(piece: str) -> None:
+            try:
+                on_delta(piece)
+            except Exception:
+                pass
 
-        payload: Dict[str, Any] = {
-            "model": model_name,
-            "max_tokens": max_tokens,
-            "temperature": temperature,
-            "messages": normalized_messages,
-        }
-        if system_prompt:
-            payload["system"] = system_prompt
+        started = time.monotonic()
+        ttfb: Optional[float] = None
+        usage: Dict[str, Optional[int]] = {}
+        error = "invalid_response"
+
+        def _fail(exc: LLMServiceError) -> LLMServiceError:
+            self._record_call_telemetry(kind, url, model_config, started, ok=False, error=error, ttfb=ttfb, stream=True)
+            return exc
 
         try:
-            resp = requests.post(url, headers=headers, json=payload, timeout=timeout)
+            resp = self._post(url, model_config, headers=headers, payload=payload, timeout=timeout, stream=True)
         except requests.exceptions.RequestException as e:
-            raise LLMServiceError(f"Claude 请求失败: {e}") from e
-
-        if resp.status_code != 200:
-            detail = (resp.text or "")[:500]
-            raise LLMServiceError(f"Claude 接口返回错误: HTTP {resp.status_code}: {detail}")
+            error = self._classify_transport_error(e)
+            raise _fail(LLMServiceError(f"{label}请求失败: {e}")) from e
 
+        parts: List[str] = []
         try:
-            data = resp.json()
-        except Exception as e:
-            raise LLMServiceError("Claude 接口返回非 JSON 响应") from e
+            if resp.status_code != 200:
+                error = f"http_{resp.status_code}"
+                self._decode_response(label, resp)
+
+            # 部分兼容实现忽略 stream 参数，直接返回完整 JSON
+            content_type = (resp.headers.get("Content-Type") or "").lower()
+            if kind != "ollama" and "event-stream" not in content_type:
+                data = self._decode_response(label, resp)
+                ttfb = time.monotonic() - started
+                text = self._parse_response(kind, data)
+                self._record_call_telemetry(
+                    kind, url, model_config, started, ok=True, ttfb=ttfb, usage=self._extract_usage(kind, data), stream=True
+                )
+                _emit(text)
+                return text
+
+            # SSE 常不带 charset，requests 会按 ISO-8859-1 解码导致中文乱码
+            resp.encoding = "utf-8"
+            for piece in self._iter_stream_deltas(kind, resp.iter_lines(decode_unicode=True), usage=usage):
+                if ttfb is None:
+                    ttfb = time.monotonic() - started
+                parts.append(piece)
+                _emit(piece)
+        except requests.exceptions.RequestException as e:
+            error = self._classify_transport_error(e)
+            raise _fail(LLMServiceError(f"{label}请求失败: {e}")) from e
+        except LLMServiceError as e:
+            raise _fail(e)
+        finally:
+            resp.close()
+
+        text = "".join(parts)
+        if not text:
+            raise _fail(LLMServiceError(f"{label}响应为空"))
+        self._record_call_telemetry(kind, url, model_config, started, ok=True, ttfb=ttfb, usage=usage, stream=True)
+        return text
 
-        # Anthropic messages API: content is a list of blocks
-        content_blocks = data.get("content") or []
-        if isinstance(content_blocks, list) and content_blocks:
-            first = content_blocks[0] or {}
-            text = first.get("text")
-            if text:
-                return str(text)
+    @staticmethod
+    def _iter_stream_deltas(
+        kind: str,
+        lines: Iterable[Any],
+        usage: Optional[Dict[str, Optional[int]]] = None,
+    ) -> Iterator[str]:
+        """从 SSE（data: ...）或 NDJSON 行中提取增量文本；传入 usage 时顺带收集 token 用量。"""
+        if usage is None:
+            usage = {}
+        for raw in lines:
+            if isinstance(raw, bytes):
+                raw = raw.decode("utf-8", errors="replace")
+            line = str(raw or "").strip()
+            if not line:
+                continue
+
+            if kind == "ollama":
+                try:
+                    obj = json.loads(line)
+                except Exception:
+                    continue
+                if obj.get("error"):
+                    raise LLMServiceError(f"Ollama 接口返回错误: {obj.get('error')}")
+                piece = (obj.get("message") or {}).get("content") or obj.get("response") or ""
+                if piece:
+                    yield str(piece)
+                if obj.get("done"):
+                    usage.update(LLMService._extract_usage("ollama", obj))
+                    return
+                continue
+
+            if not line.startswith("data:"):
+                continue
+            data = line[5:].strip()
+            if data == "[DONE]":
+                return
+            try:
+                obj = json.loads(data)
+            except Exception:
+                continue
+            if not isinstance(obj, dict):
+                continue
+
+            if kind == "anthropic":
+                event_type = obj.get("type")
+                if event_type == "message_start":
+                    input_tokens = ((obj.get("message") or {}).get("usage") or {}).get("input_tokens")
+                    if input_tokens is not None:
+                        usage["prompt_tokens"] = input_tokens
+                elif event_type == "message_delta":
+                    output_tokens = (obj.get("usage") or {}).get("output_tokens")
+                    if output_tokens is not None:
+                        usage["completion_tokens"] = output_tokens
+                elif event_type == "content_block_delta":
+                    piece = (obj.get("delta") or {}).get("text") or ""
+                    if piece:
+                        yield str(piece)
+                elif event_type == "message_stop":
+                    return
+                elif event_type == "error":
+                    detail = json.dumps(obj.get("error") or obj, ensure_ascii=False)[:500]
+                    raise LLMServiceError(f"Claude 接口返回错误: {detail}")
+                continue
+
+            if obj.get("error"):
+                detail = json.dumps(obj.get("error"), ensure_ascii=False)[:500]
+                raise LLMServiceError(f"模型接口返回错误: {detail}")
+            if obj.get("usage"):
+                usage.update(LLMService._extract_usage("openai", obj))
+            choices = obj.get("choices") or []
+            if not choices:
+                continue
+            first = choices[0] or {}
+            piece = (first.get("delta") or {}).get("content") or first.get("text") or ""
+            if piece:
+                yield str(piece)
 
-        if isinstance(content_blocks, str) and content_blocks.strip():
-            return content_blocks
+    def _call_openai_compatible(
+        self,
+        url: str,
+        model_config: Dict[str, Any],
+        messages: List[Dict[str, str]],
+        temperature: float,
+        max_tokens: int,
+        timeout: float,
+        stream_callback: Optional[Callable[[str], None]] = None,
+    ) -> str:
+        return self._send_request(
+            "openai", url, model_config, messages, temperature, max_tokens, timeout, stream_callback=stream_callback
+        )
 
-        raise LLMServiceError("Claude 响应为空")
+    def _call_anthropic(
+        self,
+        url: str,
+        model_config: Dict[str, Any],
+        messages: List[Dict[str, str]],
+        temperature: float,
+        max_tokens: int,
+        timeout: float,
+        stream_callback: Optional[Callable[[str], None]] = None,
+    ) -> str:
+        return self._send_request(
+            "anthropic", url, model_config, messages, temperature, max_tokens, timeout, stream_callback=stream_callback
+        )
 
     def _call_ollama(
         self,
@@ -852,43 +1651,148 @@ class LLMService:
         temperature: float,
         max_tokens: int,
         timeout: float,
+        stream_callback: Optional[Callable[[str], None]] = None,
     ) -> str:
-        model_name = (model_config.get("model_name") or "").strip()
+        return self._send_request(
+            "ollama", url, model_config, messages, temperature, max_tokens, timeout, stream_callback=stream_callback
+        )
 
-        payload: Dict[str, Any] = {
-            "model": model_name,
-            "messages": messages,
-            "stream": False,
-            "options": {
-                "temperature": temperature,
-                "num_predict": max_tokens,
-            },
-        }
+    # ---- asyncio API（批量生成） ----
 
+    def _new_async_client(self, model_config: Dict[str, Any], *, max_connections: Optional[int] = None) -> httpx.AsyncClient:
+        pool_size, max_retries, keep_alive = self._http_pool_settings(model_config)
+        size = max(1, int(max_connections or pool_size))
+        limits = httpx.Limits(
+            max_connections=size,
+            max_keepalive_connections=size if keep_alive else 0,
+        )
+        # httpx 的 transport 只重试连接错误，与同步连接池的策略一致（不重试读超时）
+        transport = httpx.AsyncHTTPTransport(retries=max_retries, limits=limits)
+        return httpx.AsyncClient(transport=transport, limits=limits)
+
+    async def _acall_model(
+        self,
+        model_config: Dict[str, Any],
+        messages: List[Dict[str, str]],
+        *,
+        client: Optional[httpx.AsyncClient] = None,
+        limiters: Optional[Dict[str, "_AsyncRateLimiter"]] = None,
+        rate_limit: float = 0.0,
+    ) -> str:
+        model_config = self._apply_env_model_config_overrides(model_config)
+        kind, url, temperature, max_tokens, timeout = self._route_model_call(model_config)
+        label = self._provider_label(kind)
+        headers, payload = self._build_request(kind, model_config, messages, temperature, max_tokens)
+
+        if limiters is not None:
+            origin = self._endpoint_origin(url)
+            limiter = limiters.get(origin)
+            if limiter is None:
+                limiter = limiters[origin] = _AsyncRateLimiter(rate_limit)
+            await limiter.acquire()
+
+        owns_client = client is None
+        if client is None:
+            client = self._new_async_client(model_config)
+        started = time.monotonic()
+        ttfb: Optional[float] = None
+        error = "invalid_response"
         try:
-            resp = requests.post(url, json=payload, timeout=timeout)
-        except requests.exceptions.RequestException as e:
-            raise LLMServiceError(f"Ollama 请求失败: {e}") from e
+            try:
+                resp = await client.post(url, headers=headers, json=payload, timeout=timeout)
+            except httpx.HTTPError as e:
+                error = self._classify_transport_error(e)
+                raise LLMServiceError(f"{label}请求失败: {e}") from e
+            finally:
+                if owns_client:
+                    await client.aclose()
+
+            ttfb = self._response_elapsed(resp)
+            if resp.status_code != 200:
+                error = f"http_{resp.status_code}"
+            data = self._decode_response(label, resp)
+            usage = self._extract_usage(kind, data)
+            text = self._parse_response(kind, data)
+        except LLMServiceError:
+            self._record_call_telemetry(kind, url, model_config, started, ok=False, error=error, ttfb=ttfb)
+            raise
+
+        self._record_call_telemetry(kind, url, model_config, started, ok=True, ttfb=ttfb, usage=usage)
+        return text
+
+    async def agenerate_xiaohongshu_content(
+        self,
+        topic: str,
+        header_title: str = "",
+        author: str = "",
+        *,
+        client: Optional[httpx.AsyncClient] = None,
+    ) -> LLMResponse:
+        """`generate_xiaohongshu_content` 的 asyncio 版本。"""
+        model_config, messages = self._prepare_xiaohongshu_request(topic, header_title, author)
+        raw_text = await self._acall_model(model_config, messages, client=client)
+        return self._build_xiaohongshu_response(topic, header_title, author, raw_text, model_config)
 
-        if resp.status_code != 200:
-            detail = (resp.text or "")[:500]
-            raise LLMServiceError(f"Ollama 接口返回错误: HTTP {resp.status_code}: {detail}")
+    async def agenerate_xiaohongshu_batch(
+        self,
+        topics: Sequence[str],
+        *,
+        header_title: str = "",
+        author: str = "",
+        concurrency: Optional[int] = None,
+        rate_limit: Optional[float] = None,
+    ) -> List[Union[LLMResponse, LLMServiceError]]:
+        """并发生成多个主题的文案，结果与 topics 顺序一致；单条失败以 LLMServiceError 占位。
+
+        - concurrency：同时在途的请求数（默认 XHS_LLM_BATCH_CONCURRENCY 或 8）
+        - rate_limit：每个模型端点每秒最多发起的请求数（默认 XHS_LLM_RATE_LIMIT，0 表示不限）
+        """
+        topics = [str(t or "") for t in (topics or [])]
+        if not topics:
+            return []
 
-        try:
-            data = resp.json()
-        except Exception as e:
-            raise LLMServiceError("Ollama 接口返回非 JSON 响应") from e
+        if concurrency is None:
+            concurrency = self._env_int("XHS_LLM_BATCH_CONCURRENCY", 8)
+        concurrency = max(1, int(concurrency))
+        if rate_limit is None:
+            try:
+                rate_limit = float((os.environ.get("XHS_LLM_RATE_LIMIT") or "0").strip() or 0)
+            except Exception:
+                rate_limit = 0.0
 
-        message = data.get("message") or {}
-        content = message.get("content")
-        if content:
-            return str(content)
+        # 整批只读取一次配置
+        model_config = self._load_model_config()
+        ok, reason = self.is_model_configured(model_config)
+        if not ok:
+            err = LLMServiceError(f"模型配置不可用: {reason}")
+            return [err for _ in topics]
 
-        # 兼容 /api/generate 等返回
-        if data.get("response"):
-            return str(data["response"])
+        semaphore = asyncio.Semaphore(concurrency)
+        limiters: Dict[str, _AsyncRateLimiter] = {}
 
-        raise LLMServiceError("Ollama 响应为空")
+        async def _one(client: httpx.AsyncClient, topic: str) -> Union[LLMResponse, LLMServiceError]:
+            async with semaphore:
+                try:
+                    messages = self._build_xiaohongshu_messages(model_config, topic, header_title, author)
+                    raw_text = await self._acall_model(
+                        model_config,
+                        messages,
+                        client=client,
+                        limiters=limiters,
+                        rate_limit=float(rate_limit or 0),
+                    )
+                    return self._build_xiaohongshu_response(topic, header_title, author, raw_text, model_config)
+                except LLMServiceError as e:
+                    return e
+                except Exception as e:
+                    return LLMServiceError(f"模型请求失败: {e}")
+
+        async with self._new_async_client(model_config, max_connections=concurrency) as client:
+            return list(await asyncio.gather(*[_one(client, t) for t in topics]))
+
+    def generate_xiaohongshu_batch(self, topics: Sequence[str], **kwargs: Any) -> List[Union[LLMResponse, LLMServiceError]]:
+        """同步入口：在当前线程内跑一个事件循环（适合 QThread / 线程池调用）。"""
+        return asyncio.run(self.agenerate_xiaohongshu_batch(topics, **kwargs))
 
     def _try_parse_json(self, text: str) -> Optional[Dict[str, Any]]:
         if not text:
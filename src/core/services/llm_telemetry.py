@@ -0,0 +1,176 @@
+"""
+大模型调用遥测
+
+把每次模型请求的耗时、首字节时间（TTFB）、token 用量、错误/超时，以及返回文案的 JSON 解析成败
+追加写入 ~/.xhs_system/llm_telemetry.jsonl（超过上限自动轮转为 .1），并按 provider/模型汇总统计，
+供 Web 接口 `/api/llm/telemetry` 查看，用真实数据选择模型。
+
+关闭：XHS_LLM_TELEMETRY=false
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+
+class LLMTelemetry:
+    """JSONL 事件存储 + 汇总统计（线程安全，跨进程追加写入）。"""
+
+    def __init__(self, path: Optional[Path] = None, *, max_bytes: int = 10 * 1024 * 1024):
+        self.path = Path(path) if path else Path(os.path.expanduser("~")) / ".xhs_system" / "llm_telemetry.jsonl"
+        self.max_bytes = int(max_bytes)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def enabled() -> bool:
+        val = (os.environ.get("XHS_LLM_TELEMETRY") or "").strip().lower()
+        return val not in {"0", "false", "no", "n", "off"}
+
+    def _append(self, event: Dict[str, Any]) -> None:
+        if not self.enabled():
+            return
+        line = json.dumps(event, ensure_ascii=False, separators=(",", ":")) + "\n"
+        try:
+            with self._lock:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                try:
+                    if self.path.stat().st_size > self.max_bytes:
+                        self.path.replace(self.path.with_suffix(self.path.suffix + ".1"))
+                except OSError:
+                    pass
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(line)
+        except Exception:
+            pass
+
+    def record_call(
+        self,
+        *,
+        provider: str,
+        model: str,
+        endpoint: str,
+        latency: float,
+        ok: bool,
+        ttfb: Optional[float] = None,
+        prompt_tokens: Optional[int] = None,
+        completion_tokens: Optional[int] = None,
+        error: str = "",
+        stream: bool = False,
+    ) -> None:
+        """记录一次模型请求；error 为空表示成功，超时记为 "timeout"，HTTP 错误记为 "http_<status>"。"""
+        self._append(
+            {
+                "type": "call",
+                "ts": time.time(),
+                "provider": provider,
+                "model": model,
+                "endpoint": endpoint,
+                "latency": round(float(latency), 4),
+                "ttfb": round(float(ttfb), 4) if ttfb is not None else None,
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "ok": bool(ok),
+                "error": error,
+                "stream": bool(stream),
+            }
+        )
+
+    def record_parse(self, *, provider: str, model: str, ok: bool, kind: str = "") -> None:
+        """记录模型返回文本能否解析为 JSON（失败意味着走了兜底文案/默认海报）。"""
+        self._append({"type": "parse", "ts": time.time(), "provider": provider, "model": model, "ok": bool(ok), "kind": kind})
+
+    def _read_events(self, since: Optional[float]) -> List[Dict[str, Any]]:
+        events: List[Dict[str, Any]] = []
+        for path in (self.path.with_suffix(self.path.suffix + ".1"), self.path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    for line in f:
+                        try:
+                            event = json.loads(line)
+                        except Exception:
+                            continue
+                        if since is not None and float(event.get("ts") or 0) < since:
+                            continue
+                        events.append(event)
+            except OSError:
+                continue
+        return events
+
+    @staticmethod
+    def _percentile(sorted_values: List[float], pct: float) -> Optional[float]:
+        if not sorted_values:
+            return None
+        idx = min(len(sorted_values) - 1, max(0, int(round(pct / 100.0 * (len(sorted_values) - 1)))))
+        return round(sorted_values[idx], 4)
+
+    def summary(self, since_seconds: Optional[float] = None) -> Dict[str, Any]:
+        """按 provider/模型汇总：调用数、错误率、超时数、延迟分位数、TTFB、token 用量、JSON 解析失败率。"""
+        since = time.time() - float(since_seconds) if since_seconds else None
+        groups: Dict[str, Dict[str, Any]] = {}
+
+        def _group(event: Dict[str, Any]) -> Dict[str, Any]:
+            provider = str(event.get("provider") or "")
+            model = str(event.get("model") or "")
+            key = f"{provider}/{model}"
+            if key not in groups:
+                groups[key] = {
+                    "provider": provider,
+                    "model": model,
+                    "calls": 0,
+                    "errors": 0,
+                    "timeouts": 0,
+                    "latencies": [],
+                    "ttfbs": [],
+                    "prompt_tokens": 0,
+                    "completion_tokens": 0,
+                    "parse_total": 0,
+                    "parse_failures": 0,
+                }
+            return groups[key]
+
+        for event in self._read_events(since):
+            g = _group(event)
+            if event.get("type") == "parse":
+                g["parse_total"] += 1
+                if not event.get("ok"):
+                    g["parse_failures"] += 1
+                continue
+
+            g["calls"] += 1
+            if not event.get("ok"):
+                g["errors"] += 1
+                if event.get("error") == "timeout":
+                    g["timeouts"] += 1
+                continue
+            g["latencies"].append(float(event.get("latency") or 0))
+            if event.get("ttfb") is not None:
+                g["ttfbs"].append(float(event["ttfb"]))
+            g["prompt_tokens"] += int(event.get("prompt_tokens") or 0)
+            g["completion_tokens"] += int(event.get("completion_tokens") or 0)
+
+        providers: List[Dict[str, Any]] = []
+        for g in groups.values():
+            latencies = sorted(g.pop("latencies"))
+            ttfbs = sorted(g.pop("ttfbs"))
+            g["error_rate"] = round(g["errors"] / g["calls"], 4) if g["calls"] else 0.0
+            g["latency"] = {
+                "p50": self._percentile(latencies, 50),
+                "p90": self._percentile(latencies, 90),
+                "p95": self._percentile(latencies, 95),
+                "p99": self._percentile(latencies, 99),
+                "max": round(latencies[-1], 4) if latencies else None,
+            }
+            g["ttfb"] = {"p50": self._percentile(ttfbs, 50), "p95": self._percentile(ttfbs, 95)}
+            g["parse_failure_rate"] = round(g["parse_failures"] / g["parse_total"], 4) if g["parse_total"] else 0.0
+            providers.append(g)
+
+        providers.sort(key=lambda g: (g["provider"], g["model"]))
+        return {"since": since, "providers": providers}
+
+
+llm_telemetry = LLMTelemetry()
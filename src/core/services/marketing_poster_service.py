@@ -4,6 +4,8 @@
 
 from __future__ import annotations
 
+import functools
+import math
 import os
 import platform
 import re
@@ -11,9 +13,16 @@ import time
 import uuid
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
 
-from PIL import Image, ImageDraw, ImageFilter, ImageFont
+from PIL import Image, ImageDraw, ImageFont
+
+from src.core.services.font_manager import font_cache
+from src.core.services.image_effects import composite_region, dot_grid, drop_shadow, rounded_card, vertical_gradient
+from src.core.services.image_encoder import EncodeOptions, save_image
+from src.core.services.image_store import store_generated
+from src.core.services.render_trace import render_tracer
+from src.core.services.text_measure import clip_with_suffix, wrap_words
 
 
 POSTER_SIZE: Tuple[int, int] = (1080, 1440)  # XHS 3:4
@@ -76,16 +85,12 @@ class PosterFontResolver:
         if not p.exists():
             return None
 
-        for idx in indices:
+        for idx in list(indices) + [0]:
             try:
-                return ImageFont.truetype(str(p), size, index=int(idx))
+                return font_cache.get(str(p), size, index=int(idx))
             except Exception:
                 continue
-
-        try:
-            return ImageFont.truetype(str(p), size)
-        except Exception:
-            return None
+        return None
 
     def _candidate_fonts(self, *, serif: bool, bold: bool) -> List[Tuple[str, Sequence[int]]]:
         system = platform.system().lower()
@@ -179,63 +184,37 @@ class PosterFontResolver:
         return font
 
 
-def _lerp(a: int, b: int, t: float) -> int:
-    return int(a + (b - a) * t)
-
-
-def gradient_bg(size: Tuple[int, int]) -> Image.Image:
-    w, h = size
-    img = Image.new("RGB", size, C.bg_top)
-    d = ImageDraw.Draw(img)
-    for y in range(h):
-        t = y / (h - 1) if h > 1 else 0
-        d.line(
-            [(0, y), (w, y)],
-            fill=(
-                _lerp(C.bg_top[0], C.bg_bottom[0], t),
-                _lerp(C.bg_top[1], C.bg_bottom[1], t),
-                _lerp(C.bg_top[2], C.bg_bottom[2], t),
-            ),
-        )
+@functools.lru_cache(maxsize=8)
+def _gradient_bg_cached(size: Tuple[int, int], top: Tuple[int, int, int], bottom: Tuple[int, int, int]) -> Image.Image:
+    img = vertical_gradient(size, top, bottom)
 
     noise = Image.effect_noise(size, 18).convert("L")
     noise = noise.point(lambda p: int(p * 0.10))
     noise_rgb = Image.merge("RGB", (noise, noise, noise))
     img = Image.blend(img, noise_rgb, 0.18)
 
-    overlay = Image.new("RGBA", size, (0, 0, 0, 0))
-    od = ImageDraw.Draw(overlay)
-    step = 50
-    dot_r = 2
-    dot = (0, 0, 0, 12)
-    for yy in range(130, h, step):
-        for xx in range(70, w, step):
-            od.ellipse([xx - dot_r, yy - dot_r, xx + dot_r, yy + dot_r], fill=dot)
-
+    overlay = dot_grid(size, origin=(70, 130), step=50, radius=2, fill=(0, 0, 0, 12))
     return Image.alpha_composite(img.convert("RGBA"), overlay).convert("RGB")
 
 
+def gradient_bg(size: Tuple[int, int]) -> Image.Image:
+    """海报底图（渐变 + 噪点 + 点阵）。同一尺寸/配色只生成一次，每次返回可修改的副本。"""
+    with render_tracer.span("background", source="gradient"):
+        return _gradient_bg_cached((int(size[0]), int(size[1])), C.bg_top, C.bg_bottom).copy()
+
+
 def card(base: Image.Image, xy: Tuple[int, int, int, int], *, radius: int = 28) -> None:
-    x0, y0, x1, y1 = xy
-    base_rgba = base.convert("RGBA")
-
-    shadow = Image.new("RGBA", base.size, (0, 0, 0, 0))
-    sd = ImageDraw.Draw(shadow)
-    sd.rounded_rectangle([x0 + 6, y0 + 10, x1 + 6, y1 + 10], radius=radius, fill=(0, 0, 0, 40))
-    shadow = shadow.filter(ImageFilter.GaussianBlur(14))
-    base_rgba = Image.alpha_composite(base_rgba, shadow)
-
-    overlay = Image.new("RGBA", base.size, (0, 0, 0, 0))
-    od = ImageDraw.Draw(overlay)
-    od.rounded_rectangle(
-        [x0, y0, x1, y1],
+    rounded_card(
+        base,
+        xy,
         radius=radius,
         fill=(C.card[0], C.card[1], C.card[2], 255),
         outline=(0, 0, 0, 14),
-        width=2,
+        outline_width=2,
+        shadow_offset=(6, 10),
+        shadow_blur=14,
+        shadow_alpha=40,
     )
-    base_rgba = Image.alpha_composite(base_rgba, overlay)
-    base.paste(base_rgba)
 
 
 def clean_text(text: str) -> str:
@@ -259,51 +238,7 @@ def clean_text(text: str) -> str:
 
 
 def wrap(draw: ImageDraw.ImageDraw, text: str, font: ImageFont.ImageFont, max_w: int) -> List[str]:
-    lines: List[str] = []
-    for para in (text or "").split("\n"):
-        if not para:
-            lines.append("")
-            continue
-
-        if " " in para:
-            tokens = para.split(" ")
-            line = ""
-            for token in tokens:
-                test = token if not line else f"{line} {token}"
-                if draw.textlength(test, font=font) <= max_w:
-                    line = test
-                    continue
-                if line:
-                    lines.append(line)
-                    line = token
-                else:
-                    frag = ""
-                    for ch in token:
-                        test2 = frag + ch
-                        if draw.textlength(test2, font=font) <= max_w:
-                            frag = test2
-                        else:
-                            if frag:
-                                lines.append(frag)
-                            frag = ch
-                    line = frag
-            if line:
-                lines.append(line)
-            continue
-
-        line = ""
-        for ch in para:
-            test = line + ch
-            if draw.textlength(test, font=font) <= max_w:
-                line = test
-            else:
-                if line:
-                    lines.append(line)
-                line = ch
-        if line:
-            lines.append(line)
-
-    return lines
+    return wrap_words(text, font, max_w, exact=lambda s: draw.textlength(s, font=font))
 
 
 def wrap_clipped(
@@ -326,9 +261,7 @@ def wrap_clipped(
     last = clipped[-1]
     if last.endswith(ell):
         return clipped
-    while draw.textlength(last + ell, font=font) > max_w and len(last) > 1:
-        last = last[:-1]
-    clipped[-1] = last + ell
+    clipped[-1] = clip_with_suffix(last, font, max_w, suffix=ell, exact=lambda s: draw.textlength(s, font=font))
     return clipped
 
 
@@ -401,15 +334,17 @@ def label_tag(
 ) -> None:
     x0, y0, x1, y1 = xy
     r = int((y1 - y0) / 2)
-    overlay = Image.new("RGBA", base.size, (0, 0, 0, 0))
-    d = ImageDraw.Draw(overlay)
-    d.rounded_rectangle([x0, y0, x1, y1], radius=r, fill=(bg[0], bg[1], bg[2], 255))
-    base_rgba = Image.alpha_composite(base.convert("RGBA"), overlay)
-    d2 = ImageDraw.Draw(base_rgba)
+    composite_region(
+        base,
+        (x0, y0, x1 + 1, y1 + 1),
+        lambda d, o: d.rounded_rectangle(
+            [x0 - o[0], y0 - o[1], x1 - o[0], y1 - o[1]], radius=r, fill=(bg[0], bg[1], bg[2], 255)
+        ),
+    )
+    d2 = ImageDraw.Draw(base)
     f = fonts.get(size=28, bold=True, serif=False)
     tw = d2.textlength(text, font=f)
     d2.text((x0 + (x1 - x0 - tw) / 2, y0 + 10), text, font=f, fill=(255, 255, 255))
-    base.paste(base_rgba)
 
 
 def checkbox(draw: ImageDraw.ImageDraw, xy: Tuple[int, int], *, checked: bool = True) -> None:
@@ -431,17 +366,18 @@ def highlight_title(
     x, y = xy
     d = ImageDraw.Draw(img)
     tw = d.textlength(text, font=font)
-    overlay = Image.new("RGBA", img.size, (0, 0, 0, 0))
-    od = ImageDraw.Draw(overlay)
     font_size = _font_px(font, 36)
     h = int(font_size * 0.55)
-    od.rounded_rectangle(
-        [x - 6, y + int(font_size * 0.60), x + tw + 10, y + int(font_size * 0.60) + h],
-        radius=14,
-        fill=(accent[0], accent[1], accent[2], 55),
+    top = y + int(font_size * 0.60)
+    composite_region(
+        img,
+        (x - 6, top, int(math.ceil(x + tw + 10)) + 1, top + h + 1),
+        lambda od, o: od.rounded_rectangle(
+            [x - 6 - o[0], top - o[1], x + tw + 10 - o[0], top + h - o[1]],
+            radius=14,
+            fill=(accent[0], accent[1], accent[2], 55),
+        ),
     )
-    img_rgba = Image.alpha_composite(img.convert("RGBA"), overlay)
-    img.paste(img_rgba)
 
 
 def _normalize_list(raw: Any, *, min_items: int, max_items: int, fallback: List[str]) -> List[str]:
@@ -511,12 +447,7 @@ class MarketingPosterService:
         base_rgba = base.convert("RGBA")
         if shadow:
             try:
-                alpha = asset.getchannel("A")
-                shadow_blob = Image.new("RGBA", asset.size, (0, 0, 0, 120))
-                shadow_layer = Image.new("RGBA", base_rgba.size, (0, 0, 0, 0))
-                shadow_layer.paste(shadow_blob, (x + 10, y + 14), alpha)
-                shadow_layer = shadow_layer.filter(ImageFilter.GaussianBlur(16))
-                base_rgba = Image.alpha_composite(base_rgba, shadow_layer)
+                drop_shadow(base_rgba, asset.getchannel("A"), (x + 10, y + 14), blur=16, color=(0, 0, 0, 120))
             except Exception:
                 pass
 
@@ -609,10 +540,10 @@ class MarketingPosterService:
 
         disclaimer = clean_text(str(content.get("disclaimer") or "仅供参考｜请遵守平台规则"))
 
-        posters: List[Tuple[str, Image.Image]] = [
+        posters: List[Tuple[str, Callable[[], Image.Image]]] = [
             (
                 "01_cover.png",
-                self._poster_cover(
+                lambda: self._poster_cover(
                     title=title,
                     subtitle=subtitle,
                     bullets=cover_bullets,
@@ -623,21 +554,35 @@ class MarketingPosterService:
                     asset_image_path=asset_image_path,
                 ),
             ),
-            ("02_outline.png", self._poster_outline(title=title, items=outline_items, keyword=keyword, accent=accent)),
+            (
+                "02_outline.png",
+                lambda: self._poster_outline(title=title, items=outline_items, keyword=keyword, accent=accent),
+            ),
             (
                 "03_highlights.png",
-                self._poster_highlights(title=title, highlights=highlights, price=price, keyword=keyword, accent=accent),
+                lambda: self._poster_highlights(
+                    title=title, highlights=highlights, price=price, keyword=keyword, accent=accent
+                ),
+            ),
+            ("04_delivery.png", lambda: self._poster_delivery(steps=delivery_steps, price=price, accent=accent)),
+            (
+                "05_pain_points.png",
+                lambda: self._poster_pain_points(points=pain_points, price=price, keyword=keyword, accent=accent),
             ),
-            ("04_delivery.png", self._poster_delivery(steps=delivery_steps, price=price, accent=accent)),
-            ("05_pain_points.png", self._poster_pain_points(points=pain_points, price=price, keyword=keyword, accent=accent)),
-            ("06_audience.png", self._poster_audience(audience=audience, keyword=keyword)),
+            ("06_audience.png", lambda: self._poster_audience(audience=audience, keyword=keyword)),
         ]
 
+        # 默认仍输出 optimize 过的 PNG；XHS_POSTER_OPTIMIZE=false 走快速路径，也可改为 JPEG/WebP + 目标大小
+        encoder = EncodeOptions.from_env("XHS_POSTER", default_format="png", default_optimize=True)
         out_paths: List[Dict[str, str]] = []
-        for filename, img in posters:
-            path = out_dir / filename
-            img.save(str(path), format="PNG", optimize=True)
-            out_paths.append({"title": Path(filename).stem, "image_path": str(path)})
+        with render_tracer.span("marketing_generate", cat="post", title=title[:40], posters=len(posters)):
+            for filename, build in posters:
+                with render_tracer.span("poster", poster=Path(filename).stem):
+                    # 整张海报的合成（内含 background/layout/font_load 等子阶段），不计入 draw_text
+                    with render_tracer.span("compose", layout=Path(filename).stem):
+                        img = build()
+                    path = store_generated(save_image(img, str(out_dir / filename), encoder))
+                out_paths.append({"title": Path(filename).stem, "image_path": path})
         return out_paths
 
     def generate_to_local_paths(self, content: Dict[str, Any]) -> Tuple[str, List[str]]:
@@ -685,16 +630,19 @@ class MarketingPosterService:
         title_font = self.fonts.get(size=84, bold=True, serif=True)
         title_lines: List[str] = []
         title_step = int(_font_px(title_font, 84) * 1.12)
-        for size in range(84, 43, -4):
-            candidate = self.fonts.get(size=size, bold=True, serif=True)
-            lines = wrap(d, title_text, candidate, max_w - 8)
-            lines = [ln for ln in lines if str(ln).strip()]
-            step = int(_font_px(candidate, size) * 1.12)
-            if len(lines) <= 2 and step * max(1, len(lines)) <= available_h:
-                title_font = candidate
-                title_lines = lines
-                title_step = step
-                break
+        with render_tracer.span("layout", path="cover_title") as trace_args:
+            for size in range(84, 43, -4):
+                candidate = self.fonts.get(size=size, bold=True, serif=True)
+                lines = wrap(d, title_text, candidate, max_w - 8)
+                lines = [ln for ln in lines if str(ln).strip()]
+                step = int(_font_px(candidate, size) * 1.12)
+                if len(lines) <= 2 and step * max(1, len(lines)) <= available_h:
+                    title_font = candidate
+                    title_lines = lines
+                    title_step = step
+                    trace_args["size"] = size
+                    break
+            trace_args["fits"] = bool(title_lines)
 
         if not title_lines:
             # If it still doesn't fit, use a smaller font and clip.
@@ -762,11 +710,16 @@ class MarketingPosterService:
 
         x_underline = 70 + prefix_w
         w = d.textlength(underline_shown, font=cta_font)
-        underline = Image.new("RGBA", img.size, (0, 0, 0, 0))
-        ud = ImageDraw.Draw(underline)
-        ud.line([(x_underline, 1065), (x_underline + w, 1065)], fill=(accent[0], accent[1], accent[2], 160), width=8)
-        underline = underline.filter(ImageFilter.GaussianBlur(1))
-        img = Image.alpha_composite(img.convert("RGBA"), underline).convert("RGB")
+        composite_region(
+            img,
+            (int(x_underline) - 4, 1061, int(math.ceil(x_underline + w)) + 5, 1070),
+            lambda ud, o: ud.line(
+                [(x_underline - o[0], 1065 - o[1]), (x_underline + w - o[0], 1065 - o[1])],
+                fill=(accent[0], accent[1], accent[2], 160),
+                width=8,
+            ),
+            blur=1,
+        )
 
         d = ImageDraw.Draw(img)
         d.text((70, 1360), disclaimer, font=self.fonts.get(size=22, bold=False, serif=False), fill=(120, 120, 120))
@@ -851,11 +804,17 @@ class MarketingPosterService:
                 spacing=4,
             )
 
-            tape = Image.new("RGBA", img.size, (0, 0, 0, 0))
-            td = ImageDraw.Draw(tape)
-            td.rounded_rectangle([x0 + w - 140, y + 18, x0 + w - 24, y + 54], radius=16, fill=(ACCENTS["tape"][0], ACCENTS["tape"][1], ACCENTS["tape"][2], 180))
-            tape = tape.filter(ImageFilter.GaussianBlur(1))
-            img = Image.alpha_composite(img.convert("RGBA"), tape).convert("RGB")
+            tx0, ty0, tx1, ty1 = x0 + w - 140, y + 18, x0 + w - 24, y + 54
+            composite_region(
+                img,
+                (tx0, ty0, tx1 + 1, ty1 + 1),
+                lambda td, o: td.rounded_rectangle(
+                    [tx0 - o[0], ty0 - o[1], tx1 - o[0], ty1 - o[1]],
+                    radius=16,
+                    fill=(ACCENTS["tape"][0], ACCENTS["tape"][1], ACCENTS["tape"][2], 180),
+                ),
+                blur=1,
+            )
             d = ImageDraw.Draw(img)
 
         note_y0 = 1280
@@ -894,12 +853,15 @@ class MarketingPosterService:
         y = 360
         step_font = self.fonts.get(size=44, bold=True, serif=False)
         for idx, step in enumerate(steps[:3]):
-            badge = Image.new("RGBA", img.size, (0, 0, 0, 0))
-            bd = ImageDraw.Draw(badge)
             cx, cy = 150, y + 30
-            bd.ellipse([cx - 26, cy - 26, cx + 26, cy + 26], fill=(accent[0], accent[1], accent[2], 255))
-            img_rgba = Image.alpha_composite(img.convert("RGBA"), badge)
-            img.paste(img_rgba)
+            composite_region(
+                img,
+                (cx - 26, cy - 26, cx + 27, cy + 27),
+                lambda bd, o: bd.ellipse(
+                    [cx - 26 - o[0], cy - 26 - o[1], cx + 26 - o[0], cy + 26 - o[1]],
+                    fill=(accent[0], accent[1], accent[2], 255),
+                ),
+            )
             d = ImageDraw.Draw(img)
             d.text((cx - 10, cy - 20), str(idx + 1), font=self.fonts.get(size=30, bold=True, serif=False), fill=(255, 255, 255))
 
@@ -974,11 +936,15 @@ class MarketingPosterService:
         d.ellipse([cx - 20, cy - 20, cx + 20, cy + 20], fill=accent)
         d.text((cx - 12, cy - 18), badge_char, font=self.fonts.get(size=28, bold=True, serif=False), fill=(255, 255, 255))
 
-        overlay = Image.new("RGBA", img.size, (0, 0, 0, 0))
-        od = ImageDraw.Draw(overlay)
-        od.rounded_rectangle([x1 - 170, y0 + 18, x1 - 30, y0 + 54], radius=10, fill=(ACCENTS["tape"][0], ACCENTS["tape"][1], ACCENTS["tape"][2], 140))
-        img_rgba = Image.alpha_composite(img.convert("RGBA"), overlay)
-        img.paste(img_rgba)
+        composite_region(
+            img,
+            (x1 - 170, y0 + 18, x1 - 29, y0 + 55),
+            lambda od, o: od.rounded_rectangle(
+                [x1 - 170 - o[0], y0 + 18 - o[1], x1 - 30 - o[0], y0 + 54 - o[1]],
+                radius=10,
+                fill=(ACCENTS["tape"][0], ACCENTS["tape"][1], ACCENTS["tape"][2], 140),
+            ),
+        )
 
         title_font = self.fonts.get(size=44, bold=True, serif=False)
         title_x, title_y = x0 + 110, y0 + 36
@@ -1022,11 +988,15 @@ class MarketingPosterService:
 
         tag_x0, tag_y0 = 110, note_y0 + 40
         tag_x1, tag_y1 = tag_x0 + 190, tag_y0 + 52
-        overlay = Image.new("RGBA", img.size, (0, 0, 0, 0))
-        od = ImageDraw.Draw(overlay)
-        od.rounded_rectangle([tag_x0, tag_y0, tag_x1, tag_y1], radius=26, fill=(ACCENTS["red"][0], ACCENTS["red"][1], ACCENTS["red"][2], 255))
-        img_rgba = Image.alpha_composite(img.convert("RGBA"), overlay)
-        img.paste(img_rgba)
+        composite_region(
+            img,
+            (tag_x0, tag_y0, tag_x1 + 1, tag_y1 + 1),
+            lambda od, o: od.rounded_rectangle(
+                [tag_x0 - o[0], tag_y0 - o[1], tag_x1 - o[0], tag_y1 - o[1]],
+                radius=26,
+                fill=(ACCENTS["red"][0], ACCENTS["red"][1], ACCENTS["red"][2], 255),
+            ),
+        )
         d = ImageDraw.Draw(img)
         d.text((tag_x0 + 38, tag_y0 + 10), "不太适合", font=self.fonts.get(size=28, bold=True, serif=False), fill=(255, 255, 255))
         notfit_font = self.fonts.get(size=32, bold=True, serif=False)
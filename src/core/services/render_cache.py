@@ -0,0 +1,117 @@
+"""
+图片渲染结果缓存
+
+定时任务失败重试（每 10 分钟一次）、同一标题/正文重新生成时，generate_post_images 会把完全相同的
+图片再渲染一遍；输出文件名带 uuid，从不复用。
+
+这里以“渲染输入”的哈希为键（各页文本、背景路径及其 mtime/大小、目标尺寸、XHS_IMG_* 开关、编码参数、
+渲染版本号），记录上次生成的封面/内容图路径。命中且文件都还在时直接返回，不再渲染。
+
+索引：~/.xhs_system/render_cache.sqlite3
+- TTL：XHS_IMG_RENDER_CACHE_TTL（秒，默认 7 天），过期条目在读取时删除
+- 关闭：XHS_IMG_RENDER_CACHE=false
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+
+class RenderCache:
+    """渲染输入哈希 -> (封面路径, 内容图路径列表)（SQLite 持久化，线程安全）。"""
+
+    def __init__(self, db_path: Optional[Path] = None, *, ttl_seconds: Optional[float] = None):
+        self.db_path = Path(db_path) if db_path else Path(os.path.expanduser("~")) / ".xhs_system" / "render_cache.sqlite3"
+        if ttl_seconds is None:
+            try:
+                ttl_seconds = float((os.environ.get("XHS_IMG_RENDER_CACHE_TTL") or "").strip() or 7 * 24 * 3600)
+            except Exception:
+                ttl_seconds = 7 * 24 * 3600
+        self.ttl_seconds = float(ttl_seconds)
+        self._lock = threading.Lock()
+        self._initialized = False
+
+    @staticmethod
+    def enabled() -> bool:
+        val = (os.environ.get("XHS_IMG_RENDER_CACHE") or "").strip().lower()
+        return val not in {"0", "false", "no", "n", "off"}
+
+    def _connect(self) -> sqlite3.Connection:
+        if not self._initialized:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(self.db_path), timeout=10)
+        if not self._initialized:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS render_cache (
+                    key TEXT PRIMARY KEY,
+                    cover TEXT NOT NULL,
+                    contents TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                )
+                """
+            )
+            conn.commit()
+            self._initialized = True
+        return conn
+
+    def get(self, key: str) -> Optional[Tuple[str, List[str]]]:
+        """命中且所有文件仍存在时返回 (封面, 内容图列表)；文件缺失/过期的条目会被删除。"""
+        try:
+            with self._lock:
+                conn = self._connect()
+                try:
+                    row = conn.execute("SELECT cover, contents, created_at FROM render_cache WHERE key = ?", (key,)).fetchone()
+                    if not row:
+                        return None
+                    cover, contents_json, created_at = row
+                    contents = [str(p) for p in json.loads(contents_json or "[]")]
+                    expired = self.ttl_seconds > 0 and time.time() - float(created_at) > self.ttl_seconds
+                    if expired or not all(os.path.isfile(p) for p in [cover] + contents):
+                        conn.execute("DELETE FROM render_cache WHERE key = ?", (key,))
+                        conn.commit()
+                        return None
+                    return str(cover), contents
+                finally:
+                    conn.close()
+        except Exception:
+            return None
+
+    def set(self, key: str, cover: str, contents: List[str]) -> None:
+        if not cover:
+            return
+        try:
+            with self._lock:
+                conn = self._connect()
+                try:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO render_cache (key, cover, contents, created_at) VALUES (?, ?, ?, ?)",
+                        (key, str(cover), json.dumps([str(p) for p in contents], ensure_ascii=False), time.time()),
+                    )
+                    conn.commit()
+                finally:
+                    conn.close()
+        except Exception:
+            pass
+
+    def clear(self) -> None:
+        try:
+            with self._lock:
+                conn = self._connect()
+                try:
+                    conn.execute("DELETE FROM render_cache")
+                    conn.commit()
+                finally:
+                    conn.close()
+        except Exception:
+            pass
+
+
+render_cache = RenderCache()
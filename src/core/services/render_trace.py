@@ -0,0 +1,152 @@
+"""
+出图分阶段计时（Chrome trace-event 格式）
+
+出图慢时很难判断是背景解码、字体加载、排版搜索、文字绘制还是编码导致的。打开 XHS_IMG_TRACE 后，
+generate_post_images / 营销海报生成会按页记录各阶段的耗时区间（含选中的排版路径等参数），
+追加写入 trace 文件，可直接在 chrome://tracing 或 https://ui.perfetto.dev 中打开。
+
+- 开关：XHS_IMG_TRACE=true（默认关闭；关闭时 span 只是一次环境变量判断）
+- 文件：XHS_IMG_TRACE_FILE（默认 ~/.xhs_system/traces/render_trace.json）
+- 格式：JSON Array Format，多次运行/多个渲染进程追加到同一文件；按规范结尾的 "]" 可省略，
+  每个事件带 pid/tid，渲染进程池中的各进程在查看器里显示为独立的轨道
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+
+class RenderTracer:
+    """记录 "X"（complete）事件；每个线程最外层 span 结束时把该线程缓冲的事件追加写入文件。"""
+
+    def __init__(self):
+        self._local = threading.local()
+        self._file_lock = threading.Lock()
+        self._process_named = False
+
+    @staticmethod
+    def enabled() -> bool:
+        val = (os.environ.get("XHS_IMG_TRACE") or "").strip().lower()
+        return val in {"1", "true", "yes", "y", "on"}
+
+    @staticmethod
+    def trace_path() -> Path:
+        value = (os.environ.get("XHS_IMG_TRACE_FILE") or "").strip()
+        if value:
+            return Path(os.path.expanduser(value))
+        return Path(os.path.expanduser("~")) / ".xhs_system" / "traces" / "render_trace.json"
+
+    def _state(self) -> Tuple[List[Dict[str, Any]], List[int]]:
+        events = getattr(self._local, "events", None)
+        if events is None:
+            events = self._local.events = []
+            self._local.depth = [0]
+        return events, self._local.depth
+
+    @staticmethod
+    def _now_us() -> float:
+        # 各渲染进程共用墙钟时间轴，事件才能在同一时间线上对齐
+        return time.time_ns() / 1000.0
+
+    def _record(self, name: str, cat: str, ts_us: float, dur_us: float, args: Dict[str, Any]) -> None:
+        events, _depth = self._state()
+        events.append(
+            {
+                "name": name,
+                "cat": cat,
+                "ph": "X",
+                "ts": round(ts_us, 1),
+                "dur": round(max(0.0, dur_us), 1),
+                "pid": os.getpid(),
+                "tid": threading.get_ident(),
+                "args": {k: v for k, v in args.items() if v is not None},
+            }
+        )
+
+    @contextmanager
+    def span(self, name: str, cat: str = "render", **args: Any) -> Iterator[Dict[str, Any]]:
+        """
+        记录一个阶段区间；返回的 dict 可在区间内补充参数（如选中的排版路径）。
+
+        未开启时不记录，返回的 dict 写入也无副作用。
+        """
+        if not self.enabled():
+            yield {}
+            return
+
+        _events, depth = self._state()
+        depth[0] += 1
+        start_us = self._now_us()
+        start = time.perf_counter()
+        try:
+            yield args
+        finally:
+            self._record(name, cat, start_us, (time.perf_counter() - start) * 1e6, args)
+            depth[0] -= 1
+            if depth[0] == 0:
+                self.flush()
+
+    def begin(self, name: str, cat: str = "render", **args: Any) -> Optional[Tuple[str, str, float, float, Dict[str, Any]]]:
+        """手动开始一个区间（适合跨越大段代码、不便改写为 with 的阶段）；未开启时返回 None。"""
+        if not self.enabled():
+            return None
+        return name, cat, self._now_us(), time.perf_counter(), args
+
+    def end(self, token: Optional[Tuple[str, str, float, float, Dict[str, Any]]], **args: Any) -> None:
+        """结束 begin() 开始的区间；应在某个 span 内调用，随最外层 span 一起写入文件。"""
+        if token is None:
+            return
+        name, cat, start_us, start, span_args = token
+        span_args.update(args)
+        self._record(name, cat, start_us, (time.perf_counter() - start) * 1e6, span_args)
+
+    def flush(self) -> None:
+        """把当前线程缓冲的事件追加写入 trace 文件（失败时丢弃，不影响出图）。"""
+        events, _depth = self._state()
+        if not events:
+            return
+        batch, events[:] = list(events), []
+        if not self._process_named:
+            self._process_named = True
+            batch.insert(
+                0,
+                {"name": "process_name", "ph": "M", "pid": os.getpid(), "args": {"name": f"xhs-render {os.getpid()}"}},
+            )
+        try:
+            path = self.trace_path()
+            path.parent.mkdir(parents=True, exist_ok=True)
+            try:
+                # 只有第一个写入者写开头的 "["（O_EXCL 保证多进程下只写一次）
+                fd = os.open(str(path), os.O_CREAT | os.O_EXCL | os.O_WRONLY | os.O_APPEND)
+                try:
+                    os.write(fd, b"[\n")
+                finally:
+                    os.close(fd)
+            except FileExistsError:
+                pass
+            data = "".join(json.dumps(e, ensure_ascii=False) + ",\n" for e in batch)
+            with self._file_lock:
+                with open(path, "a", encoding="utf-8") as f:
+                    f.write(data)
+        except Exception:
+            pass
+
+
+def load_trace(path: str) -> List[Dict[str, Any]]:
+    """读取 trace 文件（兼容省略结尾 "]"、末尾带逗号的追加格式）。"""
+    text = Path(path).read_text(encoding="utf-8").strip()
+    if not text:
+        return []
+    if not text.endswith("]"):
+        text = text.rstrip().rstrip(",") + "]"
+    return json.loads(text)
+
+
+# 全局 tracer（每个进程一份）
+render_tracer = RenderTracer()
@@ -7,22 +7,88 @@
 
 from __future__ import annotations
 
-from dataclasses import dataclass
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import asdict, dataclass, field
 import hashlib
+import json
+import multiprocessing
 import os
+import pickle
 import random
 import re
 import shutil
+import threading
 import time
 import unicodedata
 import uuid
 from pathlib import Path
-from typing import Dict, List, Optional, Sequence, Tuple
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
 
 from PIL import Image, ImageDraw
 
 from src.config.config import Config
+from src.core.services.background_cache import background_cache
 from src.core.services.font_manager import font_manager
+from src.core.services.image_encoder import EncodeOptions, save_image
+from src.core.services.image_store import store_generated
+from src.core.services.render_cache import RenderCache, render_cache
+from src.core.services.render_trace import render_tracer
+from src.core.services.image_effects import vertical_gradient
+from src.core.services.layout_solver import LayoutSolver, layout_hints, size_schedule
+from src.core.services.text_measure import smart_wrap, wrap_cache
+
+
+# 渲染逻辑有会改变输出的修改时递增，使旧的渲染缓存失效
+RENDER_VERSION = 1
+
+
+@dataclass(frozen=True)
+class PageRenderSpec:
+    """单页渲染任务（只含基础类型，可 pickle 后交给进程池）。"""
+
+    kind: str  # "cover" | "content"
+    index: int  # 封面为 0，内容页从 1 开始
+    text: str  # 封面为标题，内容页为该页文本
+    title: str  # 笔记标题（内容页没有页标题时使用）
+    bg_path: str  # 背景图路径，空表示内置渐变背景
+    variant: int
+    seed_text: str
+    target_size: Tuple[int, int]
+    out_path: str
+    show_tags: bool = False
+    show_content_card: bool = False
+    boxed_list_cards: bool = False
+    encoder: EncodeOptions = EncodeOptions()
+
+
+@dataclass(frozen=True)
+class PostImageRequest:
+    """批量生成中的一篇笔记（字段与 generate_post_images 的参数一致）。"""
+
+    title: str
+    content: str
+    content_pages: Optional[Sequence[str]] = None
+    pack_id: str = ""
+    page_count: int = 3
+    target_size: Tuple[int, int] = (1080, 1440)
+    bg_image_path: str = ""
+    cover_bg_image_path: str = ""
+
+
+@dataclass(frozen=True)
+class PostImageResult:
+    """批量生成中一篇笔记的结果；index 为该篇在输入中的位置。"""
+
+    index: int
+    cover: str = ""
+    contents: List[str] = field(default_factory=list)
+    error: str = ""
+    cached: bool = False
+
+    @property
+    def ok(self) -> bool:
+        return not self.error
 
 
 @dataclass(frozen=True)
@@ -37,6 +103,17 @@ class ContentPack:
         return self.pages[0] if self.pages else None
 
 
+# 内置渐变背景的配色：(top, bottom, accent)
+_BUILTIN_THEMES = [
+    ((245, 250, 255), (236, 245, 255), (59, 130, 246)),   # blue
+    ((246, 255, 252), (236, 253, 245), (16, 185, 129)),   # green
+    ((255, 248, 250), (255, 236, 239), (236, 72, 153)),   # pink
+    ((255, 250, 240), (255, 243, 230), (245, 158, 11)),   # orange
+    ((248, 247, 255), (240, 236, 255), (139, 92, 246)),   # purple
+    ((250, 250, 250), (245, 245, 245), (79, 70, 229)),    # neutral/indigo
+]
+
+
 class SystemImageTemplateService:
     def __init__(self, config: Optional[Config] = None):
         self.config = config or Config()
@@ -451,6 +528,40 @@ class SystemImageTemplateService:
         canvas.paste(resized, (paste_x, paste_y))
         return canvas
 
+    @classmethod
+    def _load_letterboxed(cls, path: str, target_size: Tuple[int, int]) -> Image.Image:
+        with Image.open(path) as im:
+            img = im.convert("RGB")
+        return cls._resize_with_letterbox(img, target_size)
+
+    def warm_background_cache(self, pack_id: str = "", target_size: Tuple[int, int] = (1080, 1440)) -> int:
+        """预先解码并缩放模板包（默认当前选中的模板包）的所有背景页，返回成功预热的张数。"""
+        pack = self.choose_pack(pack_id or self.get_selected_pack_id())
+        if not pack:
+            return 0
+        size = (int(target_size[0]), int(target_size[1]))
+        warmed = 0
+        for page in pack.pages:
+            try:
+                background_cache.get(str(page), size, self._load_letterboxed)
+                warmed += 1
+            except Exception:
+                continue
+        return warmed
+
+    def start_background_warmup(self, pack_id: str = "", target_size: Tuple[int, int] = (1080, 1440)) -> threading.Thread:
+        """在后台线程中预热背景缓存（启动时调用，不阻塞界面）。"""
+
+        def _run() -> None:
+            try:
+                self.warm_background_cache(pack_id, target_size)
+            except Exception as e:
+                print(f"⚠️ 模板背景预热失败: {e}")
+
+        t = threading.Thread(target=_run, name="xhs-bg-warmup", daemon=True)
+        t.start()
+        return t
+
     @staticmethod
     def _create_builtin_background(
         size: Tuple[int, int],
@@ -459,22 +570,26 @@ class SystemImageTemplateService:
         variant: int = 0,
     ) -> Tuple[Image.Image, Tuple[int, int, int]]:
         """生成一个内置的“干净渐变”背景（无外部模板时兜底使用）。"""
-        w, h = size
+        size = (int(size[0]), int(size[1]))
         seed_src = (seed_text or "").strip() or "xhs"
         base_seed = int(hashlib.md5(seed_src.encode("utf-8", errors="ignore")).hexdigest()[:8], 16)
+        variant = int(variant or 0)
+        accent = _BUILTIN_THEMES[base_seed % len(_BUILTIN_THEMES)][2]
+        # 像素只取决于 (尺寸, 种子哈希, 变体)：用哈希作键放进按内存计量的背景缓存，不保留正文；
+        # 返回的是副本，调用方可以继续在图上绘制
+        img = background_cache.get_or_build(
+            ("builtin", size, base_seed, variant),
+            lambda: SystemImageTemplateService._render_builtin_background(size, base_seed, variant),
+        )
+        return img, accent
+
+    @staticmethod
+    def _render_builtin_background(size: Tuple[int, int], base_seed: int, variant: int) -> Image.Image:
+        w, h = size
         rng_seed = base_seed + int(variant or 0) * 97
         rng = random.Random(rng_seed)
 
-        themes = [
-            # (top, bottom, accent)
-            ((245, 250, 255), (236, 245, 255), (59, 130, 246)),   # blue
-            ((246, 255, 252), (236, 253, 245), (16, 185, 129)),   # green
-            ((255, 248, 250), (255, 236, 239), (236, 72, 153)),   # pink
-            ((255, 250, 240), (255, 243, 230), (245, 158, 11)),   # orange
-            ((248, 247, 255), (240, 236, 255), (139, 92, 246)),   # purple
-            ((250, 250, 250), (245, 245, 245), (79, 70, 229)),    # neutral/indigo
-        ]
-        top, bottom, accent = themes[base_seed % len(themes)]
+        top, bottom, accent = _BUILTIN_THEMES[base_seed % len(_BUILTIN_THEMES)]
 
         # 轻微扰动颜色，避免每次都一模一样
         def _jitter(c: Tuple[int, int, int], j: int = 10) -> Tuple[int, int, int]:
@@ -483,16 +598,8 @@ class SystemImageTemplateService:
         top = _jitter(top, 8)
         bottom = _jitter(bottom, 10)
 
-        img = Image.new("RGB", (w, h), color=top)
-        draw = ImageDraw.Draw(img)
-
         # vertical gradient
-        for y in range(h):
-            t = y / max(1, h - 1)
-            r = int(top[0] * (1 - t) + bottom[0] * t)
-            g = int(top[1] * (1 - t) + bottom[1] * t)
-            b = int(top[2] * (1 - t) + bottom[2] * t)
-            draw.line([(0, y), (w, y)], fill=(r, g, b))
+        img = vertical_gradient((w, h), top, bottom, weighted=True)
 
         # soft blobs
         overlay = Image.new("RGBA", (w, h), (0, 0, 0, 0))
@@ -506,7 +613,7 @@ class SystemImageTemplateService:
             od.ellipse((cx - rr, cy - rr, cx + rr, cy + rr), fill=color)
 
         img = Image.alpha_composite(img.convert("RGBA"), overlay).convert("RGB")
-        return img, accent
+        return img
 
     @staticmethod
     def _clean_text(text: str) -> str:
@@ -778,76 +885,13 @@ class SystemImageTemplateService:
 
     @staticmethod
     def _smart_wrap(text: str, draw: ImageDraw.ImageDraw, font, max_width: int) -> List[str]:
-        """中文友好的逐字换行。"""
-        text = (text or "").strip()
-        if not text:
-            return []
-
-        lines: List[str] = []
-        current = ""
-        break_chars = set("，。！？；、,.!?")
-
-        for i, ch in enumerate(text):
-            test = current + ch
-            bbox = draw.textbbox((0, 0), test, font=font)
-            width = bbox[2] - bbox[0]
-            if width > max_width and current:
-                # 优先在标点断行
-                if i > 0 and text[i - 1] in break_chars:
-                    lines.append(current)
-                    current = ch
-                    continue
-
-                last_break = -1
-                for j in range(len(current) - 1, -1, -1):
-                    if current[j] in break_chars:
-                        last_break = j
-                        break
-                if last_break > 0 and len(current) - last_break < 10:
-                    lines.append(current[: last_break + 1])
-                    current = current[last_break + 1 :] + ch
-                else:
-                    lines.append(current)
-                    current = ch
-            else:
-                current = test
-
-        if current:
-            lines.append(current)
-
-        # 处理“标点单独成行”的情况：尽量把标点合并到上一行，避免出现“。”独占一行
-        if len(lines) >= 2:
-            punct = break_chars
-            fixed: List[str] = []
-            for ln in lines:
-                if not fixed:
-                    fixed.append(ln)
-                    continue
-                s = str(ln or "")
-                if not s:
-                    fixed.append(s)
-                    continue
-
-                moved = ""
-                while s and s[0] in punct:
-                    moved += s[0]
-                    s = s[1:]
-                if moved:
-                    fixed[-1] = (fixed[-1] or "") + moved
-                    if s:
-                        fixed.append(s)
-                    continue
+        """中文友好的逐字换行（glyph advance 缓存估算 + textbbox 校正，线性复杂度；结果按文本/字体/宽度缓存）。"""
 
-                # 整行只有一个标点
-                if len(s) == 1 and s in punct:
-                    fixed[-1] = (fixed[-1] or "") + s
-                    continue
-
-                fixed.append(s)
+        def _bbox_width(s: str) -> float:
+            bbox = draw.textbbox((0, 0), s, font=font)
+            return bbox[2] - bbox[0]
 
-            lines = [x for x in fixed if x is not None]
-
-        return lines
+        return wrap_cache.get("smart_bbox", text, font, max_width, lambda: smart_wrap(text, font, max_width, exact=_bbox_width))
 
     @staticmethod
     def _parse_page(text: str) -> Tuple[str, str]:
@@ -1255,33 +1299,35 @@ class SystemImageTemplateService:
                 "total_h": total_h,
             }
 
-        layout = None
-        for _ in range(22):
-            layout = _measure_layout(
-                header_size,
-                subtitle_size,
-                card_title_size,
-                card_desc_size,
-                footer_main_size,
-                footer_sub_size,
+        def _shrink(sizes: Tuple[int, ...]) -> Tuple[int, ...]:
+            hs, ss, cts, cds, fms, fss = sizes
+            return (
+                hs if hs <= 36 else max(36, hs - 2),
+                ss if ss <= 18 else max(18, ss - 1),
+                cts if cts <= 26 else max(26, cts - 2),
+                cds if cds <= 20 else max(20, cds - 2),
+                fms if fms <= 22 else max(22, fms - 1),
+                fss if fss <= 18 else max(18, fss - 1),
             )
-            if top_y + int(layout["total_h"]) <= h - bottom_margin:
-                break
-            # shrink
-            if card_desc_size > 20:
-                card_desc_size = max(20, card_desc_size - 2)
-            if card_title_size > 26:
-                card_title_size = max(26, card_title_size - 2)
-            if header_size > 36:
-                header_size = max(36, header_size - 2)
-            if subtitle_size > 18:
-                subtitle_size = max(18, subtitle_size - 1)
-            if footer_main_size > 22:
-                footer_main_size = max(22, footer_main_size - 1)
-            if footer_sub_size > 18:
-                footer_sub_size = max(18, footer_sub_size - 1)
-        if not layout or top_y + int(layout["total_h"]) > h - bottom_margin:
+
+        # 逐级缩小的字号序列上二分查找第一个放得下的方案
+        candidates = size_schedule(
+            (header_size, subtitle_size, card_title_size, card_desc_size, footer_main_size, footer_sub_size),
+            _shrink,
+            21,
+        )
+        solver = LayoutSolver(lambda sz: _measure_layout(*sz), lambda lay: top_y + int(lay["total_h"]))
+        hint_key = ("cards", header, subtitle, tuple(items), tuple(footer_lines))
+        hint = layout_hints.get(hint_key)
+        with render_tracer.span("layout", path="cards", items=len(items), hinted=bool(hint)) as trace_args:
+            solution = solver.first_fit(candidates, h - bottom_margin, hint=hint[0] if hint else None)
+            trace_args.update(index=solution.index, measured=solver.measured, fits=solution.fits)
+        if not solution.fits:
             return None
+        layout_hints.put(hint_key, (solution.index,))
+        layout = solution.layout
+        header_size, subtitle_size, card_title_size, card_desc_size, footer_main_size, footer_sub_size = solution.sizes
+        draw_trace = render_tracer.begin("draw_text", layout="cards")
 
         header_fill = (250, 250, 250) if dark_bg else (20, 20, 20)
         subtitle_fill = (215, 215, 215) if dark_bg else (120, 120, 120)
@@ -1409,6 +1455,7 @@ class SystemImageTemplateService:
                     draw.text((x0 + pad, y_text), ln, fill=card_desc_fill, font=layout["fonts"]["footer_sub"])
                     y_text += int(getattr(layout["fonts"]["footer_sub"], "size", footer_sub_size) * 1.34)
 
+        render_tracer.end(draw_trace)
         return img
 
     def _render_timeline_layout(
@@ -1553,24 +1600,29 @@ class SystemImageTemplateService:
                 "total_h": total_h,
             }
 
-        layout = None
-        for _ in range(22):
-            layout = _measure(header_size, subtitle_size, step_size, footer_main_size, footer_sub_size)
-            if top_y + int(layout["total_h"]) <= h - bottom_margin:
-                break
-            # shrink
-            if step_size > 26:
-                step_size = max(26, step_size - 2)
-            if header_size > 36:
-                header_size = max(36, header_size - 2)
-            if subtitle_size > 18:
-                subtitle_size = max(18, subtitle_size - 1)
-            if footer_main_size > 22:
-                footer_main_size = max(22, footer_main_size - 1)
-            if footer_sub_size > 18:
-                footer_sub_size = max(18, footer_sub_size - 1)
-        if not layout or top_y + int(layout["total_h"]) > h - bottom_margin:
+        def _shrink(sizes: Tuple[int, ...]) -> Tuple[int, ...]:
+            hs, ss, st, fms, fss = sizes
+            return (
+                hs if hs <= 36 else max(36, hs - 2),
+                ss if ss <= 18 else max(18, ss - 1),
+                st if st <= 26 else max(26, st - 2),
+                fms if fms <= 22 else max(22, fms - 1),
+                fss if fss <= 18 else max(18, fss - 1),
+            )
+
+        candidates = size_schedule((header_size, subtitle_size, step_size, footer_main_size, footer_sub_size), _shrink, 21)
+        solver = LayoutSolver(lambda sz: _measure(*sz), lambda lay: top_y + int(lay["total_h"]))
+        hint_key = ("timeline", header, subtitle, tuple(steps), tuple(footer_lines))
+        hint = layout_hints.get(hint_key)
+        with render_tracer.span("layout", path="timeline", steps=len(steps), hinted=bool(hint)) as trace_args:
+            solution = solver.first_fit(candidates, h - bottom_margin, hint=hint[0] if hint else None)
+            trace_args.update(index=solution.index, measured=solver.measured, fits=solution.fits)
+        if not solution.fits:
             return None
+        layout_hints.put(hint_key, (solution.index,))
+        layout = solution.layout
+        header_size, subtitle_size, step_size, footer_main_size, footer_sub_size = solution.sizes
+        draw_trace = render_tracer.begin("draw_text", layout="timeline")
 
         header_fill = (250, 250, 250) if dark_bg else (20, 20, 20)
         subtitle_fill = (215, 215, 215) if dark_bg else (120, 120, 120)
@@ -1695,6 +1747,7 @@ class SystemImageTemplateService:
                     draw.text((x0 + pad, y_text), ln, fill=footer_fill, font=layout["fonts"]["footer_sub"])
                     y_text += int(getattr(layout["fonts"]["footer_sub"], "size", footer_sub_size) * 1.34)
 
+        render_tracer.end(draw_trace)
         return img
 
     def generate_post_images(
@@ -1707,8 +1760,205 @@ class SystemImageTemplateService:
         target_size: Tuple[int, int] = (1080, 1440),
         bg_image_path: str = "",
         cover_bg_image_path: str = "",
+        parallel: Optional[bool] = None,
+        use_cache: bool = True,
     ) -> Optional[Tuple[str, List[str]]]:
-        """基于系统模板生成封面 + 内容图（返回本地路径）。"""
+        """
+        基于系统模板生成封面 + 内容图（返回本地路径）。
+
+        parallel: 为 True 时各页在进程池中并行渲染（默认读取 XHS_IMG_PARALLEL），页序不变。
+        use_cache: 渲染输入完全相同（见 _render_cache_key）且上次的文件仍在时直接返回上次结果。
+        """
+        with render_tracer.span("generate_post_images", cat="post", title=str(title or "")[:40]) as trace_args:
+            with render_tracer.span("plan", cat="post"):
+                specs = self._plan_post_pages(
+                    title,
+                    content,
+                    content_pages=content_pages,
+                    pack_id=pack_id,
+                    page_count=page_count,
+                    target_size=target_size,
+                    bg_image_path=bg_image_path,
+                    cover_bg_image_path=cover_bg_image_path,
+                )
+            trace_args["pages"] = len(specs)
+            key = self._render_cache_key(specs) if use_cache and RenderCache.enabled() else ""
+            if key:
+                cached = render_cache.get(key)
+                trace_args["cached"] = bool(cached)
+                if cached:
+                    return cached
+
+            results = self._render_pages(specs, parallel=parallel)
+            cover_path = results[0]
+            content_paths = [p for p in results[1:] if p]
+            if key:
+                render_cache.set(key, str(cover_path), content_paths)
+            return str(cover_path), content_paths
+
+    def generate_post_images_batch(
+        self,
+        posts: Iterable[Union[PostImageRequest, Dict[str, object]]],
+        *,
+        parallel: bool = True,
+        use_cache: bool = True,
+    ) -> Iterator[PostImageResult]:
+        """
+        批量生成多篇笔记的封面 + 内容图，按完成顺序逐篇产出 PostImageResult（流式）。
+
+        posts 中每一项可以是 PostImageRequest，也可以是 generate_post_images 的关键字参数字典。
+        - 模板包列表/默认模板包在整批内只解析一次
+        - 所有笔记的所有页一起提交到渲染进程池（parallel=False 或进程池不可用时串行）；
+          工作进程常驻，字体等进程内缓存在各篇之间复用
+        - 单篇失败只影响该篇（result.error），不会中断整批
+        - 渲染输入与之前完全相同的笔记直接产出缓存结果（result.cached），不占用进程池
+        """
+        use_cache = use_cache and RenderCache.enabled()
+        keys: Dict[int, str] = {}
+        plans: List[Tuple[int, List[PageRenderSpec]]] = []
+        packs: Dict[str, Optional[ContentPack]] = {}
+        selected: Optional[str] = None
+        for index, post in enumerate(posts):
+            try:
+                req = post if isinstance(post, PostImageRequest) else PostImageRequest(**dict(post))
+                pid = req.pack_id
+                if not pid:
+                    if selected is None:
+                        selected = self.get_selected_pack_id()
+                    pid = selected
+                if pid not in packs:
+                    packs[pid] = self.choose_pack(pid)
+                specs = self._plan_post_pages(
+                    req.title,
+                    req.content,
+                    content_pages=req.content_pages,
+                    page_count=req.page_count,
+                    target_size=req.target_size,
+                    bg_image_path=req.bg_image_path,
+                    cover_bg_image_path=req.cover_bg_image_path,
+                    pack=packs[pid],
+                    resolve_pack=False,
+                )
+            except Exception as e:
+                yield PostImageResult(index=index, error=str(e))
+                continue
+            if use_cache:
+                keys[index] = self._render_cache_key(specs)
+                cached = render_cache.get(keys[index])
+                if cached:
+                    yield PostImageResult(index=index, cover=cached[0], contents=cached[1], cached=True)
+                    continue
+            plans.append((index, specs))
+
+        if not plans:
+            return
+
+        def _remember(result: PostImageResult) -> PostImageResult:
+            if result.ok and result.index in keys:
+                render_cache.set(keys[result.index], result.cover, result.contents)
+            return result
+
+        done: set = set()
+        if parallel:
+            for result in self._render_batch_in_pool(plans):
+                done.add(result.index)
+                yield _remember(result)
+
+        for index, specs in plans:
+            if index in done:
+                continue
+            try:
+                results = [self.render_page(spec) for spec in specs]
+                yield _remember(self._post_result(index, results))
+            except Exception as e:
+                yield PostImageResult(index=index, error=str(e))
+
+    @staticmethod
+    def _render_cache_key(specs: Sequence[PageRenderSpec]) -> str:
+        """
+        渲染输入的哈希：各页参数（不含输出路径）+ 背景文件的 mtime/大小 + 渲染版本号。
+
+        XHS_IMG_* 开关与编码参数已经在规划阶段写进了 spec。
+        """
+        pages = []
+        for spec in specs:
+            item = asdict(spec)
+            item.pop("out_path", None)
+            bg_stat = None
+            if spec.bg_path:
+                try:
+                    st = os.stat(spec.bg_path)
+                    bg_stat = [st.st_mtime_ns, st.st_size]
+                except OSError:
+                    bg_stat = None
+            item["bg_stat"] = bg_stat
+            pages.append(item)
+        blob = json.dumps({"version": RENDER_VERSION, "pages": pages}, ensure_ascii=False, sort_keys=True, default=str)
+        return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _post_result(index: int, results: Sequence[Optional[str]]) -> PostImageResult:
+        return PostImageResult(
+            index=index,
+            cover=str(results[0]),
+            contents=[p for p in results[1:] if p],
+        )
+
+    def _render_batch_in_pool(self, plans: Sequence[Tuple[int, List[PageRenderSpec]]]) -> Iterator[PostImageResult]:
+        """
+        把整批页面提交到进程池，某篇的所有页完成后立即产出该篇结果。
+
+        进程池不可用或中途崩溃时停止产出，由调用方串行补齐尚未产出的笔记。
+        """
+        futures: Dict[object, Tuple[int, int]] = {}
+        try:
+            pool = _get_render_pool()
+            for index, specs in plans:
+                for pos, spec in enumerate(specs):
+                    futures[pool.submit(_render_page_worker, spec)] = (index, pos)
+        except Exception:
+            for f in futures:
+                f.cancel()
+            return
+
+        pages: Dict[int, List[Optional[str]]] = {index: [None] * len(specs) for index, specs in plans}
+        remaining: Dict[int, int] = {index: len(specs) for index, specs in plans}
+        errors: Dict[int, str] = {}
+        try:
+            for fut in as_completed(futures):
+                index, pos = futures[fut]
+                try:
+                    pages[index][pos] = fut.result()
+                except (BrokenProcessPool, pickle.PicklingError):
+                    shutdown_render_pool()
+                    return
+                except Exception as e:
+                    errors.setdefault(index, str(e))
+                remaining[index] -= 1
+                if remaining[index] == 0:
+                    if index in errors:
+                        yield PostImageResult(index=index, error=errors[index])
+                    else:
+                        yield self._post_result(index, pages[index])
+        finally:
+            # 调用方提前停止迭代时，取消尚未开始的页面
+            for f in futures:
+                f.cancel()
+
+    def _plan_post_pages(
+        self,
+        title: str,
+        content: str,
+        content_pages: Optional[Sequence[str]] = None,
+        pack_id: str = "",
+        page_count: int = 3,
+        target_size: Tuple[int, int] = (1080, 1440),
+        bg_image_path: str = "",
+        cover_bg_image_path: str = "",
+        pack: Optional[ContentPack] = None,
+        resolve_pack: bool = True,
+    ) -> List[PageRenderSpec]:
+        """确定分页、背景与输出路径，返回封面 + 内容页的渲染任务（resolve_pack=False 时直接使用传入的 pack）。"""
         show_tags = self._env_bool("XHS_IMG_SHOW_TAGS", default=False)
         show_content_card = self._env_bool("XHS_IMG_SHOW_CONTENT_CARD", default=False)
         boxed_list_cards = self._env_bool("XHS_IMG_BOXED_LIST_CARDS", default=False)
@@ -1733,9 +1983,10 @@ class SystemImageTemplateService:
         if not cover_override and bg_override:
             cover_override = bg_override
 
-        pack: Optional[ContentPack] = None
         # 内容页：只有在未指定 bg_override 时才使用模板包
-        if not bg_override:
+        if bg_override:
+            pack = None
+        elif resolve_pack:
             pack = self.choose_pack(pack_id or self.get_selected_pack_id())
 
         raw_pages = [str(x) for x in (content_pages or []) if str(x).strip()]
@@ -1787,27 +2038,110 @@ class SystemImageTemplateService:
         pack_tag = pack_tag or "tpl"
         pack_tag = re.sub(r"[^a-zA-Z0-9_\\-]+", "_", pack_tag)[:40]
 
-        builtin_seed_text = f"{(title or '').strip()}|{(content or '').strip()}"
-        builtin_accent: Optional[Tuple[int, int, int]] = None
-
-        def _open_bg(path: Optional[Path], *, variant: int = 0) -> Image.Image:
-            nonlocal builtin_accent
-            if path:
-                img = Image.open(str(path)).convert("RGB")
-                return self._resize_with_letterbox(img, target_size)
-
-            img, accent = self._create_builtin_background(target_size, seed_text=builtin_seed_text, variant=variant)
-            if accent and builtin_accent is None:
-                builtin_accent = accent
-            return img
+        seed_text = f"{(title or '').strip()}|{(content or '').strip()}"
+        size = (int(target_size[0]), int(target_size[1]))
+        encoder = EncodeOptions.from_env("XHS_IMG")
+        flags = {
+            "show_tags": show_tags,
+            "show_content_card": show_content_card,
+            "boxed_list_cards": boxed_list_cards,
+            "encoder": encoder,
+        }
 
         cover_bg = cover_override if cover_override else (pack.pages[0] if pack else None)
-        cover_img = _open_bg(cover_bg, variant=0)
+        specs: List[PageRenderSpec] = [
+            PageRenderSpec(
+                kind="cover",
+                index=0,
+                text=title or "",
+                title=title or "",
+                bg_path=str(cover_bg) if cover_bg else "",
+                variant=0,
+                seed_text=seed_text,
+                target_size=size,
+                out_path=str(output_dir / f"cover_tpl_{pack_tag}_{ts}_{unique}{encoder.extension}"),
+                **flags,
+            )
+        ]
+        for idx, page_text in enumerate(pages):
+            if bg_override:
+                bg_path = bg_override
+            elif pack and pack.pages:
+                bg_index = min(idx + 1, len(pack.pages) - 1) if pack and len(pack.pages) > 1 else 0
+                bg_path = pack.pages[bg_index] if pack else cover_bg
+            else:
+                bg_path = None
+
+            specs.append(
+                PageRenderSpec(
+                    kind="content",
+                    index=idx + 1,
+                    text=page_text,
+                    title=title or "",
+                    bg_path=str(bg_path) if bg_path else "",
+                    variant=idx + 1,
+                    seed_text=seed_text,
+                    target_size=size,
+                    out_path=str(output_dir / f"content_tpl_{idx+1}_{pack_tag}_{ts}_{unique}{encoder.extension}"),
+                    **flags,
+                )
+            )
+        return specs
+
+    def render_page(self, spec: PageRenderSpec) -> Optional[str]:
+        """渲染单页（封面或内容页），返回输出路径；内容页被跳过时返回 None。"""
+        size = f"{spec.target_size[0]}x{spec.target_size[1]}"
+        with render_tracer.span("page", kind=spec.kind, index=spec.index, size=size) as trace_args:
+            if spec.kind == "cover":
+                path = self._render_cover_page(spec)
+            else:
+                path = self._render_content_page(spec)
+            trace_args["skipped"] = not path
+            return store_generated(path) if path else path
+
+    def _render_pages(self, specs: Sequence[PageRenderSpec], *, parallel: Optional[bool] = None) -> List[Optional[str]]:
+        """
+        按原顺序渲染所有页。
+
+        并行模式（parallel=True 或 XHS_IMG_PARALLEL=true）下每页交给进程池独立渲染；
+        进程池不可用（无法启动/进程崩溃/任务无法序列化）时回退为串行。
+        """
+        if parallel is None:
+            parallel = self._env_bool("XHS_IMG_PARALLEL", default=False)
+
+        if parallel and len(specs) > 1:
+            futures = None
+            try:
+                pool = _get_render_pool()
+                futures = [pool.submit(_render_page_worker, spec) for spec in specs]
+            except Exception:
+                futures = None
+            if futures is not None:
+                try:
+                    return [f.result() for f in futures]
+                except (BrokenProcessPool, pickle.PicklingError):
+                    shutdown_render_pool()
+
+        return [self.render_page(spec) for spec in specs]
+
+    def _open_background(self, spec: PageRenderSpec) -> Tuple[Image.Image, Optional[Tuple[int, int, int]]]:
+        """打开背景（模板图等比留白缩放 / 内置渐变），内置背景同时返回其强调色。"""
+        with render_tracer.span("background", source="template" if spec.bg_path else "builtin") as trace_args:
+            if spec.bg_path:
+                misses = background_cache.misses
+                img = background_cache.get(spec.bg_path, spec.target_size, self._load_letterboxed)
+                trace_args["cache_hit"] = background_cache.misses == misses
+                return img, None
+            return self._create_builtin_background(spec.target_size, seed_text=spec.seed_text, variant=spec.variant)
+
+    def _render_cover_page(self, spec: PageRenderSpec) -> str:
+        cover_img, _accent = self._open_background(spec)
         cover_draw = ImageDraw.Draw(cover_img)
+        draw_trace = render_tracer.begin("draw_text", layout="cover")
 
         # Cover: title
         w, h = cover_img.size
-        cover_title = self._clean_text(title) or "小红书笔记"
+        cover_title = self._clean_text(spec.text) or "小红书笔记"
         font_title = font_manager.get_font("chinese", "bold", size=max(28, int(h * 0.06)))
         max_w = w - 160
         lines = self._smart_wrap(cover_title, cover_draw, font_title, max_w)[:3]
@@ -1828,586 +2162,627 @@ class SystemImageTemplateService:
             )
             start_y += line_h
 
-        cover_path = output_dir / f"cover_tpl_{pack_tag}_{ts}_{unique}.jpg"
-        cover_img.save(str(cover_path), format="JPEG", quality=92)
-
-        content_paths: List[str] = []
-        for idx, page_text in enumerate(pages):
-            if bg_override:
-                bg_path = bg_override
-            elif pack and pack.pages:
-                bg_index = min(idx + 1, len(pack.pages) - 1) if pack and len(pack.pages) > 1 else 0
-                bg_path = pack.pages[bg_index] if pack else cover_bg
-            else:
-                bg_path = None
-
-            img = _open_bg(bg_path, variant=idx + 1)
-            draw = ImageDraw.Draw(img)
-            w, h = img.size
-
-            page_title, body = self._parse_page(page_text)
-            page_title = self._clean_text(page_title)
-            body = self._clean_text(body or page_text)
-
-            # 从正文中提取标签（用于更美观的标签胶囊渲染）
-            body, tags = self._extract_tags(body)
-            body = self._auto_paragraphize(body)
-            # 只包含标签的页（如“#话题1 #话题2”或“话题标签”页）直接跳过，避免出现“最后一张标签图”
-            if not (body or "").strip() and not (page_title or "").strip():
-                continue
+        render_tracer.end(draw_trace)
+        return save_image(cover_img, spec.out_path, spec.encoder)
 
-            tag_titles = {"标签", "话题标签", "话题", "hashtags", "hashtag", "tags", "tag"}
-            is_tag_page = (page_title or "").strip().lower() in tag_titles
-            if is_tag_page and not (body or "").strip():
-                if not show_tags or not tags:
-                    continue
-            if (not (body or "").strip()) and tags and (is_tag_page or not (page_title or "").strip()):
-                if not show_tags:
-                    continue
+    def _render_content_page(self, spec: PageRenderSpec) -> Optional[str]:
+        """渲染一张内容页并写入 spec.out_path；该页被跳过（如只有标签）时返回 None。"""
+        img, builtin_accent = self._open_background(spec)
+        draw = ImageDraw.Draw(img)
+        w, h = img.size
+        page_text = spec.text
+        title = spec.title
+        show_tags = spec.show_tags
+        show_content_card = spec.show_content_card
+        boxed_list_cards = spec.boxed_list_cards
+
+        page_title, body = self._parse_page(page_text)
+        page_title = self._clean_text(page_title)
+        body = self._clean_text(body or page_text)
+
+        # 从正文中提取标签（用于更美观的标签胶囊渲染）
+        body, tags = self._extract_tags(body)
+        body = self._auto_paragraphize(body)
+        # 只包含标签的页（如“#话题1 #话题2”或“话题标签”页）直接跳过，避免出现“最后一张标签图”
+        if not (body or "").strip() and not (page_title or "").strip():
+            return None
 
+        tag_titles = {"标签", "话题标签", "话题", "hashtags", "hashtag", "tags", "tag"}
+        is_tag_page = (page_title or "").strip().lower() in tag_titles
+        if is_tag_page and not (body or "").strip():
+            if not show_tags or not tags:
+                return None
+        if (not (body or "").strip()) and tags and (is_tag_page or not (page_title or "").strip()):
             if not show_tags:
-                tags = []
+                return None
 
-            # 安全边距（尽量兼容不同模板，避免贴边/遮挡页码）
-            left = int(w * 0.10)
-            right = int(w * 0.10)
-            top = int(h * 0.14)
-            bottom = int(h * 0.12)
-            max_text_w = max(1, w - left - right)
-            max_text_h = max(1, h - top - bottom)
+        if not show_tags:
+            tags = []
 
-            # 采样背景亮度，决定文字配色（减少粗描边导致的“脏”感）
-            try:
-                sample_color = img.getpixel((w // 2, min(h - 2, max(2, top + 20))))
-                sample_rgb = tuple(int(x) for x in (sample_color[:3] if isinstance(sample_color, tuple) else (255, 255, 255)))
-            except Exception:
-                sample_rgb = (255, 255, 255)
+        # 安全边距（尽量兼容不同模板，避免贴边/遮挡页码）
+        left = int(w * 0.10)
+        right = int(w * 0.10)
+        top = int(h * 0.14)
+        bottom = int(h * 0.12)
+        max_text_w = max(1, w - left - right)
+        max_text_h = max(1, h - top - bottom)
 
-            dark_bg = self._luminance(sample_rgb) < 140
-            title_fill = (250, 250, 250) if dark_bg else (18, 18, 18)
-            body_fill = (245, 245, 245) if dark_bg else (55, 55, 55)
-            stroke_w_title = 2 if dark_bg else 0
-            stroke_w_body = 1 if dark_bg else 0
-            stroke_fill = (10, 10, 10) if dark_bg else (255, 255, 255)
+        # 采样背景亮度，决定文字配色（减少粗描边导致的“脏”感）
+        try:
+            sample_color = img.getpixel((w // 2, min(h - 2, max(2, top + 20))))
+            sample_rgb = tuple(int(x) for x in (sample_color[:3] if isinstance(sample_color, tuple) else (255, 255, 255)))
+        except Exception:
+            sample_rgb = (255, 255, 255)
 
-            accent = builtin_accent or self._pick_accent_color(img)
+        dark_bg = self._luminance(sample_rgb) < 140
+        title_fill = (250, 250, 250) if dark_bg else (18, 18, 18)
+        body_fill = (245, 245, 245) if dark_bg else (55, 55, 55)
+        stroke_w_title = 2 if dark_bg else 0
+        stroke_w_body = 1 if dark_bg else 0
+        stroke_fill = (10, 10, 10) if dark_bg else (255, 255, 255)
 
-            # 尝试更“远程风格”的内容页：卡片列表 / 时间线（失败则回退到默认排版）
-            page_header = page_title or self._clean_text(title) or "要点"
-            try:
-                tl_subtitle, tl_steps, tl_footer = self._parse_timeline_layout(body)
-                if tl_steps and len(tl_steps) >= 3:
-                    rendered = self._render_timeline_layout(
-                        img,
-                        header=page_header,
-                        subtitle=tl_subtitle,
-                        steps=tl_steps,
-                        footer_lines=tl_footer,
-                        accent=accent,
-                        dark_bg=dark_bg,
-                        boxed=boxed_list_cards,
-                    )
-                    if rendered:
-                        out_path = output_dir / f"content_tpl_{idx+1}_{pack_tag}_{ts}_{unique}.jpg"
-                        rendered.save(str(out_path), format="JPEG", quality=92)
-                        content_paths.append(str(out_path))
-                        continue
-            except Exception:
-                pass
+        accent = builtin_accent or self._pick_accent_color(img)
 
-            try:
-                card_subtitle, card_items, card_footer = self._parse_cards_layout(body)
-                if card_items and len(card_items) >= 3:
-                    rendered = self._render_cards_layout(
-                        img,
-                        header=page_header,
-                        subtitle=card_subtitle,
-                        items=card_items,
-                        footer_lines=card_footer,
-                        accent=accent,
-                        dark_bg=dark_bg,
-                        boxed=boxed_list_cards,
-                    )
-                    if rendered:
-                        out_path = output_dir / f"content_tpl_{idx+1}_{pack_tag}_{ts}_{unique}.jpg"
-                        rendered.save(str(out_path), format="JPEG", quality=92)
-                        content_paths.append(str(out_path))
-                        continue
-            except Exception:
-                pass
+        # 尝试更“远程风格”的内容页：卡片列表 / 时间线（失败则回退到默认排版）
+        page_header = page_title or self._clean_text(title) or "要点"
+        try:
+            tl_subtitle, tl_steps, tl_footer = self._parse_timeline_layout(body)
+            if tl_steps and len(tl_steps) >= 3:
+                rendered = self._render_timeline_layout(
+                    img,
+                    header=page_header,
+                    subtitle=tl_subtitle,
+                    steps=tl_steps,
+                    footer_lines=tl_footer,
+                    accent=accent,
+                    dark_bg=dark_bg,
+                    boxed=boxed_list_cards,
+                )
+                if rendered:
+                    return save_image(rendered, spec.out_path, spec.encoder)
+        except Exception:
+            pass
 
-            # 根据正文长度给一个更合理的初始字号，再用 fit-to-box 微调
-            plain_len = len(re.sub(r"\s+", "", body or ""))
-            if plain_len <= 60:
-                body_size = int(h * 0.038)
-            elif plain_len <= 120:
-                body_size = int(h * 0.034)
-            elif plain_len <= 180:
-                body_size = int(h * 0.031)
-            else:
-                body_size = int(h * 0.028)
-
-            body_size = max(24, min(56, body_size))
-            title_size = max(34, min(86, max(int(h * 0.048), body_size + 10)))
-
-            min_body, min_title = 24, 34
-            max_body, max_title = 56, 86
-
-            def _layout_for(size_title: int, size_body: int):
-                font_title = font_manager.get_font("chinese", "bold", size=size_title)
-                font_body = font_manager.get_font("chinese", "regular", size=size_body)
-                font_body_bold = font_manager.get_font("chinese", "bold", size=max(20, int(size_body * 0.96)))
-
-                t_lines = self._smart_wrap(page_title, draw, font_title, max_text_w)[:2] if page_title else []
-                title_line_h = int(getattr(font_title, "size", size_title) * 1.22)
-
-                # 正文分段 + 换行：尽量呈现“小红书”常见的段落节奏
-                # 额外做一层 Markdown 清理，避免出现「##」「-」「**加粗**」等符号导致排版变丑
-                list_bullet_re = re.compile(r"^[-*•]\s+")
-                list_number_re = re.compile(r"^(\d{1,2})[.)、]\s*")
-                md_heading_re = re.compile(r"^#{1,6}\s+")
-                md_quote_re = re.compile(r"^>\s*")
-                md_link_re = re.compile(r"\[([^\]]+)\]\([^)]+\)")
-
-                def _strip_md_inline(text: str) -> str:
-                    s = str(text or "")
-                    s = md_link_re.sub(r"\1", s)
-                    s = re.sub(r"`+", "", s)
-                    s = re.sub(r"\*\*(.+?)\*\*", r"\1", s)
-                    s = re.sub(r"__(.+?)__", r"\1", s)
-                    s = re.sub(r"~~(.+?)~~", r"\1", s)
-                    return s
-
-                def _normalize_line(line: str) -> str:
-                    s = str(line or "").strip()
-                    if not s:
-                        return ""
-                    s = md_quote_re.sub("", s).strip()
-                    # 仅移除「# 」「## 」这类标题写法，不影响「#话题」标签
-                    s = md_heading_re.sub("", s).strip()
-                    s = _strip_md_inline(s).strip()
-                    return s
-
-                def _is_list_line(line: str) -> bool:
-                    s = str(line or "").strip()
-                    if not s:
-                        return False
-                    return bool(list_bullet_re.match(s) or list_number_re.match(s))
-
-                def _normalize_list_line(line: str) -> str:
-                    s = str(line or "").strip()
-                    if not s:
-                        return ""
-                    s = md_quote_re.sub("", s).strip()
-                    m = list_number_re.match(s)
-                    if m:
-                        rest = s[m.end() :].strip()
-                        rest = md_heading_re.sub("", rest).strip()
-                        rest = _strip_md_inline(rest).strip()
-                        return f"{m.group(1)}. {rest}".strip()
-                    s = list_bullet_re.sub("", s).strip()
-                    s = md_heading_re.sub("", s).strip()
-                    s = _strip_md_inline(s).strip()
-                    return s
-
-                raw_body = (body or "").strip()
-                blocks: List[str] = []
-                if raw_body:
-                    if "\n\n" in raw_body:
-                        blocks = [b.strip() for b in re.split(r"\n\s*\n", raw_body) if b.strip()]
-                    else:
-                        lines = [ln.strip() for ln in raw_body.splitlines() if ln.strip()]
-                        blocks = lines if len(lines) > 1 else [raw_body]
+        try:
+            card_subtitle, card_items, card_footer = self._parse_cards_layout(body)
+            if card_items and len(card_items) >= 3:
+                rendered = self._render_cards_layout(
+                    img,
+                    header=page_header,
+                    subtitle=card_subtitle,
+                    items=card_items,
+                    footer_lines=card_footer,
+                    accent=accent,
+                    dark_bg=dark_bg,
+                    boxed=boxed_list_cards,
+                )
+                if rendered:
+                    return save_image(rendered, spec.out_path, spec.encoder)
+        except Exception:
+            pass
 
-                body_items: List[Dict[str, object]] = []
-                for block in blocks:
-                    block = str(block or "").strip()
-                    if not block:
-                        continue
+        # 根据正文长度给一个更合理的初始字号，再用 fit-to-box 微调
+        plain_len = len(re.sub(r"\s+", "", body or ""))
+        if plain_len <= 60:
+            body_size = int(h * 0.038)
+        elif plain_len <= 120:
+            body_size = int(h * 0.034)
+        elif plain_len <= 180:
+            body_size = int(h * 0.031)
+        else:
+            body_size = int(h * 0.028)
+
+        body_size = max(24, min(56, body_size))
+        title_size = max(34, min(86, max(int(h * 0.048), body_size + 10)))
+
+        min_body, min_title = 24, 34
+        max_body, max_title = 56, 86
+
+        def _layout_for(size_title: int, size_body: int):
+            font_title = font_manager.get_font("chinese", "bold", size=size_title)
+            font_body = font_manager.get_font("chinese", "regular", size=size_body)
+            font_body_bold = font_manager.get_font("chinese", "bold", size=max(20, int(size_body * 0.96)))
+
+            t_lines = self._smart_wrap(page_title, draw, font_title, max_text_w)[:2] if page_title else []
+            title_line_h = int(getattr(font_title, "size", size_title) * 1.22)
+
+            # 正文分段 + 换行：尽量呈现“小红书”常见的段落节奏
+            # 额外做一层 Markdown 清理，避免出现「##」「-」「**加粗**」等符号导致排版变丑
+            list_bullet_re = re.compile(r"^[-*•]\s+")
+            list_number_re = re.compile(r"^(\d{1,2})[.)、]\s*")
+            md_heading_re = re.compile(r"^#{1,6}\s+")
+            md_quote_re = re.compile(r"^>\s*")
+            md_link_re = re.compile(r"\[([^\]]+)\]\([^)]+\)")
+
+            def _strip_md_inline(text: str) -> str:
+                s = str(text or "")
+                s = md_link_re.sub(r"\1", s)
+                s = re.sub(r"`+", "", s)
+                s = re.sub(r"\*\*(.+?)\*\*", r"\1", s)
+                s = re.sub(r"__(.+?)__", r"\1", s)
+                s = re.sub(r"~~(.+?)~~", r"\1", s)
+                return s
+
+            def _normalize_line(line: str) -> str:
+                s = str(line or "").strip()
+                if not s:
+                    return ""
+                s = md_quote_re.sub("", s).strip()
+                # 仅移除「# 」「## 」这类标题写法，不影响「#话题」标签
+                s = md_heading_re.sub("", s).strip()
+                s = _strip_md_inline(s).strip()
+                return s
+
+            def _is_list_line(line: str) -> bool:
+                s = str(line or "").strip()
+                if not s:
+                    return False
+                return bool(list_bullet_re.match(s) or list_number_re.match(s))
 
-                    # 兼容「小标题\\n正文」结构：小标题用加粗，正文用常规
-                    seg_lines = [ln.strip() for ln in block.splitlines() if ln.strip()]
-                    if len(seg_lines) >= 2 and len(seg_lines[0]) <= 12:
-                        sub = _normalize_line(seg_lines[0])
-                        # 保留正文的换行节奏（不要直接 join 成一段）
-                        body_raw_lines = [ln.rstrip() for ln in block.splitlines()[1:]]
-                        paras: List[str] = []
-                        buf: List[str] = []
-                        for ln in body_raw_lines:
-                            if not str(ln or "").strip():
-                                if buf:
-                                    paras.append(" ".join([x.strip() for x in buf if str(x).strip()]).strip())
-                                    buf = []
-                                continue
-                            if _is_list_line(ln):
-                                if buf:
-                                    paras.append(" ".join([x.strip() for x in buf if str(x).strip()]).strip())
-                                    buf = []
-                                cleaned = _normalize_list_line(ln)
-                                if cleaned:
-                                    paras.append(cleaned)
-                                continue
+            def _normalize_list_line(line: str) -> str:
+                s = str(line or "").strip()
+                if not s:
+                    return ""
+                s = md_quote_re.sub("", s).strip()
+                m = list_number_re.match(s)
+                if m:
+                    rest = s[m.end() :].strip()
+                    rest = md_heading_re.sub("", rest).strip()
+                    rest = _strip_md_inline(rest).strip()
+                    return f"{m.group(1)}. {rest}".strip()
+                s = list_bullet_re.sub("", s).strip()
+                s = md_heading_re.sub("", s).strip()
+                s = _strip_md_inline(s).strip()
+                return s
+
+            raw_body = (body or "").strip()
+            blocks: List[str] = []
+            if raw_body:
+                if "\n\n" in raw_body:
+                    blocks = [b.strip() for b in re.split(r"\n\s*\n", raw_body) if b.strip()]
+                else:
+                    lines = [ln.strip() for ln in raw_body.splitlines() if ln.strip()]
+                    blocks = lines if len(lines) > 1 else [raw_body]
+
+            body_items: List[Dict[str, object]] = []
+            for block in blocks:
+                block = str(block or "").strip()
+                if not block:
+                    continue
 
-                            cleaned = _normalize_line(ln)
+                # 兼容「小标题\\n正文」结构：小标题用加粗，正文用常规
+                seg_lines = [ln.strip() for ln in block.splitlines() if ln.strip()]
+                if len(seg_lines) >= 2 and len(seg_lines[0]) <= 12:
+                    sub = _normalize_line(seg_lines[0])
+                    # 保留正文的换行节奏（不要直接 join 成一段）
+                    body_raw_lines = [ln.rstrip() for ln in block.splitlines()[1:]]
+                    paras: List[str] = []
+                    buf: List[str] = []
+                    for ln in body_raw_lines:
+                        if not str(ln or "").strip():
+                            if buf:
+                                paras.append(" ".join([x.strip() for x in buf if str(x).strip()]).strip())
+                                buf = []
+                            continue
+                        if _is_list_line(ln):
+                            if buf:
+                                paras.append(" ".join([x.strip() for x in buf if str(x).strip()]).strip())
+                                buf = []
+                            cleaned = _normalize_list_line(ln)
                             if cleaned:
-                                buf.append(cleaned)
-                        if buf:
-                            paras.append(" ".join([x.strip() for x in buf if str(x).strip()]).strip())
-                        sub_lines = self._smart_wrap(sub, draw, font_body_bold, max_text_w)[:2] if sub else []
-                        for i, ln in enumerate(sub_lines):
-                            body_items.append({"text": ln, "kind": "sub", "para_start": i == 0})
-                        if paras:
-                            for pi, para in enumerate(paras):
-                                para = self._auto_paragraphize(str(para or "").strip())
-                                parts = (
-                                    [p.strip() for p in re.split(r"\n\s*\n", para) if p.strip()]
-                                    if "\n\n" in para
-                                    else [para]
-                                )
-                                for pj, part in enumerate(parts):
-                                    rest_lines = self._smart_wrap(part, draw, font_body, max_text_w)
-                                    for li, ln in enumerate(rest_lines):
-                                        body_items.append({"text": ln, "kind": "body", "para_start": li == 0})
-                                    if (pj < len(parts) - 1) or (pi < len(paras) - 1):
-                                        body_items.append({"text": "", "kind": "blank", "para_start": False})
-                    else:
-                        # 处理纯列表块：保持每一条独立成段，避免「- A - B - C」挤在一行
-                        if seg_lines and len(seg_lines) >= 2 and all(_is_list_line(x) for x in seg_lines):
-                            for li, raw_ln in enumerate(seg_lines):
-                                cleaned = _normalize_list_line(raw_ln)
-                                if not cleaned:
-                                    continue
-                                part_lines = self._smart_wrap(cleaned, draw, font_body, max_text_w)
-                                for i, ln in enumerate(part_lines):
-                                    body_items.append({"text": ln, "kind": "body", "para_start": i == 0})
-                                if li < len(seg_lines) - 1:
-                                    body_items.append({"text": "", "kind": "blank", "para_start": False})
-                            body_items.append({"text": "", "kind": "blank", "para_start": False})
+                                paras.append(cleaned)
                             continue
 
-                        if seg_lines and len(seg_lines) == 1 and _is_list_line(seg_lines[0]):
-                            para_text = _normalize_list_line(seg_lines[0])
-                        else:
-                            seg_norm = [_normalize_line(x) for x in (seg_lines or [])]
-                            para_text = " ".join([x for x in seg_norm if x]).strip() if seg_norm else ""
-                            if not para_text:
-                                para_text = _normalize_line(block)
-
-                        para_text = self._auto_paragraphize(para_text)
-                        parts = (
-                            [p.strip() for p in re.split(r"\n\s*\n", para_text) if p.strip()]
-                            if "\n\n" in para_text
-                            else [para_text]
-                        )
-                        for pi, part in enumerate(parts):
-                            # 兼容「关键词：解释」的单行结构，做成更小红书的“要点卡”
-                            m = re.match(r"^(.{2,10})[：:](.+)$", part)
-                            if m:
-                                key = str(m.group(1) or "").strip()
-                                val = str(m.group(2) or "").strip()
-                                if key:
-                                    key_lines = self._smart_wrap(key, draw, font_body_bold, max_text_w)[:2]
-                                    for i, ln in enumerate(key_lines):
-                                        body_items.append({"text": ln, "kind": "sub", "para_start": i == 0})
-                                if val:
-                                    val = self._auto_paragraphize(val)
-                                    val_parts = (
-                                        [p.strip() for p in re.split(r"\n\s*\n", val) if p.strip()]
-                                        if "\n\n" in val
-                                        else [val]
-                                    )
-                                    for vpi, vpart in enumerate(val_parts):
-                                        v_lines = self._smart_wrap(vpart, draw, font_body, max_text_w)
-                                        for ln in v_lines:
-                                            body_items.append({"text": ln, "kind": "body", "para_start": False})
-                                        if vpi < len(val_parts) - 1:
-                                            body_items.append({"text": "", "kind": "blank", "para_start": False})
-                                if pi < len(parts) - 1:
+                        cleaned = _normalize_line(ln)
+                        if cleaned:
+                            buf.append(cleaned)
+                    if buf:
+                        paras.append(" ".join([x.strip() for x in buf if str(x).strip()]).strip())
+                    sub_lines = self._smart_wrap(sub, draw, font_body_bold, max_text_w)[:2] if sub else []
+                    for i, ln in enumerate(sub_lines):
+                        body_items.append({"text": ln, "kind": "sub", "para_start": i == 0})
+                    if paras:
+                        for pi, para in enumerate(paras):
+                            para = self._auto_paragraphize(str(para or "").strip())
+                            parts = (
+                                [p.strip() for p in re.split(r"\n\s*\n", para) if p.strip()]
+                                if "\n\n" in para
+                                else [para]
+                            )
+                            for pj, part in enumerate(parts):
+                                rest_lines = self._smart_wrap(part, draw, font_body, max_text_w)
+                                for li, ln in enumerate(rest_lines):
+                                    body_items.append({"text": ln, "kind": "body", "para_start": li == 0})
+                                if (pj < len(parts) - 1) or (pi < len(paras) - 1):
                                     body_items.append({"text": "", "kind": "blank", "para_start": False})
+                else:
+                    # 处理纯列表块：保持每一条独立成段，避免「- A - B - C」挤在一行
+                    if seg_lines and len(seg_lines) >= 2 and all(_is_list_line(x) for x in seg_lines):
+                        for li, raw_ln in enumerate(seg_lines):
+                            cleaned = _normalize_list_line(raw_ln)
+                            if not cleaned:
                                 continue
-
-                            part_lines = self._smart_wrap(part, draw, font_body, max_text_w)
+                            part_lines = self._smart_wrap(cleaned, draw, font_body, max_text_w)
                             for i, ln in enumerate(part_lines):
                                 body_items.append({"text": ln, "kind": "body", "para_start": i == 0})
-                            if pi < len(parts) - 1:
+                            if li < len(seg_lines) - 1:
                                 body_items.append({"text": "", "kind": "blank", "para_start": False})
+                        body_items.append({"text": "", "kind": "blank", "para_start": False})
+                        continue
 
-                    # 段落间距
-                    body_items.append({"text": "", "kind": "blank", "para_start": False})
+                    if seg_lines and len(seg_lines) == 1 and _is_list_line(seg_lines[0]):
+                        para_text = _normalize_list_line(seg_lines[0])
+                    else:
+                        seg_norm = [_normalize_line(x) for x in (seg_lines or [])]
+                        para_text = " ".join([x for x in seg_norm if x]).strip() if seg_norm else ""
+                        if not para_text:
+                            para_text = _normalize_line(block)
+
+                    para_text = self._auto_paragraphize(para_text)
+                    parts = (
+                        [p.strip() for p in re.split(r"\n\s*\n", para_text) if p.strip()]
+                        if "\n\n" in para_text
+                        else [para_text]
+                    )
+                    for pi, part in enumerate(parts):
+                        # 兼容「关键词：解释」的单行结构，做成更小红书的“要点卡”
+                        m = re.match(r"^(.{2,10})[：:](.+)$", part)
+                        if m:
+                            key = str(m.group(1) or "").strip()
+                            val = str(m.group(2) or "").strip()
+                            if key:
+                                key_lines = self._smart_wrap(key, draw, font_body_bold, max_text_w)[:2]
+                                for i, ln in enumerate(key_lines):
+                                    body_items.append({"text": ln, "kind": "sub", "para_start": i == 0})
+                            if val:
+                                val = self._auto_paragraphize(val)
+                                val_parts = (
+                                    [p.strip() for p in re.split(r"\n\s*\n", val) if p.strip()]
+                                    if "\n\n" in val
+                                    else [val]
+                                )
+                                for vpi, vpart in enumerate(val_parts):
+                                    v_lines = self._smart_wrap(vpart, draw, font_body, max_text_w)
+                                    for ln in v_lines:
+                                        body_items.append({"text": ln, "kind": "body", "para_start": False})
+                                    if vpi < len(val_parts) - 1:
+                                        body_items.append({"text": "", "kind": "blank", "para_start": False})
+                            if pi < len(parts) - 1:
+                                body_items.append({"text": "", "kind": "blank", "para_start": False})
+                            continue
 
-                while body_items and str(body_items[-1].get("kind")) == "blank":
-                    body_items.pop()
+                        part_lines = self._smart_wrap(part, draw, font_body, max_text_w)
+                        for i, ln in enumerate(part_lines):
+                            body_items.append({"text": ln, "kind": "body", "para_start": i == 0})
+                        if pi < len(parts) - 1:
+                            body_items.append({"text": "", "kind": "blank", "para_start": False})
 
-                body_line_h = int(getattr(font_body, "size", size_body) * 1.62)
-                body_h = 0
-                for it in body_items:
-                    if str(it.get("kind")) == "blank":
-                        body_h += int(body_line_h * 0.98)
-                    else:
-                        body_h += body_line_h
-
-                # 段落引导点（小红书常见的“要点”感）
-                bullet_r = max(4, int(size_body * 0.18))
-                bullet_x = max(18, left - max(18, int(size_body * 0.60)))
-
-                # 标签胶囊区域
-                tag_font = font_manager.get_font("chinese", "regular", size=max(20, int(size_body * 0.78)))
-                pad_x = 16
-                pad_y = 8
-                pill_h = int(getattr(tag_font, "size", 28) + pad_y * 2)
-                row_gap = 10
-                col_gap = 10
-
-                rows = 0
-                if tags:
-                    x = 0
-                    rows = 1
-                    for t in tags:
-                        bbox = draw.textbbox((0, 0), t, font=tag_font)
-                        tw = bbox[2] - bbox[0]
-                        pill_w = tw + pad_x * 2
-                        if x > 0 and x + pill_w > max_text_w:
-                            rows += 1
-                            x = 0
-                        x += pill_w + col_gap
-
-                tags_h = 0
-                tags_gap = 0
-                if rows > 0:
-                    tags_h = rows * pill_h + (rows - 1) * row_gap
-                    tags_gap = int(body_line_h * 0.75)
-
-                divider_h = 0
-                divider_gap = 0
-                if t_lines:
-                    divider_h = 4
-                    divider_gap = int(body_line_h * 0.55)
-
-                title_h = len(t_lines) * title_line_h
-                gap_title_body = int(body_line_h * 0.55) if t_lines and (body_items or tags) else 0
-                total_h = title_h + divider_h + divider_gap + gap_title_body + body_h + tags_gap + tags_h
-
-                return {
-                    "font_title": font_title,
-                    "font_body": font_body,
-                    "font_body_bold": font_body_bold,
-                    "font_tag": tag_font,
-                    "title_lines": t_lines,
-                    "body_items": body_items,
-                    "title_line_h": title_line_h,
-                    "body_line_h": body_line_h,
-                    "bullet_r": bullet_r,
-                    "bullet_x": bullet_x,
-                    "pill_h": pill_h,
-                    "pad_x": pad_x,
-                    "pad_y": pad_y,
-                    "row_gap": row_gap,
-                    "col_gap": col_gap,
-                    "divider_h": divider_h,
-                    "divider_gap": divider_gap,
-                    "gap_title_body": gap_title_body,
-                    "tags_gap": tags_gap,
-                    "tags_rows": rows,
-                    "total_h": total_h,
-                }
+                # 段落间距
+                body_items.append({"text": "", "kind": "blank", "para_start": False})
 
-            layout = _layout_for(title_size, body_size)
+            while body_items and str(body_items[-1].get("kind")) == "blank":
+                body_items.pop()
 
-            # 先收缩到能放下
-            for _ in range(28):
-                if layout["total_h"] <= max_text_h:
-                    break
-                if body_size > min_body:
-                    body_size = max(min_body, body_size - 2)
-                elif title_size > min_title:
-                    title_size = max(min_title, title_size - 2)
+            body_line_h = int(getattr(font_body, "size", size_body) * 1.62)
+            body_h = 0
+            for it in body_items:
+                if str(it.get("kind")) == "blank":
+                    body_h += int(body_line_h * 0.98)
                 else:
-                    break
-                title_size = max(min_title, min(max_title, max(title_size, body_size + 8)))
-                layout = _layout_for(title_size, body_size)
+                    body_h += body_line_h
+
+            # 段落引导点（小红书常见的“要点”感）
+            bullet_r = max(4, int(size_body * 0.18))
+            bullet_x = max(18, left - max(18, int(size_body * 0.60)))
+
+            # 标签胶囊区域
+            tag_font = font_manager.get_font("chinese", "regular", size=max(20, int(size_body * 0.78)))
+            pad_x = 16
+            pad_y = 8
+            pill_h = int(getattr(tag_font, "size", 28) + pad_y * 2)
+            row_gap = 10
+            col_gap = 10
+
+            rows = 0
+            if tags:
+                x = 0
+                rows = 1
+                for t in tags:
+                    bbox = draw.textbbox((0, 0), t, font=tag_font)
+                    tw = bbox[2] - bbox[0]
+                    pill_w = tw + pad_x * 2
+                    if x > 0 and x + pill_w > max_text_w:
+                        rows += 1
+                        x = 0
+                    x += pill_w + col_gap
+
+            tags_h = 0
+            tags_gap = 0
+            if rows > 0:
+                tags_h = rows * pill_h + (rows - 1) * row_gap
+                tags_gap = int(body_line_h * 0.75)
+
+            divider_h = 0
+            divider_gap = 0
+            if t_lines:
+                divider_h = 4
+                divider_gap = int(body_line_h * 0.55)
+
+            title_h = len(t_lines) * title_line_h
+            gap_title_body = int(body_line_h * 0.55) if t_lines and (body_items or tags) else 0
+            total_h = title_h + divider_h + divider_gap + gap_title_body + body_h + tags_gap + tags_h
 
-            # 如果太空，尝试略微放大（但不超过 max）
-            for _ in range(18):
-                if layout["total_h"] >= max_text_h * 0.66:
-                    break
-                next_body = min(max_body, body_size + 2)
-                next_title = min(max_title, max(title_size, next_body + 8, title_size + 2))
-                if next_body == body_size and next_title == title_size:
-                    break
-                next_layout = _layout_for(next_title, next_body)
-                if next_layout["total_h"] > max_text_h:
-                    break
-                body_size, title_size = next_body, next_title
-                layout = next_layout
+            return {
+                "font_title": font_title,
+                "font_body": font_body,
+                "font_body_bold": font_body_bold,
+                "font_tag": tag_font,
+                "title_lines": t_lines,
+                "body_items": body_items,
+                "title_line_h": title_line_h,
+                "body_line_h": body_line_h,
+                "bullet_r": bullet_r,
+                "bullet_x": bullet_x,
+                "pill_h": pill_h,
+                "pad_x": pad_x,
+                "pad_y": pad_y,
+                "row_gap": row_gap,
+                "col_gap": col_gap,
+                "divider_h": divider_h,
+                "divider_gap": divider_gap,
+                "gap_title_body": gap_title_body,
+                "tags_gap": tags_gap,
+                "tags_rows": rows,
+                "total_h": total_h,
+            }
+
+        def _shrink(sizes: Tuple[int, ...]) -> Tuple[int, ...]:
+            st, sb = sizes
+            if sb > min_body:
+                sb = max(min_body, sb - 2)
+            elif st > min_title:
+                st = max(min_title, st - 2)
+            else:
+                return sizes
+            return max(min_title, min(max_title, max(st, sb + 8))), sb
+
+        def _grow(sizes: Tuple[int, ...]) -> Tuple[int, ...]:
+            st, sb = sizes
+            nb = min(max_body, sb + 2)
+            return min(max_title, max(st, nb + 8, st + 2)), nb
+
+        solver = LayoutSolver(lambda sz: _layout_for(*sz), lambda lay: lay["total_h"])
+        hint_key = ("default", page_title, body, tuple(tags))
+        hint = layout_hints.get(hint_key) or (None, None)
+
+        # 先收缩到能放下；如果太空，再尝试略微放大（但不超过 max）
+        with render_tracer.span("layout", path="default", chars=plain_len, hinted=hint[0] is not None) as trace_args:
+            fitted = solver.first_fit(size_schedule((title_size, body_size), _shrink, 28), max_text_h, hint=hint[0])
+            solution = solver.grow(
+                size_schedule(fitted.sizes, _grow, 18),
+                max_text_h,
+                enough=max_text_h * 0.66,
+                hint=hint[1],
+            )
+            trace_args.update(
+                shrink_index=fitted.index, grow_index=solution.index, measured=solver.measured, fits=solution.fits
+            )
+        layout_hints.put(hint_key, (fitted.index, solution.index))
+        title_size, body_size = solution.sizes
+        layout = solution.layout
+        draw_trace = render_tracer.begin("draw_text", layout="default")
+
+        # 计算起始 y（略偏上居中，避免整体下坠）
+        slack = max(0, max_text_h - int(layout["total_h"]))
+        y = top + int(slack * 0.32)
+        y_start = y
+
+        # 可选：内容卡片底（白色包裹）。默认关闭，避免“包裹感”太重。
+        if show_content_card:
+            try:
+                card_pad_x = max(26, int(body_size * 1.15))
+                card_pad_y = max(22, int(body_size * 1.10))
+                card_left = max(16, left - card_pad_x)
+                card_right = min(w - 16, w - right + card_pad_x)
+                card_top = max(16, y_start - int(body_size * 1.10))
+                card_bottom = min(h - 16, y_start + int(layout["total_h"]) + int(body_size * 1.20))
+
+                radius = max(26, int(body_size * 1.20) + 18)
+                overlay = Image.new("RGBA", img.size, (0, 0, 0, 0))
+                od = ImageDraw.Draw(overlay)
+
+                shadow_alpha = 32 if not dark_bg else 48
+                od.rounded_rectangle(
+                    (card_left + 6, card_top + 8, card_right + 6, card_bottom + 8),
+                    radius=radius,
+                    fill=(0, 0, 0, shadow_alpha),
+                )
 
-            # 计算起始 y（略偏上居中，避免整体下坠）
-            slack = max(0, max_text_h - int(layout["total_h"]))
-            y = top + int(slack * 0.32)
-            y_start = y
+                fill_alpha = 212 if not dark_bg else 150
+                fill_color = (255, 255, 255, fill_alpha) if not dark_bg else (18, 18, 18, fill_alpha)
+                border_alpha = 90 if not dark_bg else 120
+                border_color = (accent[0], accent[1], accent[2], border_alpha)
+                od.rounded_rectangle(
+                    (card_left, card_top, card_right, card_bottom),
+                    radius=radius,
+                    fill=fill_color,
+                    outline=border_color,
+                    width=2,
+                )
 
-            # 可选：内容卡片底（白色包裹）。默认关闭，避免“包裹感”太重。
-            if show_content_card:
-                try:
-                    card_pad_x = max(26, int(body_size * 1.15))
-                    card_pad_y = max(22, int(body_size * 1.10))
-                    card_left = max(16, left - card_pad_x)
-                    card_right = min(w - 16, w - right + card_pad_x)
-                    card_top = max(16, y_start - int(body_size * 1.10))
-                    card_bottom = min(h - 16, y_start + int(layout["total_h"]) + int(body_size * 1.20))
-
-                    radius = max(26, int(body_size * 1.20) + 18)
-                    overlay = Image.new("RGBA", img.size, (0, 0, 0, 0))
-                    od = ImageDraw.Draw(overlay)
-
-                    shadow_alpha = 32 if not dark_bg else 48
-                    od.rounded_rectangle(
-                        (card_left + 6, card_top + 8, card_right + 6, card_bottom + 8),
-                        radius=radius,
-                        fill=(0, 0, 0, shadow_alpha),
-                    )
+                img = Image.alpha_composite(img.convert("RGBA"), overlay).convert("RGB")
+                draw = ImageDraw.Draw(img)
+            except Exception:
+                pass
 
-                    fill_alpha = 212 if not dark_bg else 150
-                    fill_color = (255, 255, 255, fill_alpha) if not dark_bg else (18, 18, 18, fill_alpha)
-                    border_alpha = 90 if not dark_bg else 120
-                    border_color = (accent[0], accent[1], accent[2], border_alpha)
-                    od.rounded_rectangle(
-                        (card_left, card_top, card_right, card_bottom),
-                        radius=radius,
-                        fill=fill_color,
-                        outline=border_color,
-                        width=2,
-                    )
+        # 绘制标题（居中）
+        if layout["title_lines"]:
+            for line in layout["title_lines"]:
+                bbox = draw.textbbox((0, 0), line, font=layout["font_title"])
+                tw = bbox[2] - bbox[0]
+                x = (w - tw) // 2
+                draw.text(
+                    (x, y),
+                    line,
+                    fill=title_fill,
+                    font=layout["font_title"],
+                    stroke_width=stroke_w_title,
+                    stroke_fill=stroke_fill,
+                )
+                y += layout["title_line_h"]
+
+            # 分割线
+            if layout["divider_h"] > 0:
+                y += int(layout["divider_gap"] * 0.45)
+                line_w = min(200, int(max_text_w * 0.28))
+                x0 = (w - line_w) // 2
+                y0 = y
+                draw.rounded_rectangle(
+                    (x0, y0, x0 + line_w, y0 + layout["divider_h"]),
+                    radius=3,
+                    fill=accent,
+                )
+                y += layout["divider_h"] + int(layout["divider_gap"] * 0.55)
+
+            y += layout["gap_title_body"]
 
-                    img = Image.alpha_composite(img.convert("RGBA"), overlay).convert("RGB")
-                    draw = ImageDraw.Draw(img)
+        # 绘制正文（左对齐）
+        bottom_limit = h - bottom
+        # 小标题更“跳”，更像小红书的要点卡片
+        if dark_bg:
+            sub_fill = (255, 255, 255)
+            sub_bg = (0, 0, 0)
+        else:
+            sub_fill = tuple(max(0, int(c * 0.85)) for c in accent)
+            sub_bg = tuple(int(c * 0.12 + 255 * 0.88) for c in accent)
+
+        dot_fill = (accent[0], accent[1], accent[2]) if not dark_bg else (235, 235, 235)
+        for it in layout["body_items"]:
+            if y > bottom_limit - 30:
+                break
+            kind = str(it.get("kind") or "")
+            ln = str(it.get("text") or "")
+            if kind == "blank":
+                y += int(layout["body_line_h"] * 0.98)
+                continue
+            para_start = bool(it.get("para_start"))
+
+            font = layout["font_body_bold"] if kind == "sub" else layout["font_body"]
+            fill = sub_fill if kind == "sub" else body_fill
+
+            if para_start and ln.strip():
+                try:
+                    cy = y + int(getattr(font, "size", 28) * 0.58)
+                    r = int(layout.get("bullet_r") or 5)
+                    bx = int(layout.get("bullet_x") or left)
+
+                    if kind == "sub":
+                        # 小标题：左侧强调条 + 轻底色
+                        bar_w = max(6, int(r * 1.4))
+                        bar_h = max(18, int(getattr(font, "size", 28) * 0.95))
+                        x0 = max(16, bx - bar_w)
+                        y0 = int(cy - bar_h * 0.55)
+                        draw.rounded_rectangle((x0, y0, x0 + bar_w, y0 + bar_h), radius=4, fill=accent)
+
+                        bbox = draw.textbbox((0, 0), ln, font=font)
+                        tw = bbox[2] - bbox[0]
+                        th = bbox[3] - bbox[1]
+                        pad_x = max(10, int(getattr(font, "size", 28) * 0.40))
+                        pad_y = max(6, int(getattr(font, "size", 28) * 0.22))
+                        bg_x0 = left - pad_x
+                        bg_y0 = y - pad_y
+                        bg_x1 = min(w - right, left + tw + pad_x)
+                        bg_y1 = y + th + pad_y
+                        draw.rounded_rectangle((bg_x0, bg_y0, bg_x1, bg_y1), radius=18, fill=sub_bg)
+                    else:
+                        draw.ellipse((bx - r, cy - r, bx + r, cy + r), fill=dot_fill)
                 except Exception:
                     pass
 
-            # 绘制标题（居中）
-            if layout["title_lines"]:
-                for line in layout["title_lines"]:
-                    bbox = draw.textbbox((0, 0), line, font=layout["font_title"])
-                    tw = bbox[2] - bbox[0]
-                    x = (w - tw) // 2
-                    draw.text(
-                        (x, y),
-                        line,
-                        fill=title_fill,
-                        font=layout["font_title"],
-                        stroke_width=stroke_w_title,
-                        stroke_fill=stroke_fill,
-                    )
-                    y += layout["title_line_h"]
-
-                # 分割线
-                if layout["divider_h"] > 0:
-                    y += int(layout["divider_gap"] * 0.45)
-                    line_w = min(200, int(max_text_w * 0.28))
-                    x0 = (w - line_w) // 2
-                    y0 = y
-                    draw.rounded_rectangle(
-                        (x0, y0, x0 + line_w, y0 + layout["divider_h"]),
-                        radius=3,
-                        fill=accent,
-                    )
-                    y += layout["divider_h"] + int(layout["divider_gap"] * 0.55)
+            draw.text(
+                (left, y),
+                ln,
+                fill=fill,
+                font=font,
+                stroke_width=stroke_w_body,
+                stroke_fill=stroke_fill,
+            )
+            y += layout["body_line_h"]
+
+        # 绘制标签胶囊（如果有）
+        if tags and layout["tags_rows"] > 0 and y < bottom_limit - layout["pill_h"]:
+            y += layout["tags_gap"]
+
+            tag_bg = (255, 255, 255) if dark_bg else (245, 246, 248)
+            tag_border = accent if not dark_bg else (220, 220, 220)
+            tag_text = (50, 50, 50) if not dark_bg else (20, 20, 20)
+
+            x = left
+            row_y = y
+            for t in tags:
+                bbox = draw.textbbox((0, 0), t, font=layout["font_tag"])
+                tw = bbox[2] - bbox[0]
+                pill_w = tw + layout["pad_x"] * 2
+                if x > left and x + pill_w > w - right:
+                    row_y += layout["pill_h"] + layout["row_gap"]
+                    x = left
+                if row_y > bottom_limit - layout["pill_h"]:
+                    break
+                rect = (x, row_y, x + pill_w, row_y + layout["pill_h"])
+                draw.rounded_rectangle(rect, radius=int(layout["pill_h"] / 2), fill=tag_bg, outline=tag_border, width=2)
+                tx = x + layout["pad_x"]
+                ty = row_y + (layout["pill_h"] - getattr(layout["font_tag"], "size", 24)) // 2 - 2
+                draw.text((tx, ty), t, fill=tag_text, font=layout["font_tag"])
+                x += pill_w + layout["col_gap"]
 
-                y += layout["gap_title_body"]
+        render_tracer.end(draw_trace)
+        return save_image(img, spec.out_path, spec.encoder)
 
-            # 绘制正文（左对齐）
-            bottom_limit = h - bottom
-            # 小标题更“跳”，更像小红书的要点卡片
-            if dark_bg:
-                sub_fill = (255, 255, 255)
-                sub_bg = (0, 0, 0)
-            else:
-                sub_fill = tuple(max(0, int(c * 0.85)) for c in accent)
-                sub_bg = tuple(int(c * 0.12 + 255 * 0.88) for c in accent)
 
-            dot_fill = (accent[0], accent[1], accent[2]) if not dark_bg else (235, 235, 235)
-            for it in layout["body_items"]:
-                if y > bottom_limit - 30:
-                    break
-                kind = str(it.get("kind") or "")
-                ln = str(it.get("text") or "")
-                if kind == "blank":
-                    y += int(layout["body_line_h"] * 0.98)
-                    continue
-                para_start = bool(it.get("para_start"))
-
-                font = layout["font_body_bold"] if kind == "sub" else layout["font_body"]
-                fill = sub_fill if kind == "sub" else body_fill
-
-                if para_start and ln.strip():
-                    try:
-                        cy = y + int(getattr(font, "size", 28) * 0.58)
-                        r = int(layout.get("bullet_r") or 5)
-                        bx = int(layout.get("bullet_x") or left)
-
-                        if kind == "sub":
-                            # 小标题：左侧强调条 + 轻底色
-                            bar_w = max(6, int(r * 1.4))
-                            bar_h = max(18, int(getattr(font, "size", 28) * 0.95))
-                            x0 = max(16, bx - bar_w)
-                            y0 = int(cy - bar_h * 0.55)
-                            draw.rounded_rectangle((x0, y0, x0 + bar_w, y0 + bar_h), radius=4, fill=accent)
-
-                            bbox = draw.textbbox((0, 0), ln, font=font)
-                            tw = bbox[2] - bbox[0]
-                            th = bbox[3] - bbox[1]
-                            pad_x = max(10, int(getattr(font, "size", 28) * 0.40))
-                            pad_y = max(6, int(getattr(font, "size", 28) * 0.22))
-                            bg_x0 = left - pad_x
-                            bg_y0 = y - pad_y
-                            bg_x1 = min(w - right, left + tw + pad_x)
-                            bg_y1 = y + th + pad_y
-                            draw.rounded_rectangle((bg_x0, bg_y0, bg_x1, bg_y1), radius=18, fill=sub_bg)
-                        else:
-                            draw.ellipse((bx - r, cy - r, bx + r, cy + r), fill=dot_fill)
-                    except Exception:
-                        pass
+system_image_template_service = SystemImageTemplateService()
 
-                draw.text(
-                    (left, y),
-                    ln,
-                    fill=fill,
-                    font=font,
-                    stroke_width=stroke_w_body,
-                    stroke_fill=stroke_fill,
-                )
-                y += layout["body_line_h"]
 
-            # 绘制标签胶囊（如果有）
-            if tags and layout["tags_rows"] > 0 and y < bottom_limit - layout["pill_h"]:
-                y += layout["tags_gap"]
+# ---------------------------------------------------------------------------
+# 多页并行渲染：进程池（惰性创建、进程内复用）
+# ---------------------------------------------------------------------------
 
-                tag_bg = (255, 255, 255) if dark_bg else (245, 246, 248)
-                tag_border = accent if not dark_bg else (220, 220, 220)
-                tag_text = (50, 50, 50) if not dark_bg else (20, 20, 20)
+_render_pool: Optional[ProcessPoolExecutor] = None
+_render_pool_lock = threading.Lock()
 
-                x = left
-                row_y = y
-                for t in tags:
-                    bbox = draw.textbbox((0, 0), t, font=layout["font_tag"])
-                    tw = bbox[2] - bbox[0]
-                    pill_w = tw + layout["pad_x"] * 2
-                    if x > left and x + pill_w > w - right:
-                        row_y += layout["pill_h"] + layout["row_gap"]
-                        x = left
-                    if row_y > bottom_limit - layout["pill_h"]:
-                        break
-                    rect = (x, row_y, x + pill_w, row_y + layout["pill_h"])
-                    draw.rounded_rectangle(rect, radius=int(layout["pill_h"] / 2), fill=tag_bg, outline=tag_border, width=2)
-                    tx = x + layout["pad_x"]
-                    ty = row_y + (layout["pill_h"] - getattr(layout["font_tag"], "size", 24)) // 2 - 2
-                    draw.text((tx, ty), t, fill=tag_text, font=layout["font_tag"])
-                    x += pill_w + layout["col_gap"]
 
-            out_path = output_dir / f"content_tpl_{idx+1}_{pack_tag}_{ts}_{unique}.jpg"
-            img.save(str(out_path), format="JPEG", quality=92)
-            content_paths.append(str(out_path))
+def _render_workers() -> int:
+    try:
+        val = int((os.environ.get("XHS_IMG_WORKERS") or "").strip() or 0)
+    except Exception:
+        val = 0
+    if val > 0:
+        return val
+    return max(1, min(8, os.cpu_count() or 2))
 
-        return str(cover_path), content_paths
 
+def _get_render_pool() -> ProcessPoolExecutor:
+    global _render_pool
+    with _render_pool_lock:
+        if _render_pool is None:
+            # spawn：不继承 Qt/浏览器线程的状态，macOS/Windows 与 Linux 行为一致
+            _render_pool = ProcessPoolExecutor(
+                max_workers=_render_workers(),
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _render_pool
 
-system_image_template_service = SystemImageTemplateService()
+
+def shutdown_render_pool() -> None:
+    """关闭渲染进程池（程序退出时调用；下次并行渲染会重新创建）。"""
+    global _render_pool
+    with _render_pool_lock:
+        pool, _render_pool = _render_pool, None
+    if pool is not None:
+        try:
+            pool.shutdown(wait=False, cancel_futures=True)
+        except Exception:
+            pass
+
+
+def _render_page_worker(spec: PageRenderSpec) -> Optional[str]:
+    return system_image_template_service.render_page(spec)
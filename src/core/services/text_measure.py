@@ -0,0 +1,364 @@
+"""
+文字测量与换行引擎
+
+海报、封面、系统模板在排版时会反复判断“这一行还能不能再放一个字”。原先的做法是逐字拼接前缀，
+每次都调用 textbbox/textlength 重新测量整行，换行复杂度是 O(n²)，并且在 fit-to-box 循环里被
+重复执行。
+
+这里按 (字体文件, index, 字号) 缓存单字的 advance 宽度：
+- 先用缓存的 advance 累加估算断行位置（线性）
+- 再用真实测量（textbbox/textlength，包含字距调整/连字等）在估算点附近校正
+  → 断行结果与逐字测量一致，但每行只需要常数次真实测量
+"""
+
+from __future__ import annotations
+
+import threading
+import weakref
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, List, Optional, Sequence
+
+WidthFn = Callable[[str], float]
+
+# 中文友好的断行标点（优先在这些字符之后断行）
+BREAK_CHARS = frozenset("，。！？；、,.!?")
+
+
+class GlyphAdvanceCache:
+    """按字体缓存单字 advance 宽度（线程安全，按字体数量做 LRU）。"""
+
+    def __init__(self, max_fonts: int = 128):
+        self.max_fonts = max(1, int(max_fonts))
+        self._fonts: "OrderedDict[Hashable, Dict[str, float]]" = OrderedDict()
+        # 没有文件路径的字体（如 ImageFont.load_default()）按对象本身缓存，字体释放后自动清理
+        self._anonymous: "weakref.WeakKeyDictionary[object, Dict[str, float]]" = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def font_key(font) -> Optional[Hashable]:
+        path = getattr(font, "path", None)
+        if not path or not isinstance(path, (str, bytes)):
+            return None
+        return (
+            str(path),
+            int(getattr(font, "index", 0) or 0),
+            float(getattr(font, "size", 0) or 0),
+            getattr(font, "layout_engine", None),
+        )
+
+    def table(self, font) -> Dict[str, float]:
+        key = self.font_key(font)
+        with self._lock:
+            if key is None:
+                try:
+                    table = self._anonymous.get(font)
+                    if table is None:
+                        table = {}
+                        self._anonymous[font] = table
+                    return table
+                except TypeError:
+                    return {}
+
+            table = self._fonts.get(key)
+            if table is None:
+                table = {}
+                self._fonts[key] = table
+                while len(self._fonts) > self.max_fonts:
+                    self._fonts.popitem(last=False)
+            else:
+                self._fonts.move_to_end(key)
+            return table
+
+    @staticmethod
+    def measure_char(font, ch: str) -> float:
+        if ch in "\r\n":
+            return 0.0
+        try:
+            return float(font.getlength(ch))
+        except Exception:
+            pass
+        try:
+            bbox = font.getbbox(ch)
+            return float(bbox[2] - bbox[0])
+        except Exception:
+            return 0.0
+
+    def clear(self) -> None:
+        with self._lock:
+            self._fonts.clear()
+            self._anonymous = weakref.WeakKeyDictionary()
+
+
+glyph_advance_cache = GlyphAdvanceCache()
+
+
+class WrapCache:
+    """
+    换行结果缓存：按 (换行方式, 文本, 字体, 最大宽度) 记录断行结果（线程安全，LRU）。
+
+    fit-to-box 搜索会在相邻字号之间来回测量，同一段文字在同一字号/宽度下的换行结果完全相同。
+    没有文件路径的字体不缓存。
+    """
+
+    def __init__(self, max_entries: int = 8192):
+        self.max_entries = max(1, int(max_entries))
+        self._lines: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, kind: str, text: str, font, max_width: float, wrap: Callable[[], List[str]]) -> List[str]:
+        fkey = GlyphAdvanceCache.font_key(font)
+        if fkey is None:
+            return wrap()
+        key = (kind, text, fkey, float(max_width))
+        with self._lock:
+            lines = self._lines.get(key)
+            if lines is not None:
+                self._lines.move_to_end(key)
+                self.hits += 1
+                return list(lines)
+            self.misses += 1
+
+        lines = tuple(wrap())
+        with self._lock:
+            self._lines[key] = lines
+            while len(self._lines) > self.max_entries:
+                self._lines.popitem(last=False)
+        return list(lines)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._lines.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+wrap_cache = WrapCache()
+
+
+def _default_exact(font) -> WidthFn:
+    def _width(text: str) -> float:
+        try:
+            return float(font.getlength(text))
+        except Exception:
+            bbox = font.getbbox(text)
+            return float(bbox[2] - bbox[0])
+
+    return _width
+
+
+class TextMeasurer:
+    """
+    单个字体的测量器。
+
+    exact: 真实测量函数（默认 font.getlength）。需要与旧逻辑保持一致时可传入
+           `lambda s: draw.textbbox((0, 0), s, font=font)[2] - ...` 之类的函数。
+    """
+
+    def __init__(self, font, *, exact: Optional[WidthFn] = None, cache: Optional[GlyphAdvanceCache] = None):
+        self.font = font
+        self.cache = cache or glyph_advance_cache
+        self._exact = exact or _default_exact(font)
+        self._advances = self.cache.table(font)
+
+    def advance(self, ch: str) -> float:
+        w = self._advances.get(ch)
+        if w is None:
+            w = GlyphAdvanceCache.measure_char(self.font, ch)
+            self._advances[ch] = w
+        return w
+
+    def estimate(self, text: str) -> float:
+        """按缓存的单字 advance 累加估算宽度（不含字距调整）。"""
+        advances = self._advances
+        total = 0.0
+        for ch in text:
+            w = advances.get(ch)
+            if w is None:
+                w = GlyphAdvanceCache.measure_char(self.font, ch)
+                advances[ch] = w
+            total += w
+        return total
+
+    def width(self, text: str) -> float:
+        """真实宽度。"""
+        if not text:
+            return 0.0
+        return float(self._exact(text))
+
+    def fit(self, units: Sequence[str], start: int, max_width: float, *, sep: str = "", suffix: str = "") -> int:
+        """
+        返回最大的 end，使 `sep.join(units[start:end]) + suffix` 的真实宽度不超过 max_width。
+
+        即使第一个单元本身就放不下，也至少返回 start + 1（与逐字换行“至少放一个字”的行为一致）。
+        """
+        n = len(units)
+        if start >= n:
+            return start
+
+        budget = float(max_width) - self.estimate(suffix)
+        sep_w = self.estimate(sep) if sep else 0.0
+
+        end = start
+        total = 0.0
+        while end < n:
+            w = self.estimate(units[end]) + (sep_w if end > start else 0.0)
+            if end > start and total + w > budget:
+                break
+            total += w
+            end += 1
+
+        def _fits(e: int) -> bool:
+            return self.width(sep.join(units[start:e]) + suffix) <= max_width
+
+        # 估算值没有计入字距调整：在估算点附近用真实测量校正
+        if _fits(end):
+            while end < n and _fits(end + 1):
+                end += 1
+            return end
+        while end > start + 1:
+            end -= 1
+            if _fits(end):
+                break
+        return end
+
+
+def wrap_chars(text: str, font, max_width: float, *, exact: Optional[WidthFn] = None) -> List[str]:
+    """逐字贪心换行（单段文本）。"""
+    if not text:
+        return []
+    m = TextMeasurer(font, exact=exact)
+    chars = list(text)
+    lines: List[str] = []
+    pos = 0
+    while pos < len(chars):
+        end = m.fit(chars, pos, max_width)
+        lines.append(text[pos:end])
+        pos = end
+    return lines
+
+
+def wrap_words(text: str, font, max_width: float, *, exact: Optional[WidthFn] = None) -> List[str]:
+    """
+    段落换行：按换行符分段（空段保留为空行）；含空格的段落按单词断行，
+    单个单词超宽时再逐字拆分；其余按字断行。
+    """
+    m = TextMeasurer(font, exact=exact)
+    lines: List[str] = []
+    for para in (text or "").split("\n"):
+        if not para:
+            lines.append("")
+            continue
+
+        if " " not in para:
+            chars = list(para)
+            pos = 0
+            while pos < len(chars):
+                end = m.fit(chars, pos, max_width)
+                lines.append(para[pos:end])
+                pos = end
+            continue
+
+        tokens = para.split(" ")
+        pos = 0
+        line_empty = True
+        while pos < len(tokens):
+            if line_empty:
+                # 行内还没有内容时，连续空格产生的空单词直接吞掉
+                while pos < len(tokens) and not tokens[pos]:
+                    pos += 1
+                if pos >= len(tokens):
+                    break
+                if m.width(tokens[pos]) > max_width:
+                    # 单词本身超宽：逐字拆开，最后一段继续与后续单词拼接
+                    frags = wrap_chars(tokens[pos], font, max_width, exact=exact)
+                    lines.extend(frags[:-1])
+                    tokens[pos] = frags[-1]
+            end = m.fit(tokens, pos, max_width, sep=" ")
+            lines.append(" ".join(tokens[pos:end]))
+            pos = end
+            line_empty = pos < len(tokens) and not tokens[pos]
+    return lines
+
+
+def smart_wrap(
+    text: str,
+    font,
+    max_width: float,
+    *,
+    exact: Optional[WidthFn] = None,
+    break_chars: frozenset = BREAK_CHARS,
+) -> List[str]:
+    """
+    中文友好的逐字换行：
+    - 超宽时若上一字是标点则直接断行；否则回退到 10 字以内最近的标点处断行
+    - 行首标点合并到上一行，避免“。”独占一行
+    """
+    text = (text or "").strip()
+    if not text:
+        return []
+
+    m = TextMeasurer(font, exact=exact)
+    chars = list(text)
+    n = len(chars)
+    lines: List[str] = []
+    pos = 0
+    while pos < n:
+        end = m.fit(chars, pos, max_width)
+        if end >= n:
+            lines.append(text[pos:])
+            break
+
+        current = text[pos:end]
+        if text[end - 1] in break_chars:
+            lines.append(current)
+            pos = end
+            continue
+
+        last_break = -1
+        for j in range(len(current) - 1, -1, -1):
+            if current[j] in break_chars:
+                last_break = j
+                break
+        if last_break > 0 and len(current) - last_break < 10:
+            lines.append(current[: last_break + 1])
+            pos += last_break + 1
+        else:
+            lines.append(current)
+            pos = end
+
+    if len(lines) >= 2:
+        fixed: List[str] = []
+        for ln in lines:
+            if not fixed:
+                fixed.append(ln)
+                continue
+            s = str(ln or "")
+            if not s:
+                fixed.append(s)
+                continue
+
+            moved = ""
+            while s and s[0] in break_chars:
+                moved += s[0]
+                s = s[1:]
+            if moved:
+                fixed[-1] = (fixed[-1] or "") + moved
+                if s:
+                    fixed.append(s)
+                continue
+
+            fixed.append(s)
+        lines = fixed
+
+    return lines
+
+
+def clip_with_suffix(text: str, font, max_width: float, *, suffix: str = "…", exact: Optional[WidthFn] = None) -> str:
+    """截断到 `text[:k] + suffix` 能放进 max_width 的最长前缀（至少保留 1 个字）。"""
+    if not text:
+        return suffix
+    m = TextMeasurer(font, exact=exact)
+    end = m.fit(list(text), 0, max_width, suffix=suffix)
+    return text[:end] + suffix
@@ -21,6 +21,7 @@ from core.content_manager import ContentManager, ContentItem
 from core.session_manager import SessionManager
 from core.logger import logger
 from core.config import config
+from core.services.llm_telemetry import llm_telemetry
 
 app = FastAPI(
     title="小红书AI发布器",
@@ -529,6 +530,21 @@ async def delete_session(session_id: str):
         logger.error(f"删除会话失败: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"删除会话失败: {str(e)}")
 
+@app.get("/api/llm/telemetry")
+async def get_llm_telemetry(since_hours: Optional[float] = 24):
+    """大模型调用统计：按 provider/模型汇总延迟分位数、TTFB、token 用量、错误/超时与 JSON 解析失败率"""
+    try:
+        since_seconds = float(since_hours) * 3600 if since_hours and since_hours > 0 else None
+        summary = await asyncio.to_thread(llm_telemetry.summary, since_seconds)
+        return {
+            'success': True,
+            'data': summary
+        }
+
+    except Exception as e:
+        logger.error(f"获取模型调用统计失败: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"获取模型调用统计失败: {str(e)}")
+
 @app.on_event("startup")
 async def startup_event():
     """应用启动时初始化管理器"""
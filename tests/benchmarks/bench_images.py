@@ -0,0 +1,456 @@
+#!/usr/bin/env python3
+"""
+图片生成基准测试
+
+用固定语料跑一遍各个出图入口，输出耗时、峰值内存与分阶段耗时，并可保存为 JSON 基线供不同提交之间对比。
+
+覆盖：
+- SystemImageTemplateService.generate_post_images（短/中/超长正文；分规划、封面、内容页、整篇）
+- SystemImageTemplateService._smart_wrap（短/中/超长中文；首次换行与缓存命中）
+- MarketingPosterService.generate
+- EnhancedCoverService.create_cover_image
+- CoverTemplateService.generate_from_template
+
+每个用例在独立子进程中运行（峰值 RSS 互不影响），子进程使用临时 HOME 与合成的模板包背景，
+并关闭渲染结果缓存 / 图片库 / 多进程渲染，保证每次测量的都是实际渲染。
+
+用法（在项目根目录）：
+    python tests/benchmarks/bench_images.py                          # 跑全部用例并打印结果
+    python tests/benchmarks/bench_images.py --out baseline.json      # 保存基线
+    python tests/benchmarks/bench_images.py --compare baseline.json  # 与基线对比（回归时退出码为 1）
+    python tests/benchmarks/bench_images.py --case post_long --repeat 5
+    python tests/benchmarks/bench_images.py --trace                  # 附带背景/字体/排版/绘制/编码各阶段耗时
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+
+# ---------------------------------------------------------------------------
+# 固定语料（不要随意修改：改动语料会让历史基线失去可比性）
+# ---------------------------------------------------------------------------
+
+_SENTENCES = [
+    "今天分享一个超实用的效率方法，新手也能马上上手。",
+    "第一步先把目标拆小，每天只专注完成一件最重要的事情。",
+    "记录每一次的复盘结果，坚持三十天就能看到明显的变化！",
+    "工具推荐：Notion、滴答清单和 Python 脚本，按需组合使用。",
+    "很多人卡在开始这一步，其实先做起来比想清楚更重要；",
+    "收藏这篇笔记，下次遇到同样的问题直接照着做就可以了。",
+]
+
+
+def _paragraphs(count: int, per_paragraph: int) -> str:
+    parts = []
+    for i in range(count):
+        parts.append("".join(_SENTENCES[(i + j) % len(_SENTENCES)] for j in range(per_paragraph)))
+    return "\n\n".join(parts)
+
+
+CORPUS: Dict[str, Dict[str, str]] = {
+    "short": {
+        "title": "三个习惯让效率翻倍",
+        "content": _SENTENCES[0] + _SENTENCES[1],
+    },
+    "medium": {
+        "title": "新手做自媒体的第一个月：我踩过的坑和总结",
+        "content": "\n".join(f"{i + 1}. {_SENTENCES[i % len(_SENTENCES)]}" for i in range(6)) + "\n\n" + _paragraphs(2, 3),
+    },
+    "long": {
+        "title": "一篇讲透：从零开始搭建个人知识管理系统的完整流程与工具清单",
+        "content": _paragraphs(12, 6),
+    },
+}
+
+MARKETING_CONTENT = {
+    "title": "21 天效率训练营",
+    "subtitle": "从拖延到自律的系统方法",
+    "price": "99",
+    "keyword": "训练营",
+    "cover_bullets": ["每日任务打卡", "一对一答疑", "可复用模板"],
+    "outline_items": [f"第 {i} 周：{_SENTENCES[i % len(_SENTENCES)][:12]}" for i in range(1, 9)],
+    "highlights": [{"title": f"亮点 {i}", "desc": _SENTENCES[i % len(_SENTENCES)]} for i in range(4)],
+    "delivery_steps": ["下单购买", "加入社群", "开始打卡"],
+    "pain_points": ["不知道从哪开始", "信息太碎不好整理", "做完效果不稳定", "缺少可复用模板"],
+}
+
+COVER_TEXT = {
+    "main_title": CORPUS["medium"]["title"],
+    "subtitle": _SENTENCES[2],
+    "tags": ["效率", "自媒体", "干货"],
+    "emojis": ["✨", "🔥"],
+}
+
+COVER_TEMPLATE = {
+    "id": "bench",
+    "name": "基准模板",
+    "size": [1080, 1440],
+    "bg_gradient": ["#FDEFF4", "#E3F2FD"],
+    "text_config": {
+        "main_title": {"font_size": 88, "pos": [80, 300], "max_width": 920, "color": "#222222", "text_align": "center"},
+        "subtitle": {"font_size": 48, "pos": [80, 720], "max_width": 920, "color": "#555555", "text_align": "center"},
+        "tags": {"font_size": 36, "pos": [80, 1200], "spacing": 20},
+    },
+    "elements": {
+        "dot": {"type": "circle", "pos": [900, 120], "size": [80, 80], "color": "#FF6B9D", "opacity": 0.6},
+        "frame": {"type": "rectangle", "pos": [40, 40], "size": [1000, 1360], "color": "#FFFFFF", "width": 4, "radius": 24},
+    },
+}
+
+
+# ---------------------------------------------------------------------------
+# 计时
+# ---------------------------------------------------------------------------
+
+
+class StageTimer:
+    """按阶段名累计耗时（秒）。"""
+
+    def __init__(self):
+        self.stages: Dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - start
+
+
+def _peak_rss_mb() -> Optional[float]:
+    """当前进程的峰值常驻内存（MB）；平台不支持时返回 None。"""
+    try:
+        import resource
+
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux 单位为 KB，macOS 为字节
+        return round(peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024, 1)
+    except Exception:
+        return None
+
+
+# ---------------------------------------------------------------------------
+# 用例（在子进程中执行）
+# ---------------------------------------------------------------------------
+
+
+def _make_template_pack(base_dir: Path) -> Path:
+    """合成一个 3 页的系统模板包（content_bench_pageN.png），让背景解码/缩放也计入耗时。"""
+    from PIL import Image, ImageDraw
+
+    pack_dir = base_dir / "system_templates"
+    pack_dir.mkdir(parents=True, exist_ok=True)
+    colors = [((253, 239, 244), (227, 242, 253)), ((255, 248, 225), (232, 245, 233)), ((237, 231, 246), (255, 243, 224))]
+    for page, (top, bottom) in enumerate(colors, start=1):
+        img = Image.new("RGB", (1242, 1660), top)
+        draw = ImageDraw.Draw(img)
+        for y in range(0, 1660, 4):
+            t = y / 1660
+            color = tuple(int(top[i] + (bottom[i] - top[i]) * t) for i in range(3))
+            draw.rectangle([0, y, 1242, y + 4], fill=color)
+        img.save(pack_dir / f"content_bench_page{page}.png")
+    return pack_dir
+
+
+def _case_post(corpus_key: str) -> Callable[[StageTimer, Path], None]:
+    def run(timer: StageTimer, work_dir: Path) -> None:
+        from src.core.services.system_image_template_service import SystemImageTemplateService
+
+        svc = SystemImageTemplateService()
+        text = CORPUS[corpus_key]
+        with timer.stage("plan"):
+            specs = svc._plan_post_pages(text["title"], text["content"], pack_id="content_bench", page_count=3)
+        with timer.stage("render_cover"):
+            svc.render_page(specs[0])
+        with timer.stage("render_content"):
+            for spec in specs[1:]:
+                svc.render_page(spec)
+        with timer.stage("generate_post_images"):
+            result = svc.generate_post_images(
+                text["title"], text["content"], pack_id="content_bench", page_count=3, parallel=False, use_cache=False
+            )
+        if not result:
+            raise RuntimeError("generate_post_images 未返回结果")
+
+    return run
+
+
+def _case_smart_wrap(corpus_key: str) -> Callable[[StageTimer, Path], None]:
+    def run(timer: StageTimer, work_dir: Path) -> None:
+        from PIL import Image, ImageDraw
+
+        from src.core.services.font_manager import font_manager
+        from src.core.services.system_image_template_service import SystemImageTemplateService
+        from src.core.services.text_measure import wrap_cache
+
+        draw = ImageDraw.Draw(Image.new("RGB", (8, 8)))
+        font = font_manager.get_font("chinese", "regular", size=40)
+        text = CORPUS[corpus_key]["content"]
+        wrap_cache.clear()
+        with timer.stage("wrap"):
+            SystemImageTemplateService._smart_wrap(text, draw, font, 900)
+        with timer.stage("wrap_cached"):
+            SystemImageTemplateService._smart_wrap(text, draw, font, 900)
+
+    return run
+
+
+def _case_marketing(timer: StageTimer, work_dir: Path) -> None:
+    from src.core.services.marketing_poster_service import MarketingPosterService
+
+    svc = MarketingPosterService()
+    with timer.stage("generate"):
+        svc.generate(dict(MARKETING_CONTENT), out_dir=work_dir / "marketing")
+
+
+def _case_enhanced_cover(timer: StageTimer, work_dir: Path) -> None:
+    from src.core.services.enhanced_cover_service import EnhancedCoverService
+
+    svc = EnhancedCoverService()
+    config = svc.get_template_config("fashion")
+    bg_path = work_dir / "system_templates" / "content_bench_page1.png"
+    with timer.stage("plain_bg"):
+        svc.create_cover_image(dict(COVER_TEXT), config, output_path=str(work_dir / "enhanced_plain.png"))
+    with timer.stage("image_bg"):
+        svc.create_cover_image(
+            dict(COVER_TEXT), config, bg_image_path=str(bg_path), output_path=str(work_dir / "enhanced_bg.png")
+        )
+
+
+def _case_cover_template(timer: StageTimer, work_dir: Path) -> None:
+    from src.core.services.cover_template_service import CoverTemplateService
+
+    svc = CoverTemplateService()
+    with timer.stage("generate_from_template"):
+        result = svc.generate_from_template(dict(COVER_TEMPLATE), dict(COVER_TEXT), output_dir=str(work_dir / "covers"))
+    if not result or not result.get("cover_path"):
+        raise RuntimeError("generate_from_template 未返回结果")
+
+
+CASES: Dict[str, Callable[[StageTimer, Path], None]] = {
+    "post_short": _case_post("short"),
+    "post_medium": _case_post("medium"),
+    "post_long": _case_post("long"),
+    "smart_wrap_short": _case_smart_wrap("short"),
+    "smart_wrap_medium": _case_smart_wrap("medium"),
+    "smart_wrap_long": _case_smart_wrap("long"),
+    "marketing_poster": _case_marketing,
+    "enhanced_cover": _case_enhanced_cover,
+    "cover_template": _case_cover_template,
+}
+
+
+def _summarize(samples: List[float]) -> Dict[str, float]:
+    return {
+        "first": round(samples[0], 4),
+        "min": round(min(samples), 4),
+        "median": round(statistics.median(samples), 4),
+        "max": round(max(samples), 4),
+    }
+
+
+def run_case_in_process(name: str, repeat: int, work_dir: Path) -> Dict:
+    """在当前进程中执行用例 repeat 次；首次运行包含字体加载等冷启动开销（见 first）。"""
+    sys.path.insert(0, str(PROJECT_ROOT))
+    _make_template_pack(work_dir)
+
+    case = CASES[name]
+    walls: List[float] = []
+    stages: Dict[str, List[float]] = {}
+    for _ in range(max(1, repeat)):
+        timer = StageTimer()
+        start = time.perf_counter()
+        case(timer, work_dir)
+        walls.append(time.perf_counter() - start)
+        for stage, seconds in timer.stages.items():
+            stages.setdefault(stage, []).append(seconds)
+
+    result = {
+        "wall": _summarize(walls),
+        "stages": {stage: _summarize(samples) for stage, samples in stages.items()},
+        "peak_rss_mb": _peak_rss_mb(),
+        "repeat": len(walls),
+    }
+    trace_file = os.environ.get("XHS_IMG_TRACE_FILE") or ""
+    if trace_file and os.path.exists(trace_file):
+        result["trace_stages"] = _trace_totals(trace_file, len(walls))
+    return result
+
+
+def _trace_totals(path: str, runs: int) -> Dict[str, float]:
+    """按 span 名汇总 XHS_IMG_TRACE 记录的耗时（每次运行的平均秒数；嵌套 span 各自计入）。"""
+    from src.core.services.render_trace import load_trace
+
+    totals: Dict[str, float] = {}
+    for event in load_trace(path):
+        if event.get("ph") == "X":
+            totals[event["name"]] = totals.get(event["name"], 0.0) + float(event.get("dur") or 0) / 1e6
+    return {name: round(seconds / max(1, runs), 4) for name, seconds in sorted(totals.items())}
+
+
+def _child_env(work_dir: Path, trace: bool = False) -> Dict[str, str]:
+    env = dict(os.environ)
+    env.pop("XHS_IMG_TRACE", None)
+    if trace:
+        env.update({"XHS_IMG_TRACE": "true", "XHS_IMG_TRACE_FILE": str(work_dir / "render_trace.json")})
+    env.update(
+        {
+            "HOME": str(work_dir),
+            "USERPROFILE": str(work_dir),
+            "XHS_SYSTEM_TEMPLATES_DIR": str(work_dir / "system_templates"),
+            "XHS_IMG_RENDER_CACHE": "false",
+            "XHS_IMAGE_STORE": "false",
+            "XHS_IMG_PARALLEL": "false",
+            "PYTHONDONTWRITEBYTECODE": "1",
+        }
+    )
+    return env
+
+
+def run_case(name: str, repeat: int, trace: bool = False) -> Dict:
+    """
+    在独立子进程中执行一个用例，返回结果字典（失败时含 error）。
+
+    trace=True 时子进程打开 XHS_IMG_TRACE，结果中附带按出图阶段（背景/字体/排版/绘制/编码）汇总的耗时。
+    """
+    with tempfile.TemporaryDirectory(prefix="xhs_bench_") as tmp:
+        work_dir = Path(tmp)
+        cmd = [sys.executable, str(Path(__file__).resolve()), "--child", name, "--repeat", str(repeat), "--work-dir", tmp]
+        proc = subprocess.run(cmd, cwd=str(PROJECT_ROOT), env=_child_env(work_dir, trace), capture_output=True, text=True)
+        lines = [line for line in (proc.stdout or "").splitlines() if line.startswith("{")]
+        if proc.returncode != 0 or not lines:
+            tail = (proc.stderr or proc.stdout or "").strip().splitlines()[-5:]
+            return {"error": "\n".join(tail) or f"exit code {proc.returncode}"}
+        return json.loads(lines[-1])
+
+
+# ---------------------------------------------------------------------------
+# 报告与对比
+# ---------------------------------------------------------------------------
+
+
+def _git_revision() -> str:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=str(PROJECT_ROOT), capture_output=True, text=True, timeout=10
+        )
+        return out.stdout.strip()
+    except Exception:
+        return ""
+
+
+def print_report(report: Dict) -> None:
+    print(f"📊 图片生成基准（{report['meta']['revision'] or '未知版本'}，每个用例 {report['meta']['repeat']} 次）")
+    print(f"{'用例':<20}{'中位耗时(s)':>12}{'首次(s)':>10}{'峰值RSS(MB)':>13}")
+    for name, result in report["cases"].items():
+        if "error" in result:
+            print(f"{name:<20}  ❌ {result['error'].splitlines()[-1]}")
+            continue
+        rss = result.get("peak_rss_mb")
+        rss_text = f"{rss:.1f}" if rss is not None else "-"
+        print(f"{name:<20}{result['wall']['median']:>12.3f}{result['wall']['first']:>10.3f}{rss_text:>13}")
+        for stage, summary in result["stages"].items():
+            print(f"  └ {stage:<24}{summary['median']:>10.3f}")
+        for stage, seconds in result.get("trace_stages", {}).items():
+            print(f"  · {stage:<24}{seconds:>10.3f}")
+
+
+def compare_reports(baseline: Dict, current: Dict, threshold: float, min_delta: float = 0.005) -> List[str]:
+    """
+    逐用例/阶段对比中位耗时与峰值 RSS，返回超过阈值（比例）的回归说明。
+
+    耗时变化的绝对值小于 min_delta 秒时不计入回归（毫秒级阶段的抖动比例很大）。
+    """
+    regressions: List[str] = []
+
+    def _check(label: str, old: Optional[float], new: Optional[float], unit: str) -> None:
+        if not old or new is None:
+            return
+        delta = (new - old) / old
+        significant = abs(new - old) >= min_delta if unit == "s" else True
+        regressed = significant and delta > threshold
+        mark = "🔺" if regressed else ("🔻" if significant and delta < -threshold else "  ")
+        print(f"{mark} {label:<44}{old:>10.3f}{new:>10.3f}{delta:>+9.1%} {unit}")
+        if regressed:
+            regressions.append(f"{label}: {old:.3f} -> {new:.3f} {unit} ({delta:+.1%})")
+
+    print(f"\n📈 对比基线 {baseline.get('meta', {}).get('revision') or ''}（阈值 {threshold:.0%}）")
+    print(f"   {'指标':<44}{'基线':>10}{'当前':>10}{'变化':>9}")
+    for name, result in current["cases"].items():
+        old = baseline.get("cases", {}).get(name)
+        if not old or "error" in old or "error" in result:
+            continue
+        _check(f"{name} wall", old["wall"]["median"], result["wall"]["median"], "s")
+        for stage, summary in result["stages"].items():
+            old_stage = old.get("stages", {}).get(stage)
+            if old_stage:
+                _check(f"{name} / {stage}", old_stage["median"], summary["median"], "s")
+        _check(f"{name} peak_rss", old.get("peak_rss_mb"), result.get("peak_rss_mb"), "MB")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="图片生成基准测试")
+    parser.add_argument("--case", action="append", choices=sorted(CASES), help="只运行指定用例（可重复）")
+    parser.add_argument("--repeat", type=int, default=3, help="每个用例的运行次数（默认 3）")
+    parser.add_argument("--out", help="把结果写入 JSON 文件（作为基线）")
+    parser.add_argument("--compare", help="与之前保存的 JSON 基线对比")
+    parser.add_argument("--threshold", type=float, default=0.15, help="对比时判定为回归的比例（默认 0.15）")
+    parser.add_argument("--min-delta", type=float, default=0.005, help="对比时忽略小于该秒数的耗时变化（默认 0.005）")
+    parser.add_argument("--trace", action="store_true", help="同时按出图阶段汇总耗时（XHS_IMG_TRACE）")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--work-dir", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        result = run_case_in_process(args.child, args.repeat, Path(args.work_dir or tempfile.mkdtemp()))
+        print(json.dumps(result, ensure_ascii=False))
+        return 0
+
+    names = args.case or list(CASES)
+    report = {
+        "meta": {
+            "revision": _git_revision(),
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "repeat": args.repeat,
+        },
+        "cases": {},
+    }
+    for name in names:
+        print(f"⏱️  {name} ...", flush=True)
+        report["cases"][name] = run_case(name, args.repeat, trace=args.trace)
+
+    print_report(report)
+
+    if args.out:
+        Path(args.out).write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"\n💾 结果已保存: {args.out}")
+
+    failed = any("error" in r for r in report["cases"].values())
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding="utf-8"))
+        regressions = compare_reports(baseline, report, args.threshold, args.min_delta)
+        if regressions:
+            print(f"\n⚠️  发现 {len(regressions)} 项回归")
+            return 1
+        print("\n✅ 未发现回归")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,37 @@
+"""
+图片生成基准脚本的自检（对比逻辑 + 最小用例冒烟）
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+import bench_images  # noqa: E402
+
+
+def _report(wall: float, stage: float, rss: float) -> dict:
+    summary = lambda v: {"first": v, "min": v, "median": v, "max": v}  # noqa: E731
+    return {"meta": {}, "cases": {"post_short": {"wall": summary(wall), "stages": {"render": summary(stage)}, "peak_rss_mb": rss}}}
+
+
+@pytest.mark.unit
+def test_compare_reports_flags_regressions_above_threshold():
+    baseline = _report(1.0, 0.002, 100.0)
+    current = _report(1.3, 0.004, 105.0)
+
+    regressions = bench_images.compare_reports(baseline, current, threshold=0.15)
+
+    # 毫秒级阶段翻倍低于 min_delta 不算回归；内存 +5% 未超过阈值
+    assert regressions == ["post_short wall: 1.000 -> 1.300 s (+30.0%)"]
+
+
+@pytest.mark.slow
+def test_run_case_in_subprocess():
+    result = bench_images.run_case("smart_wrap_short", repeat=1)
+
+    assert "error" not in result, result.get("error")
+    assert set(result["stages"]) == {"wrap", "wrap_cached"}
+    assert result["wall"]["median"] > 0
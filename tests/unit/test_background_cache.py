@@ -0,0 +1,62 @@
+import os
+
+import pytest
+from PIL import Image
+
+from src.core.services.background_cache import BackgroundCache
+
+
+def _build_counter(calls):
+    def build(path, size):
+        calls.append((os.path.basename(path), size))
+        with Image.open(path) as im:
+            return im.convert("RGB").resize(size)
+
+    return build
+
+
+@pytest.mark.unit
+def test_background_decoded_once_and_invalidated_by_mtime(tmp_path):
+    path = tmp_path / "page1.png"
+    Image.new("RGB", (40, 60), (200, 10, 10)).save(path)
+    cache = BackgroundCache(max_bytes=10 * 1024 * 1024)
+    calls = []
+    build = _build_counter(calls)
+
+    first = cache.get(str(path), (20, 30), build)
+    first.paste((0, 0, 0), (0, 0, 20, 30))  # 调用方在副本上绘制，不影响缓存
+    second = cache.get(str(path), (20, 30), build)
+    assert second.getpixel((0, 0)) == (200, 10, 10)
+    assert len(calls) == 1
+
+    cache.get(str(path), (10, 15), build)
+    assert len(calls) == 2  # 目标尺寸不同是不同条目
+
+    Image.new("RGB", (40, 60), (10, 200, 10)).save(path)
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    assert cache.get(str(path), (20, 30), build).getpixel((0, 0)) == (10, 200, 10)
+    assert len(calls) == 3
+
+
+@pytest.mark.unit
+def test_background_cache_evicts_least_recently_used_by_bytes(tmp_path):
+    paths = []
+    for i in range(3):
+        p = tmp_path / f"bg{i}.png"
+        Image.new("RGB", (10, 10), (i, i, i)).save(p)
+        paths.append(str(p))
+    cache = BackgroundCache(max_bytes=2 * 10 * 10 * 3)
+    calls = []
+    build = _build_counter(calls)
+
+    cache.get(paths[0], (10, 10), build)
+    cache.get(paths[1], (10, 10), build)
+    cache.get(paths[0], (10, 10), build)  # bg0 变为最近使用
+    cache.get(paths[2], (10, 10), build)  # 超出预算，淘汰 bg1
+
+    assert len(cache) == 2 and cache.size_bytes == 600
+    calls.clear()
+    cache.get(paths[0], (10, 10), build)
+    cache.get(paths[1], (10, 10), build)
+    assert [c[0] for c in calls] == ["bg1.png"]
@@ -0,0 +1,130 @@
+import asyncio
+import sys
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from src.core import browser
+from src.core.browser import BrowserThread
+from src.core.scheduler.publish_executor import PublishExecutor
+
+
+class _FakeUserService:
+    def get_user_by_phone(self, phone):
+        return SimpleNamespace(id=7, phone=phone)
+
+    def switch_user(self, user_id):
+        pass
+
+    def update_login_status(self, user_id, ok):
+        pass
+
+
+class _FakeEnvService:
+    def get_default_environment(self, user_id):
+        return None
+
+    def create_preset_environments(self, user_id):
+        pass
+
+
+def _make_thread(monkeypatch, log):
+    monkeypatch.setitem(sys.modules, "src.core.services.user_service", SimpleNamespace(user_service=_FakeUserService()))
+    monkeypatch.setitem(
+        sys.modules,
+        "src.core.services.browser_environment_service",
+        SimpleNamespace(browser_environment_service=_FakeEnvService()),
+    )
+
+    class FakePoster:
+        def __init__(self, user_id=None, browser_environment=None):
+            self.user_id = user_id
+
+        async def initialize(self):
+            pass
+
+        async def login(self, phone, country_code="+86"):
+            log.append(("login", phone))
+
+        async def post_article(self, title, content, images, auto_publish=False):
+            log.append(("preview", title))
+
+        async def close(self, force=False):
+            pass
+
+    monkeypatch.setattr(browser, "XiaohongshuPoster", FakePoster)
+
+    async def fake_publish(action):
+        log.append(("publish", action["task_id"]))
+
+    thread = BrowserThread()
+    # 并发上限 1：定时发布按提交顺序逐个开始，便于断言顺序
+    thread.publish_executor = PublishExecutor(fake_publish, max_concurrency=1)
+    return thread
+
+
+async def _run_until(thread, predicate, timeout=2.0):
+    thread.loop = asyncio.get_running_loop()
+    runner = asyncio.ensure_future(thread.async_run())
+    deadline = time.monotonic() + timeout
+    while not predicate() and time.monotonic() < deadline:
+        await asyncio.sleep(0.01)
+    thread.stop()
+    await asyncio.wait_for(runner, timeout)
+
+
+@pytest.mark.unit
+def test_actions_enqueued_before_start_run_by_priority_then_fifo(monkeypatch):
+    log = []
+    thread = _make_thread(monkeypatch, log)
+
+    # 循环启动前提交：先暂存，启动后一并进入优先队列
+    thread.enqueue_action({"type": "scheduled_publish", "task_id": "p1", "user_id": 1})
+    thread.enqueue_action({"type": "scheduled_publish", "task_id": "p2", "user_id": 2})
+    thread.enqueue_action({"type": "login", "phone": "13800000000"})
+    thread.enqueue_action({"type": "preview", "title": "草稿", "content": "正文", "images": []})
+    thread.enqueue_action({"type": "scheduled_publish", "task_id": "p3", "user_id": 3})
+
+    asyncio.run(_run_until(thread, lambda: len(log) >= 5))
+
+    # 登录/预览插到已排队的定时发布之前；同优先级保持提交顺序
+    assert log == [
+        ("login", "13800000000"),
+        ("preview", "草稿"),
+        ("publish", "p1"),
+        ("publish", "p2"),
+        ("publish", "p3"),
+    ]
+
+
+@pytest.mark.unit
+def test_stop_wakes_loop_blocked_on_empty_queue(monkeypatch):
+    log = []
+    thread = _make_thread(monkeypatch, log)
+
+    async def main():
+        thread.loop = asyncio.get_running_loop()
+        runner = asyncio.ensure_future(thread.async_run())
+        await asyncio.sleep(0.05)
+        assert not runner.done()  # 空闲时阻塞在 queue.get() 上
+
+        # 运行中从其它线程提交动作：经 call_soon_threadsafe 立即唤醒
+        threading.Thread(
+            target=thread.enqueue_action,
+            args=({"type": "scheduled_publish", "task_id": "late", "user_id": 1},),
+        ).start()
+        for _ in range(100):
+            if log:
+                break
+            await asyncio.sleep(0.01)
+        assert log == [("publish", "late")]
+
+        started = time.monotonic()
+        threading.Thread(target=thread.stop).start()
+        await asyncio.wait_for(runner, 1.0)
+        return time.monotonic() - started
+
+    assert asyncio.run(main()) < 0.5
+    assert not thread.is_running
@@ -0,0 +1,49 @@
+import threading
+
+import pytest
+from PIL import ImageFont
+
+from src.core.services.font_manager import FontCache
+
+
+@pytest.fixture
+def font_file(tmp_path):
+    path = tmp_path / "test.ttf"
+    path.write_bytes(ImageFont.load_default(size=20).font_bytes)
+    return path
+
+
+@pytest.mark.unit
+def test_font_cache_reuses_objects_and_evicts_lru(font_file):
+    cache = FontCache(max_fonts=2)
+
+    a = cache.get(font_file, 20)
+    assert cache.get(str(font_file), 20) is a
+    b = cache.get(font_file, 30)
+    assert b is not a and b.size == 30
+
+    cache.get(font_file, 40)  # 淘汰最久未用的 20 号
+    assert cache.get(font_file, 20) is not a
+    assert (cache.hits, cache.misses) == (1, 4)
+
+
+@pytest.mark.unit
+def test_font_cache_remembers_unloadable_faces_and_is_thread_safe(tmp_path, font_file):
+    cache = FontCache()
+    broken = tmp_path / "broken.ttf"
+    broken.write_bytes(b"not a font")
+
+    with pytest.raises(OSError):
+        cache.get(broken, 20)
+    assert cache.is_loadable(broken) is False
+    with pytest.raises(OSError):
+        cache.get(broken, 24)
+    assert cache.misses == 1  # 第二次不再尝试解析
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get(font_file, 26))) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len({id(f) for f in results}) == 1
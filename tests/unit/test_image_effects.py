@@ -0,0 +1,70 @@
+import pytest
+from PIL import Image, ImageChops, ImageDraw, ImageFilter
+
+from src.core.services.background_cache import background_cache
+from src.core.services.image_effects import dot_grid, rounded_card, shadow_layer, vertical_gradient
+from src.core.services.marketing_poster_service import gradient_bg
+from src.core.services.system_image_template_service import SystemImageTemplateService
+
+
+@pytest.mark.unit
+def test_vertical_gradient_and_dot_grid_match_per_row_drawing():
+    size, top, bottom = (120, 97), (250, 247, 242), (40, 90, 200)
+
+    expected = Image.new("RGB", size)
+    d = ImageDraw.Draw(expected)
+    for y in range(size[1]):
+        t = y / (size[1] - 1)
+        d.line([(0, y), (size[0], y)], fill=tuple(int(a + (b - a) * t) for a, b in zip(top, bottom)))
+    assert ImageChops.difference(expected, vertical_gradient(size, top, bottom)).getbbox() is None
+
+    # 内置背景原先的写法 a*(1-t)+b*t
+    for y in range(size[1]):
+        t = y / (size[1] - 1)
+        d.line([(0, y), (size[0], y)], fill=tuple(int(a * (1 - t) + b * t) for a, b in zip(top, bottom)))
+    assert ImageChops.difference(expected, vertical_gradient(size, top, bottom, weighted=True)).getbbox() is None
+
+    dots = Image.new("RGBA", size, (0, 0, 0, 0))
+    d = ImageDraw.Draw(dots)
+    for y in range(13, size[1], 10):
+        for x in range(7, size[0], 10):
+            d.ellipse([x - 2, y - 2, x + 2, y + 2], fill=(0, 0, 0, 12))
+    layer = dot_grid(size, origin=(7, 13), step=10, radius=2, fill=(0, 0, 0, 12))
+    assert ImageChops.difference(dots, layer).getbbox() is None
+
+
+@pytest.mark.unit
+def test_backgrounds_are_memoized_but_returned_as_copies():
+    a = gradient_bg((60, 80))
+    a.paste((255, 0, 0), (0, 0, 60, 80))
+    assert gradient_bg((60, 80)).getpixel((0, 0)) != (255, 0, 0)
+
+    background_cache.clear()
+    img1, accent1 = SystemImageTemplateService._create_builtin_background((60, 80), seed_text="主题", variant=1)
+    img2, accent2 = SystemImageTemplateService._create_builtin_background((60, 80), seed_text="主题", variant=1)
+    assert img1 is not img2 and accent1 == accent2
+    assert ImageChops.difference(img1, img2).getbbox() is None
+    assert (background_cache.hits, background_cache.misses) == (1, 1)
+    # 缓存键只含种子哈希，不保留标题/正文
+    assert all("主题" not in repr(k) for k in background_cache._images)
+
+
+@pytest.mark.unit
+def test_rounded_card_matches_full_canvas_compositing_and_caches_shadow():
+    base = vertical_gradient((400, 300), (250, 247, 242), (200, 220, 240))
+    xy = (80, 60, 320, 220)
+
+    expected = base.convert("RGBA")
+    shadow = Image.new("RGBA", base.size, (0, 0, 0, 0))
+    ImageDraw.Draw(shadow).rounded_rectangle([86, 70, 326, 230], radius=28, fill=(0, 0, 0, 40))
+    expected = Image.alpha_composite(expected, shadow.filter(ImageFilter.GaussianBlur(14)))
+    overlay = Image.new("RGBA", base.size, (0, 0, 0, 0))
+    ImageDraw.Draw(overlay).rounded_rectangle(xy, radius=28, fill=(255, 255, 255, 255), outline=(0, 0, 0, 14), width=2)
+    expected = Image.alpha_composite(expected, overlay).convert("RGB")
+
+    shadow_layer.cache_clear()
+    for _ in range(2):
+        actual = base.copy()
+        rounded_card(actual, xy, radius=28, fill=(255, 255, 255, 255), outline=(0, 0, 0, 14), outline_width=2)
+        assert ImageChops.difference(expected, actual).getbbox() is None
+    assert shadow_layer.cache_info().hits == 1
@@ -0,0 +1,42 @@
+import random
+
+import pytest
+from PIL import Image
+
+from src.core.services.image_encoder import EncodeOptions, encode_image, save_image
+
+
+def _noisy_image(size=(320, 240)):
+    rnd = random.Random(3)
+    img = Image.new("RGB", size)
+    img.putdata([(rnd.randrange(256), rnd.randrange(256), rnd.randrange(256)) for _ in range(size[0] * size[1])])
+    return img
+
+
+@pytest.mark.unit
+def test_target_size_picks_highest_quality_that_fits():
+    img = _noisy_image()
+    full, q = encode_image(img, EncodeOptions(format="jpeg", quality=95))
+    assert q == 95
+
+    target_kb = len(full) // 1024 // 2
+    data, q = encode_image(img, EncodeOptions(format="jpeg", quality=95, target_kb=target_kb, min_quality=5))
+    assert len(data) <= target_kb * 1024
+    assert 5 <= q < 95
+    over, _ = encode_image(img, EncodeOptions(format="jpeg", quality=q + 1))
+    assert len(over) > target_kb * 1024
+
+
+@pytest.mark.unit
+def test_save_image_fixes_extension_and_env_options(tmp_path, monkeypatch):
+    monkeypatch.setenv("XHS_POSTER_FORMAT", "webp")
+    monkeypatch.setenv("XHS_POSTER_QUALITY", "80")
+    options = EncodeOptions.from_env("XHS_POSTER", default_format="png", default_optimize=True)
+    assert (options.format, options.quality, options.optimize) == ("webp", 80, True)
+
+    path = save_image(Image.new("RGBA", (40, 30), (255, 0, 0, 128)), str(tmp_path / "01_cover.png"), options)
+    assert path.endswith("01_cover.webp")
+    assert Image.open(path).format == "WEBP"
+
+    progressive = save_image(_noisy_image(), str(tmp_path / "p.jpg"), EncodeOptions(progressive=True))
+    assert Image.open(progressive).info.get("progressive") == 1
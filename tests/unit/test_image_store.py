@@ -0,0 +1,91 @@
+import io
+import os
+
+import pytest
+from PIL import Image, ImageDraw
+
+from src.core.services.image_store import ImageStore
+
+
+def _poster(text, color=(30, 120, 220)):
+    img = Image.new("RGB", (360, 480), (250, 250, 250))
+    d = ImageDraw.Draw(img)
+    d.rectangle((40, 60, 320, 200), fill=color)
+    d.ellipse((80, 260, 280, 440), fill=(240, 90, 60))
+    d.text((50, 220), text, fill=(0, 0, 0))
+    return img
+
+
+def _bytes(img, fmt="PNG", **kwargs):
+    buf = io.BytesIO()
+    img.save(buf, format=fmt, **kwargs)
+    return buf.getvalue()
+
+
+@pytest.mark.unit
+def test_identical_bytes_share_one_blob_and_gc_drops_orphans(tmp_path):
+    store = ImageStore(tmp_path / "store")
+    data = _bytes(_poster("a"))
+
+    a = store.put_bytes(data, tmp_path / "imgs" / "cover.png")
+    b = store.put_bytes(data, tmp_path / "contents" / "image_1.png")
+
+    assert os.path.samefile(a, b)
+    assert store.find_duplicate(data, under=tmp_path / "contents") == b
+    assert len(list((tmp_path / "store" / "blobs").rglob("*.png"))) == 1
+
+    # 已写好的生成图：与已有内容相同则替换为硬链接
+    generated = tmp_path / "generated" / "page.png"
+    generated.parent.mkdir()
+    generated.write_bytes(data)
+    store.adopt(generated)
+    assert os.path.samefile(generated, a)
+
+    os.remove(a)
+    os.remove(b)
+    stats = store.gc(grace_seconds=0)
+    assert (stats["refs_removed"], stats["blobs_removed"]) == (2, 0)  # 仍被 generated 引用
+    os.remove(generated)
+    stats = store.gc(grace_seconds=0)
+    assert (stats["refs_removed"], stats["blobs_removed"]) == (1, 1)
+    assert not list((tmp_path / "store" / "blobs").rglob("*.png"))
+
+
+@pytest.mark.unit
+def test_find_similar_matches_reencoded_image_only(tmp_path):
+    store = ImageStore(tmp_path / "store")
+    original = _poster("hello")
+    store.put_bytes(_bytes(original), tmp_path / "a.png")
+    store.put_bytes(_bytes(_poster("other", color=(20, 20, 20)).rotate(90)), tmp_path / "b.png")
+
+    reencoded = Image.open(io.BytesIO(_bytes(original.resize((270, 360)), "JPEG", quality=70)))
+    matches = store.find_similar(reencoded, max_distance=6)
+
+    assert [os.path.basename(p) for p, _d in matches] == ["a.png"]
+
+
+@pytest.mark.unit
+def test_content_manager_saves_each_item_its_own_copy(tmp_path, monkeypatch):
+    from src.core import content_manager as cm
+
+    store = ImageStore(tmp_path / "store")
+    monkeypatch.setattr(cm, "image_store", store)
+    manager = cm.ContentManager.__new__(cm.ContentManager)
+    manager.images_dir = tmp_path / "images"
+    manager.images_dir.mkdir()
+    manager.content_file = tmp_path / "contents.json"
+    manager.contents = {}
+
+    data = _bytes(_poster("same"))
+    first = manager.create_content("a", "a")
+    second = manager.create_content("b", "b")
+    p1 = manager.save_image(data, "first.png")
+    p2 = manager.save_image(data, "second.png")
+    manager.add_image_to_content(first, p1)
+    manager.add_image_to_content(second, p2)
+
+    # 每条内容有自己的文件（硬链接共享数据）；删除一条不影响另一条
+    assert p1 != p2 and os.path.samefile(p1, p2)
+    assert manager.delete_content(first)
+    assert not os.path.exists(p1)
+    assert open(p2, "rb").read() == data
@@ -0,0 +1,56 @@
+import pytest
+
+from src.core.services.layout_solver import LayoutSolver, size_schedule
+
+
+def _linear_shrink(candidates, height, limit):
+    for i, c in enumerate(candidates):
+        if height(c) <= limit:
+            return i
+    return len(candidates) - 1
+
+
+def _linear_grow(candidates, height, limit, enough):
+    i = 0
+    while i + 1 < len(candidates) and height(candidates[i]) < enough and height(candidates[i + 1]) <= limit:
+        i += 1
+    return i
+
+
+@pytest.mark.unit
+def test_first_fit_matches_linear_shrink_with_fewer_measurements():
+    candidates = size_schedule((80,), lambda s: (max(20, s[0] - 2),), 40)
+    assert candidates[-1] == (20,)
+
+    for limit in (10, 450, 1000, 1600, 5000):
+        measured = []
+
+        def measure(sizes):
+            measured.append(sizes)
+            return {"total_h": sizes[0] * 20}
+
+        solver = LayoutSolver(measure, lambda lay: lay["total_h"])
+        solution = solver.first_fit(candidates, limit)
+        expected = _linear_shrink(candidates, lambda c: c[0] * 20, limit)
+
+        assert solution.index == expected
+        assert solution.fits == (candidates[expected][0] * 20 <= limit)
+        assert len(measured) <= 2 * len(candidates).bit_length()
+
+        # 同一页换分辨率重渲染：以上次下标为起点，结果不变且只需少量测量
+        again = LayoutSolver(measure, lambda lay: lay["total_h"])
+        measured.clear()
+        assert again.first_fit(candidates, limit, hint=solution.index).index == expected
+        assert len(measured) <= 2
+
+
+@pytest.mark.unit
+def test_grow_matches_linear_walk():
+    candidates = size_schedule((24,), lambda s: (min(56, s[0] + 2),), 18)
+    height = lambda c: c[0] * 30  # noqa: E731
+    solver = LayoutSolver(lambda sz: {"total_h": height(sz)}, lambda lay: lay["total_h"])
+
+    for limit in (700, 1000, 1500, 2000):
+        for enough in (0, limit * 0.66, limit * 2):
+            got = solver.grow(candidates, limit, enough=enough)
+            assert got.index == _linear_grow(candidates, height, limit, enough)
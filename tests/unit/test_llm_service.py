@@ -0,0 +1,341 @@
+import asyncio
+import json
+import time
+
+import httpx
+import pytest
+
+from src.core.services.llm_response_cache import LLMResponseCache
+from src.core.services.llm_service import LLMService, LLMServiceError
+from src.core.services.llm_telemetry import LLMTelemetry
+
+
+@pytest.mark.unit
+def test_http_session_is_reused_per_endpoint_origin():
+    service = LLMService()
+    try:
+        a = service._get_http_session("https://api.example.com/v1/chat/completions", {})
+        b = service._get_http_session("https://api.example.com/v1/messages", {})
+        c = service._get_http_session("http://localhost:11434/api/chat", {})
+
+        assert a is b
+        assert a is not c
+    finally:
+        service.close()
+
+
+@pytest.mark.unit
+def test_http_session_rebuilt_when_pool_settings_change():
+    service = LLMService()
+    try:
+        url = "https://api.example.com/v1/chat/completions"
+        a = service._get_http_session(url, {"advanced": {"pool_size": 2}})
+        b = service._get_http_session(url, {"advanced": {"pool_size": 8}})
+
+        assert a is not b
+        assert b.get_adapter(url)._pool_maxsize == 8
+    finally:
+        service.close()
+
+
+@pytest.mark.unit
+def test_http_session_does_not_retry_gateway_errors():
+    service = LLMService()
+    try:
+        url = "https://api.example.com/v1/chat/completions"
+        retry = service._get_http_session(url, {}).get_adapter(url).max_retries
+
+        # 502/504 时上游可能已完成生成：不自动重发 POST，交给故障转移
+        assert retry.is_retry("POST", 429)
+        assert retry.is_retry("POST", 503)
+        assert not retry.is_retry("POST", 502)
+        assert not retry.is_retry("POST", 504)
+    finally:
+        service.close()
+
+
+def _openai_config():
+    return {
+        "provider": "本地模型",
+        "api_endpoint": "http://localhost:1234/v1/chat/completions",
+        "model_name": "test-model",
+        "prompt_template": "xiaohongshu_default",
+        "advanced": {"temperature": 0.5, "max_tokens": 100, "timeout": 5},
+    }
+
+
+@pytest.mark.unit
+def test_batch_generation_keeps_order_and_caps_concurrency(tmp_path, monkeypatch):
+    service = LLMService(telemetry=LLMTelemetry(tmp_path / "telemetry.jsonl"))
+    monkeypatch.setattr(service, "_load_model_config", _openai_config)
+
+    in_flight = {"now": 0, "max": 0}
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        in_flight["now"] += 1
+        in_flight["max"] = max(in_flight["max"], in_flight["now"])
+        await asyncio.sleep(0.01)
+        in_flight["now"] -= 1
+        prompt = json.loads(request.content)["messages"][-1]["content"]
+        topic = "A" if "主题：A" in prompt else ("B" if "主题：B" in prompt else "C")
+        body = {"choices": [{"message": {"content": json.dumps({"title": topic, "full_content": topic * 3})}}]}
+        return httpx.Response(200, json=body)
+
+    monkeypatch.setattr(
+        service,
+        "_new_async_client",
+        lambda model_config, max_connections=None: httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+    )
+    monkeypatch.setattr(service, "get_prompt_template", lambda template_id: None)
+
+    results = service.generate_xiaohongshu_batch(["A", "B", "C"] * 3, concurrency=2)
+
+    assert [r.title for r in results] == ["A", "B", "C"] * 3
+    assert in_flight["max"] <= 2
+
+    stats = service.telemetry.summary()["providers"]
+    assert [(g["model"], g["calls"], g["parse_total"], g["parse_failures"]) for g in stats] == [("test-model", 9, 9, 0)]
+
+
+@pytest.mark.unit
+def test_iter_stream_deltas_handles_sse_and_ndjson():
+    openai_lines = [
+        'data: {"choices":[{"delta":{"role":"assistant"}}]}',
+        "",
+        'data: {"choices":[{"delta":{"content":"你好"}}]}',
+        'data: {"choices":[{"delta":{"content":"，小红书"}}]}',
+        "data: [DONE]",
+        'data: {"choices":[{"delta":{"content":"ignored"}}]}',
+    ]
+    anthropic_lines = [
+        "event: message_start",
+        'data: {"type":"message_start","message":{}}',
+        'data: {"type":"content_block_delta","index":0,"delta":{"type":"text_delta","text":"Hi"}}',
+        'data: {"type":"content_block_delta","index":0,"delta":{"type":"text_delta","text":" there"}}',
+        'data: {"type":"message_stop"}',
+    ]
+    ollama_lines = [
+        b'{"message":{"role":"assistant","content":"a"},"done":false}',
+        b'{"message":{"role":"assistant","content":"b"},"done":false}',
+        b'{"message":{"role":"assistant","content":""},"done":true}',
+    ]
+
+    assert "".join(LLMService._iter_stream_deltas("openai", openai_lines)) == "你好，小红书"
+    assert "".join(LLMService._iter_stream_deltas("anthropic", anthropic_lines)) == "Hi there"
+    assert "".join(LLMService._iter_stream_deltas("ollama", ollama_lines)) == "ab"
+
+
+@pytest.mark.unit
+def test_response_cache_evicts_least_recently_used_and_expires(tmp_path):
+    cache = LLMResponseCache(tmp_path / "cache.sqlite3", ttl_seconds=3600, max_bytes=25)
+    cache.set("a", "x" * 10)
+    cache.set("b", "y" * 10)
+    assert cache.get("a") == "x" * 10  # a 变为最近访问
+
+    cache.set("c", "z" * 10)  # 超出 25 字节，淘汰最久未访问的 b
+    assert cache.get("b") is None
+    assert cache.get("a") == "x" * 10
+    assert cache.get("c") == "z" * 10
+
+    cache.ttl_seconds = 1e-6
+    time.sleep(0.01)
+    assert cache.get("a") is None
+
+
+@pytest.mark.unit
+def test_call_model_returns_cached_response_without_request(tmp_path, monkeypatch):
+    service = LLMService(cache=LLMResponseCache(tmp_path / "cache.sqlite3"))
+    calls = []
+
+    def fake_send(kind, url, model_config, messages, temperature, max_tokens, timeout, stream_callback=None):
+        calls.append(url)
+        return '{"title": "t", "full_content": "c"}'
+
+    monkeypatch.setattr(service, "_send_request", fake_send)
+    messages = [{"role": "user", "content": "主题：缓存"}]
+
+    first = service._call_model(_openai_config(), messages, use_cache=True)
+    second = service._call_model(_openai_config(), messages, use_cache=True)
+    bypass = service._call_model(_openai_config(), messages, use_cache=False)
+
+    assert first == second == bypass
+    assert len(calls) == 2
+
+
+@pytest.mark.unit
+def test_generation_always_requests_model_unless_cache_opted_in(tmp_path, monkeypatch):
+    service = LLMService(cache=LLMResponseCache(tmp_path / "cache.sqlite3"))
+    replies = iter(['{"title": "第一版", "full_content": "a"}', '{"title": "第二版", "full_content": "b"}'])
+    calls = []
+
+    def fake_send(kind, url, model_config, messages, temperature, max_tokens, timeout, stream_callback=None):
+        calls.append(url)
+        return next(replies)
+
+    monkeypatch.setattr(service, "_send_request", fake_send)
+    monkeypatch.setattr(
+        service,
+        "_prepare_xiaohongshu_request",
+        lambda topic, header_title, author: (_openai_config(), [{"role": "user", "content": topic}]),
+    )
+
+    # 用户再次点“生成”：同一主题也重新请求模型，并刷新缓存
+    first = service.generate_xiaohongshu_content("同一个主题")
+    second = service.generate_xiaohongshu_content("同一个主题")
+    assert (first.title, second.title) == ("第一版", "第二版")
+
+    # 显式启用（定时任务重试）：复用最近一次结果，不再请求
+    retry = service.generate_xiaohongshu_content("同一个主题", use_cache=True)
+    assert retry.title == "第二版"
+    assert len(calls) == 2
+
+
+@pytest.mark.unit
+def test_response_cache_key_depends_on_model_params_and_skips_non_json(tmp_path, monkeypatch):
+    service = LLMService(cache=LLMResponseCache(tmp_path / "cache.sqlite3"))
+    calls = []
+
+    def fake_send(kind, url, model_config, messages, temperature, max_tokens, timeout, stream_callback=None):
+        calls.append(temperature)
+        return "不是 JSON" if model_config.get("model_name") == "plain" else '{"title": "t"}'
+
+    monkeypatch.setattr(service, "_send_request", fake_send)
+    messages = [{"role": "user", "content": "主题：缓存键"}]
+    hot = _openai_config()
+    hot["advanced"] = dict(hot["advanced"], temperature=0.9)
+    plain = dict(_openai_config(), model_name="plain")
+
+    for config in (_openai_config(), hot, plain):
+        service._call_model(config, messages, use_cache=True, cache_namespace="xiaohongshu")
+    for config in (_openai_config(), hot, plain):
+        service._call_model(config, messages, use_cache=True, cache_namespace="xiaohongshu")
+
+    # 温度不同的请求各自缓存；无法解析为 JSON 的输出不写入缓存
+    assert calls == [0.5, 0.9, 0.5, 0.5]
+
+
+@pytest.mark.unit
+def test_prompt_template_index_reparses_only_changed_files(tmp_path, monkeypatch):
+    service = LLMService()
+    monkeypatch.setattr(service, "_get_prompt_templates_dir", lambda: tmp_path)
+    (tmp_path / "a.json").write_text(json.dumps({"id": "a", "name": "A", "user_prompt": "v1 {{topic}}"}), encoding="utf-8")
+    (tmp_path / "b.json").write_text(json.dumps({"id": "b", "name": "B", "user_prompt": "b"}), encoding="utf-8")
+
+    parsed = []
+    original = service._load_prompt_template_file
+
+    def counting_loader(path):
+        parsed.append(path.name)
+        return original(path)
+
+    monkeypatch.setattr(service, "_load_prompt_template_file", counting_loader)
+
+    assert [t.id for t in service.list_prompt_templates()] == ["a", "b"]
+    assert service.get_prompt_template("a").user_prompt == "v1 {{topic}}"
+    assert sorted(parsed) == ["a.json", "b.json"]
+
+    parsed.clear()
+    (tmp_path / "a.json").write_text(json.dumps({"id": "a", "name": "A", "user_prompt": "version 2"}), encoding="utf-8")
+    (tmp_path / "b.json").unlink()
+
+    assert service.get_prompt_template("a").user_prompt == "version 2"
+    assert service.get_prompt_template("b") is None
+    assert parsed == ["a.json"]
+
+
+def _config_with_fallback(**extra):
+    cfg = _openai_config()
+    cfg["fallbacks"] = [
+        {"provider": "本地模型", "api_endpoint": "http://127.0.0.1:2345/v1/chat/completions", "model_name": "backup"}
+    ]
+    cfg.update(extra)
+    return cfg
+
+
+@pytest.mark.unit
+def test_failover_uses_next_endpoint_and_trips_breaker(monkeypatch):
+    service = LLMService()
+    monkeypatch.setenv("XHS_LLM_BREAKER_THRESHOLD", "2")
+    calls = []
+
+    def fake_call(url, model_config, messages, temperature, max_tokens, timeout, stream_callback=None):
+        calls.append(model_config["model_name"])
+        if model_config["model_name"] == "test-model":
+            raise LLMServiceError("模型接口返回错误: HTTP 503")
+        return "ok"
+
+    monkeypatch.setattr(service, "_call_openai_compatible", fake_call)
+    messages = [{"role": "user", "content": "hi"}]
+
+    assert service._call_model(_config_with_fallback(), messages) == "ok"
+    assert service._call_model(_config_with_fallback(), messages) == "ok"
+    assert calls == ["test-model", "backup", "test-model", "backup"]
+
+    # 主端点已熔断：直接走备用端点
+    calls.clear()
+    assert service._call_model(_config_with_fallback(), messages) == "ok"
+    assert calls == ["backup"]
+
+
+@pytest.mark.unit
+def test_streaming_failover_signals_reset_before_next_endpoint(monkeypatch):
+    service = LLMService()
+
+    def fake_call(url, model_config, messages, temperature, max_tokens, timeout, stream_callback=None):
+        if model_config["model_name"] == "test-model":
+            stream_callback("半截")
+            raise LLMServiceError("模型请求失败: 连接中断")
+        stream_callback("完整")
+        return "完整"
+
+    monkeypatch.setattr(service, "_call_openai_compatible", fake_call)
+    received = []
+
+    text = service._call_model(_config_with_fallback(), [{"role": "user", "content": "hi"}], stream_callback=received.append)
+
+    assert text == "完整"
+    # 切换端点前回调空字符串，调用方据此清掉上一个端点的半截输出
+    assert received == ["半截", "", "完整"]
+
+
+@pytest.mark.unit
+def test_hedged_request_returns_faster_endpoint(monkeypatch):
+    service = LLMService()
+
+    def fake_call(url, model_config, messages, temperature, max_tokens, timeout, stream_callback=None):
+        if model_config["model_name"] == "test-model":
+            time.sleep(1.5)
+            return "slow"
+        return "fast"
+
+    monkeypatch.setattr(service, "_call_openai_compatible", fake_call)
+    cfg = _config_with_fallback(hedge={"enabled": True, "after_seconds": 0.5})
+
+    started = time.monotonic()
+    assert service._call_model(cfg, [{"role": "user", "content": "hi"}]) == "fast"
+    assert time.monotonic() - started < 1.4
+    service.close()
+
+
+@pytest.mark.unit
+def test_telemetry_summary_reports_percentiles_tokens_and_failures(tmp_path):
+    telemetry = LLMTelemetry(tmp_path / "telemetry.jsonl")
+    for latency in (1.0, 2.0, 3.0, 4.0):
+        telemetry.record_call(
+            provider="OpenAI", model="m", endpoint="https://x:443", latency=latency, ok=True,
+            ttfb=0.5, prompt_tokens=10, completion_tokens=20,
+        )
+    telemetry.record_call(provider="OpenAI", model="m", endpoint="https://x:443", latency=30, ok=False, error="timeout")
+    telemetry.record_parse(provider="OpenAI", model="m", ok=True)
+    telemetry.record_parse(provider="OpenAI", model="m", ok=False)
+
+    (group,) = telemetry.summary()["providers"]
+
+    assert group["calls"] == 5
+    assert group["timeouts"] == 1
+    assert group["error_rate"] == 0.2
+    assert group["latency"]["p50"] == 3.0
+    assert group["latency"]["max"] == 4.0
+    assert group["prompt_tokens"] == 40
+    assert group["completion_tokens"] == 80
+    assert group["parse_failure_rate"] == 0.5
@@ -0,0 +1,76 @@
+import asyncio
+
+import pytest
+
+from src.core.scheduler.publish_executor import PublishExecutor
+
+
+@pytest.mark.unit
+def test_publish_executor_caps_concurrency_and_serializes_each_account():
+    events = []
+    peak = {"all": 0, "now": 0}
+    running_accounts = set()
+
+    async def fake_publish(action):
+        uid = action["user_id"]
+        assert uid not in running_accounts  # 同账号不会并发
+        running_accounts.add(uid)
+        peak["now"] += 1
+        peak["all"] = max(peak["all"], peak["now"])
+        events.append(("start", action["task_id"]))
+        await asyncio.sleep(0.02)
+        events.append(("end", action["task_id"]))
+        peak["now"] -= 1
+        running_accounts.discard(uid)
+
+    async def main():
+        executor = PublishExecutor(fake_publish, max_concurrency=2)
+        actions = [
+            {"task_id": "a1", "user_id": 1},
+            {"task_id": "a2", "user_id": 1},
+            {"task_id": "b1", "user_id": 2},
+            {"task_id": "c1", "user_id": "3"},
+            {"task_id": "d1", "user_id": None},
+        ]
+        for action in actions:
+            executor.submit(action)
+        assert executor.pending_count == 5
+        await executor.join()
+        assert executor.pending_count == 0 and executor.active_count == 0
+
+    asyncio.run(main())
+
+    assert peak["all"] == 2
+    starts = [t for kind, t in events if kind == "start"]
+    assert sorted(starts) == ["a1", "a2", "b1", "c1", "d1"]
+    # 同账号按提交顺序执行；等待 a1 的 a2 不占名额，b1 与 a1 同时开始
+    assert events.index(("end", "a1")) < events.index(("start", "a2"))
+    assert starts[:2] == ["a1", "b1"]
+
+
+@pytest.mark.unit
+def test_publish_executor_reports_errors_and_cancels_on_shutdown():
+    errors = []
+    closed = []
+
+    async def fake_publish(action):
+        if action["task_id"] == "bad":
+            raise RuntimeError("发布失败")
+        try:
+            await asyncio.sleep(10)
+        finally:
+            closed.append(action["task_id"])
+
+    async def main():
+        executor = PublishExecutor(fake_publish, max_concurrency=4, on_error=lambda a, e: errors.append((a["task_id"], str(e))))
+        executor.submit({"task_id": "bad", "user_id": 1})
+        executor.submit({"task_id": "slow", "user_id": 2})
+        await asyncio.sleep(0.05)
+        assert executor.active_count == 1
+        await executor.shutdown()
+        assert executor.pending_count == 0
+
+    asyncio.run(main())
+
+    assert errors == [("bad", "发布失败")]
+    assert closed == ["slow"]
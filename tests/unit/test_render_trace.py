@@ -0,0 +1,57 @@
+import pytest
+
+from src.core.services.render_trace import RenderTracer, load_trace
+from src.core.services.system_image_template_service import SystemImageTemplateService
+
+
+@pytest.mark.unit
+def test_spans_are_nested_and_flushed_when_enabled(tmp_path, monkeypatch):
+    trace_file = tmp_path / "trace.json"
+    monkeypatch.setenv("XHS_IMG_TRACE_FILE", str(trace_file))
+    tracer = RenderTracer()
+
+    monkeypatch.setenv("XHS_IMG_TRACE", "false")
+    with tracer.span("page") as args:
+        args["ignored"] = True
+    assert not trace_file.exists()
+
+    monkeypatch.setenv("XHS_IMG_TRACE", "true")
+    with tracer.span("page", index=1):
+        token = tracer.begin("draw_text")
+        with tracer.span("layout", path="default") as args:
+            args["index"] = 3
+        tracer.end(token, lines=2)
+        # 内层 span 结束时不写文件，最外层结束时一次写入
+        assert not trace_file.exists()
+    with tracer.span("page", index=2):
+        pass
+
+    events = [e for e in load_trace(str(trace_file)) if e["ph"] == "X"]
+    assert [e["name"] for e in events] == ["layout", "draw_text", "page", "page"]
+    layout, draw, page = events[:3]
+    assert layout["args"] == {"path": "default", "index": 3}
+    assert draw["args"] == {"lines": 2}
+    assert page["ts"] <= draw["ts"] <= layout["ts"]
+    assert layout["ts"] + layout["dur"] <= page["ts"] + page["dur"] + 1
+
+
+@pytest.mark.unit
+def test_generate_post_images_records_stage_spans(tmp_path, monkeypatch):
+    monkeypatch.setenv("HOME", str(tmp_path))
+    monkeypatch.setenv("XHS_IMG_RENDER_CACHE", "false")
+    monkeypatch.setenv("XHS_IMAGE_STORE", "false")
+    monkeypatch.setenv("XHS_IMG_TRACE", "true")
+    monkeypatch.setenv("XHS_IMG_TRACE_FILE", str(tmp_path / "trace.json"))
+    svc = SystemImageTemplateService()
+    monkeypatch.setattr(svc, "choose_pack", lambda *a, **k: None)
+    monkeypatch.setattr(svc, "get_selected_pack_id", lambda: "")
+
+    pages = ["准备\n这是第一页正文，内容比较长，需要换行处理。", "步骤\n1. 打开应用\n2. 选择模板\n3. 点击生成\n4. 发布"]
+    svc.generate_post_images("测试标题", "正文", content_pages=pages, page_count=3, parallel=False)
+
+    events = [e for e in load_trace(str(tmp_path / "trace.json")) if e["ph"] == "X"]
+    names = {e["name"] for e in events}
+    assert {"generate_post_images", "plan", "page", "background", "layout", "draw_text", "encode"} <= names
+    assert sum(1 for e in events if e["name"] == "page") == 3
+    paths = {e["args"]["path"] for e in events if e["name"] == "layout"}
+    assert {"default", "timeline"} <= paths
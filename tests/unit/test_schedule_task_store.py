@@ -0,0 +1,85 @@
+import json
+import sqlite3
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+
+from src.core.scheduler.task_store import ScheduleTaskStore
+
+
+def _task(task_id, schedule_time, **extra):
+    now = datetime.now().isoformat()
+    data = {
+        "task_id": task_id,
+        "user_id": None,
+        "task_type": "hotspot",
+        "interval_hours": 6,
+        "hotspot_source": "weibo",
+        "page_count": 4,
+        "content": "正文",
+        "title": "标题",
+        "images": ["/tmp/a.jpg"],
+        "schedule_time": schedule_time.isoformat(),
+        "status": "pending",
+        "created_at": now,
+        "updated_at": now,
+        "retry_count": 0,
+        "max_retries": 3,
+        "error_message": "",
+    }
+    data.update(extra)
+    return data
+
+
+@pytest.mark.unit
+def test_store_round_trips_rows_and_queries_due_tasks(tmp_path):
+    store = ScheduleTaskStore(create_engine(f"sqlite:///{tmp_path / 'db.sqlite'}"))
+    now = datetime.now()
+    store.upsert_many([_task("t1", now - timedelta(minutes=1)), _task("t2", now + timedelta(hours=1))])
+    store.upsert(_task("t3", now - timedelta(minutes=5), status="running"))
+
+    loaded = {d["task_id"]: d for d in store.load_all()}
+    assert set(loaded) == {"t1", "t2", "t3"}
+    assert loaded["t1"]["images"] == ["/tmp/a.jpg"] and loaded["t1"]["interval_hours"] == 6
+    assert loaded["t1"]["user_id"] is None and loaded["t1"]["task_type"] == "hotspot"
+    assert store.due_task_ids(now) == ["t1"]
+
+    # 按行更新：只改变这一条
+    store.upsert(_task("t2", now - timedelta(seconds=1), retry_count=2))
+    assert store.due_task_ids(now) == ["t1", "t2"]
+    assert {d["task_id"]: d for d in store.load_all()}["t2"]["retry_count"] == 2
+
+    assert store.delete(["t1", "missing"]) == 1
+    assert [d["task_id"] for d in store.load_all()] == ["t3", "t2"]
+
+    conn = sqlite3.connect(str(tmp_path / "db.sqlite"))
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    indexes = {row[1] for row in conn.execute("PRAGMA index_list(scheduled_tasks)")}
+    assert "ix_scheduled_tasks_status_time" in indexes
+
+
+@pytest.mark.unit
+def test_legacy_table_is_rebuilt_and_json_file_migrated_once(tmp_path):
+    db_path = tmp_path / "db.sqlite"
+    conn = sqlite3.connect(str(db_path))
+    conn.execute(
+        "CREATE TABLE scheduled_tasks (id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL, name TEXT NOT NULL, "
+        "platform TEXT NOT NULL, schedule_time TIMESTAMP NOT NULL)"
+    )
+    conn.commit()
+    conn.close()
+
+    json_path = tmp_path / "schedule_tasks.json"
+    tasks = [_task("a", datetime(2030, 1, 1, 9)), _task("b", datetime(2030, 1, 2, 9), status="completed")]
+    json_path.write_text(json.dumps(tasks, ensure_ascii=False), encoding="utf-8")
+
+    store = ScheduleTaskStore(create_engine(f"sqlite:///{db_path}"))
+    assert store.migrate_json(str(json_path)) == 2
+    assert not json_path.exists() and (tmp_path / "schedule_tasks.json.migrated").exists()
+    assert store.migrate_json(str(json_path)) == 0
+
+    loaded = store.load_all()
+    assert [d["task_id"] for d in loaded] == ["a", "b"]
+    assert loaded[1]["status"] == "completed"
+    assert loaded[0]["schedule_time"] == "2030-01-01T09:00:00"
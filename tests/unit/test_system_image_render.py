@@ -0,0 +1,93 @@
+from pathlib import Path
+
+import pytest
+from PIL import Image, ImageChops
+
+from src.core.services import system_image_template_service as sits
+from src.core.services.render_cache import RenderCache
+from src.core.services.system_image_template_service import SystemImageTemplateService
+
+PAGES = [
+    "准备\n这是第一页正文，内容比较长，需要换行处理。",
+    "步骤\n1. 打开应用\n2. 选择模板\n3. 点击生成\n4. 发布",
+    "#话题1 #话题2",
+    "总结\n关键词：解释说明",
+]
+
+
+def _generate(service, **kwargs):
+    return service.generate_post_images("测试标题", "正文", content_pages=PAGES, page_count=8, **kwargs)
+
+
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    monkeypatch.setenv("HOME", str(tmp_path))
+    monkeypatch.setenv("XHS_IMG_RENDER_CACHE", "false")
+    monkeypatch.setenv("XHS_IMAGE_STORE", "false")
+    svc = SystemImageTemplateService()
+    monkeypatch.setattr(svc, "choose_pack", lambda *a, **k: None)
+    monkeypatch.setattr(svc, "get_selected_pack_id", lambda: "")
+    return svc
+
+
+@pytest.mark.unit
+def test_parallel_rendering_matches_serial_and_keeps_page_order(service):
+    try:
+        serial_cover, serial_pages = _generate(service, parallel=False)
+        parallel_cover, parallel_pages = _generate(service, parallel=True)
+    finally:
+        sits.shutdown_render_pool()
+
+    # 纯标签页被跳过，其余页序号保持不变
+    assert [Path(p).name.split("_")[2] for p in parallel_pages] == ["1", "2", "4"]
+    for a, b in zip([serial_cover] + serial_pages, [parallel_cover] + parallel_pages):
+        assert ImageChops.difference(Image.open(a), Image.open(b)).getbbox() is None
+
+
+@pytest.mark.unit
+def test_parallel_rendering_falls_back_to_serial_when_pool_unavailable(service, monkeypatch):
+    def broken_pool():
+        raise OSError("no processes")
+
+    monkeypatch.setattr(sits, "_get_render_pool", broken_pool)
+    cover, pages = _generate(service, parallel=True)
+
+    assert cover.endswith(".jpg")
+    assert len(pages) == 3
+
+
+@pytest.mark.unit
+def test_batch_streams_every_post_and_resolves_pack_once(service, monkeypatch):
+    calls = []
+    monkeypatch.setattr(service, "choose_pack", lambda pack_id="": calls.append(pack_id))
+    posts = [
+        {"title": f"标题{i}", "content": "正文", "content_pages": PAGES, "page_count": 8} for i in range(3)
+    ] + [{"title": "坏参数", "unknown": 1}]
+
+    try:
+        results = list(service.generate_post_images_batch(posts))
+    finally:
+        sits.shutdown_render_pool()
+
+    assert sorted(r.index for r in results) == [0, 1, 2, 3]
+    by_index = {r.index: r for r in results}
+    assert not by_index[3].ok
+    for i in range(3):
+        assert by_index[i].ok and Path(by_index[i].cover).exists()
+        assert len(by_index[i].contents) == 3
+    assert calls == [""]
+
+
+@pytest.mark.unit
+def test_render_cache_returns_previous_files_until_inputs_change(service, tmp_path, monkeypatch):
+    monkeypatch.setenv("XHS_IMG_RENDER_CACHE", "true")
+    monkeypatch.setattr(sits, "render_cache", RenderCache(tmp_path / "render_cache.sqlite3"))
+
+    first = _generate(service, parallel=False)
+    assert _generate(service, parallel=False) == first  # 重试：同样输入直接复用
+
+    monkeypatch.setenv("XHS_IMG_SHOW_TAGS", "true")
+    assert _generate(service, parallel=False)[0] != first[0]  # 开关变化：缓存键不同
+
+    Path(first[1][0]).unlink()  # 文件被删除后不再命中
+    assert _generate(service, parallel=False)[0] != first[0]
@@ -0,0 +1,77 @@
+import os
+
+import pytest
+
+from src.core.scheduler.pregenerate import TaskPregenerator, needs_pregeneration
+
+
+topic = {"now": "话题A"}
+
+
+def _fake_build(calls, tmp_path):
+    def build(task):
+        calls.append(task["task_id"])
+        paths = []
+        for i in range(2):
+            p = tmp_path / f"out_{len(calls)}_{i}.png"
+            p.write_bytes(b"png")
+            paths.append(str(p))
+        return {"title": f"标题{len(calls)}", "content": "正文", "images": paths, "hotspot_title": topic["now"]}
+
+    return build
+
+
+@pytest.mark.unit
+def test_pregenerator_reuses_until_hotspot_ranking_changes(tmp_path):
+    calls = []
+    topic["now"] = "话题A"
+    pregen = TaskPregenerator(str(tmp_path / "assets"), build=_fake_build(calls, tmp_path), fetch_topic=lambda t: topic["now"])
+    task = {"task_id": "task_1", "task_type": "hotspot", "hotspot_source": "weibo", "hotspot_rank": 2, "page_count": 2}
+
+    assert pregen.submit(task).result() == "generated"
+    assert pregen.prepare(task) == "reused"
+    cached = pregen.load_fresh(task)
+    assert cached["title"] == "标题1" and len(cached["images"]) == 2
+    # 缓存图片为副本，不受原输出文件清理影响
+    assert all(p.startswith(str(tmp_path / "assets" / "task_1" / "pregen")) for p in cached["images"])
+    for p in tmp_path.glob("out_*.png"):
+        p.unlink()
+    assert pregen.load_fresh(task) is not None
+
+    # 榜单该名次的话题变化：发布时不再使用旧内容，预生成时重新生成并清理旧版本
+    topic["now"] = "话题B"
+    assert pregen.load_fresh(task) is None
+    assert pregen.prepare(task) == "generated"
+    assert calls == ["task_1", "task_1"]
+    assert pregen.load_fresh(task)["title"] == "标题2"
+    assert not any(os.path.exists(p) for p in cached["images"])
+
+    pregen.discard("task_1")
+    assert pregen.load("task_1") is None
+
+
+@pytest.mark.unit
+def test_pregenerator_fixed_tasks_and_unreachable_ranking(tmp_path):
+    calls = []
+
+    def no_ranking(task):
+        raise OSError("network down")
+
+    pregen = TaskPregenerator(str(tmp_path / "assets"), build=_fake_build(calls, tmp_path), fetch_topic=no_ranking)
+    existing = tmp_path / "given.png"
+    existing.write_bytes(b"png")
+
+    assert needs_pregeneration({"task_type": "hotspot", "images": [str(existing)]})
+    assert not needs_pregeneration({"task_type": "fixed", "images": [str(existing)]})
+    assert needs_pregeneration({"task_type": "fixed", "images": []})
+
+    # 热点榜单不可用：跳过预生成，发布时现场生成
+    assert pregen.prepare({"task_id": "h", "task_type": "hotspot"}) == "skipped"
+    assert calls == []
+
+    # 固定任务不依赖榜单；标题/正文改动后缓存失效
+    fixed = {"task_id": "f", "task_type": "fixed", "title": "t", "content": "c", "page_count": 2}
+    assert pregen.prepare(fixed) == "generated"
+    assert pregen.prepare(fixed) == "reused"
+    assert pregen.load_fresh(fixed) is not None
+    assert pregen.load_fresh(dict(fixed, content="changed")) is None
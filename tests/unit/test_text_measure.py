@@ -0,0 +1,66 @@
+import pytest
+from PIL import Image, ImageDraw, ImageFont
+
+from src.core.services.text_measure import GlyphAdvanceCache, TextMeasurer, smart_wrap, wrap_chars, wrap_words
+
+
+def _naive_wrap(text, font, max_width):
+    lines, line = [], ""
+    for ch in text:
+        if font.getlength(line + ch) <= max_width:
+            line += ch
+        else:
+            if line:
+                lines.append(line)
+            line = ch
+    if line:
+        lines.append(line)
+    return lines
+
+
+@pytest.mark.unit
+def test_wrap_matches_per_prefix_measurement_with_few_exact_calls():
+    font = ImageFont.load_default(size=24)
+    text = "小红书图文排版测试，AVAWAy Te fi ff 标点。" * 20
+    calls = []
+
+    def exact(s):
+        calls.append(s)
+        return font.getlength(s)
+
+    assert wrap_chars(text, font, 300, exact=exact) == _naive_wrap(text, font, 300)
+    # 逐前缀测量需要 len(text) 次；估算 + 校正只需每行常数次
+    assert len(calls) < len(text) / 3
+
+
+@pytest.mark.unit
+def test_word_wrap_and_smart_wrap_keep_break_rules():
+    font = ImageFont.load_default(size=20)
+    draw = ImageDraw.Draw(Image.new("RGB", (10, 10)))
+    width = draw.textlength("hello world", font=font)
+
+    assert wrap_words("  hello world again\n\nx", font, width) == ["hello world", "again", "", "x"]
+
+    lines = smart_wrap("一二三四五六七八九十。", font, font.getlength("一二三四五") + 1)
+    assert lines == ["一二三四五", "六七八九十。"]
+
+
+class _FakeFont:
+    def __init__(self, path, size):
+        self.path, self.index, self.size = path, 0, size
+
+    def getlength(self, text):
+        return 10.0 * len(text)
+
+
+@pytest.mark.unit
+def test_glyph_advances_shared_across_font_instances_and_bounded():
+    cache = GlyphAdvanceCache(max_fonts=2)
+    TextMeasurer(_FakeFont("/fonts/a.ttf", 18), cache=cache).estimate("abc")
+
+    # FontManager 每次都会新建字体对象：同一 (路径, index, 字号) 复用同一张 advance 表
+    assert set(cache.table(_FakeFont("/fonts/a.ttf", 18))) == {"a", "b", "c"}
+    assert cache.table(_FakeFont("/fonts/a.ttf", 20)) == {}
+
+    cache.table(_FakeFont("/fonts/b.ttf", 18))
+    assert cache.table(_FakeFont("/fonts/a.ttf", 18)) == {}  # 超过 max_fonts，最久未用的被淘汰
@@ -0,0 +1,80 @@
+import threading
+import time
+
+import pytest
+
+from src.core.scheduler.timer_queue import DeadlineHeap, TimerQueue
+
+
+@pytest.mark.unit
+def test_deadline_heap_orders_reschedules_and_removes():
+    heap = DeadlineHeap()
+    for i in range(200):
+        heap.push(f"t{i}", 1000 + i)
+    heap.push("t150", 10)  # 改期到最前
+    for i in range(0, 100):
+        heap.remove(f"t{i}")
+
+    assert len(heap) == 100
+    assert heap.peek() == (10, "t150")
+    assert heap.pop_due(1100) == ["t150", "t100"]
+    assert "t150" not in heap and heap.when("t101") == 1101
+    # 懒删除的旧堆项不会无限累积
+    assert len(heap._heap) <= 2 * len(heap) + 64
+
+
+@pytest.mark.unit
+def test_timer_queue_fires_next_due_key_and_rearms_on_changes():
+    fired = []
+    done = threading.Event()
+
+    def on_due(keys):
+        fired.extend((key, time.time()) for key in keys)
+        if len(fired) >= 2:
+            done.set()
+
+    queue = TimerQueue(on_due)
+    queue.start()
+    try:
+        now = time.time()
+        queue.schedule("later", now + 3600)
+        queue.schedule("cancelled", now + 0.1)
+        queue.cancel("cancelled")
+        # 比堆顶更早的任务加入后立即重新计算等待时间
+        queue.schedule("b", now + 0.3)
+        queue.schedule("a", now + 0.15)
+
+        assert done.wait(2)
+        assert [key for key, _ts in fired] == ["a", "b"]
+        assert fired[0][1] - (now + 0.15) < 0.1
+        assert fired[1][1] - (now + 0.3) < 0.1
+        assert len(queue) == 1 and "later" in queue
+    finally:
+        queue.stop()
+    assert not queue.running
+
+
+@pytest.mark.unit
+def test_timer_queue_logs_callback_errors_and_keeps_firing(caplog):
+    fired = []
+    done = threading.Event()
+
+    def on_due(keys):
+        if "broken" in keys:
+            raise RuntimeError("handler bug")
+        fired.extend(keys)
+        done.set()
+
+    queue = TimerQueue(on_due)
+    queue.start()
+    try:
+        with caplog.at_level("ERROR"):
+            now = time.time()
+            queue.schedule("broken", now + 0.05)
+            queue.schedule("next", now + 0.2)
+            assert done.wait(2)
+    finally:
+        queue.stop()
+
+    assert fired == ["next"]
+    assert any("broken" in r.getMessage() and r.exc_info for r in caplog.records)